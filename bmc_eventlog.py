@@ -0,0 +1,224 @@
+"""Инкрементальная загрузка журналов Redfish LogServices в локальный SQLite индекс.
+
+Для каждого LogService каждого BMC (scheme://host:port) запоминается Id
+последней прочитанной записи, поэтому при повторном прогоне запрашиваются
+только новые записи ($skip). Тесты проверяют
+события запросом к индексу вместо поиска текста в WebUI.
+"""
+import json
+import logging
+import os
+import sqlite3
+import time
+from datetime import datetime
+from urllib.parse import urljoin, urlsplit
+
+import requests
+
+from redfish_stream import iter_members
+
+logger = logging.getLogger(__name__)
+
+# --- Конфигурация ---
+REPORTS_DIR = os.getenv('REPORTS_DIR', 'reports')
+EVENTLOG_DB = os.getenv('EVENTLOG_DB', os.path.join(REPORTS_DIR, 'eventlog.sqlite'))
+
+# Индекс - кэш журналов BMC: при смене схемы он пересоздается и загружается заново
+SCHEMA_VERSION = 2
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    bmc         TEXT NOT NULL,
+    service     TEXT NOT NULL,
+    id          TEXT NOT NULL,
+    created     REAL,
+    created_raw TEXT,
+    severity    TEXT,
+    message_id  TEXT,
+    message     TEXT,
+    entry_type  TEXT,
+    raw         TEXT,
+    PRIMARY KEY (bmc, service, id)
+);
+CREATE INDEX IF NOT EXISTS idx_entries_created ON entries (created);
+CREATE INDEX IF NOT EXISTS idx_entries_severity ON entries (severity, created);
+CREATE INDEX IF NOT EXISTS idx_entries_message_id ON entries (message_id, created);
+CREATE TABLE IF NOT EXISTS cursors (
+    bmc     TEXT NOT NULL,
+    service TEXT NOT NULL,
+    last_id TEXT,
+    seen    INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (bmc, service)
+);
+"""
+
+
+def parse_redfish_time(value):
+    """ISO 8601 время Redfish -> Unix timestamp (None, если не распознано)"""
+    if not value:
+        return None
+    try:
+        return datetime.fromisoformat(value.replace('Z', '+00:00')).timestamp()
+    except ValueError:
+        return None
+
+
+def bmc_key(url):
+    """scheme://host:port BMC: один LogService на разных стендах - разные журналы"""
+    parts = urlsplit(url)
+    return f"{parts.scheme}://{parts.netloc}"
+
+
+def bmc_time(session, base_url, timeout=10):
+    """Текущее время по часам BMC (записи журнала создаются по ним)"""
+    try:
+        response = session.get(f"{base_url}/Managers/bmc", timeout=timeout)
+        if response.status_code == 200:
+            timestamp = parse_redfish_time(response.json().get('DateTime'))
+            if timestamp is not None:
+                return timestamp
+    except requests.exceptions.RequestException as e:
+        logger.warning("Не удалось получить время BMC: %s", e)
+    return time.time()
+
+
+class EventLogStore:
+    """Локальный индекс записей журналов BMC"""
+
+    def __init__(self, path=EVENTLOG_DB):
+        if path != ':memory:':
+            os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        self.path = path
+        self.conn = sqlite3.connect(path)
+        self.conn.row_factory = sqlite3.Row
+        if self.conn.execute("PRAGMA user_version").fetchone()[0] != SCHEMA_VERSION:
+            self.conn.executescript("DROP TABLE IF EXISTS entries; DROP TABLE IF EXISTS cursors;")
+            self.conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+        self.conn.executescript(SCHEMA)
+
+    def close(self):
+        self.conn.close()
+
+    # --- Загрузка ---
+    def ingest(self, session, base_url, timeout=10):
+        """Загружает новые записи из всех LogServices системы; возвращает их число"""
+        services_url = f"{base_url}/Systems/system/LogServices"
+        total = 0
+        for service in iter_members(session, services_url, timeout=timeout):
+            service_path = service.get('@odata.id')
+            if service_path:
+                total += self.ingest_service(session, urljoin(services_url, service_path), timeout)
+        return total
+
+    def ingest_service(self, session, service_url, timeout=10, _resync=False):
+        """Загружает записи одного LogService, начиная с последней известной"""
+        bmc = bmc_key(service_url)
+        service = service_url.rstrip('/').rsplit('/', 1)[-1]
+        row = self.conn.execute(
+            "SELECT last_id, seen FROM cursors WHERE bmc = ? AND service = ?", (bmc, service)
+        ).fetchone()
+        last_id, seen = (row['last_id'], row['seen']) if row and not _resync else (None, 0)
+
+        # Запрашиваем начиная с последней прочитанной записи, чтобы убедиться,
+        # что журнал не был очищен между прогонами
+        skip = max(seen - 1, 0)
+        entries_url = f"{service_url}/Entries"
+        if skip:
+            entries_url += f"?$skip={skip}"
+
+        new = 0
+        anchor_checked = not skip
+        anchor_lost = False
+        with self.conn:
+            for entry in iter_members(session, entries_url, timeout=timeout):
+                if not anchor_checked:
+                    anchor_checked = True
+                    if entry.get('Id') == last_id:
+                        continue
+                    anchor_lost = True
+                    break
+                self._insert(bmc, service, entry)
+                last_id = entry.get('Id')
+                seen += 1
+                new += 1
+
+            # Пустой ответ со $skip тоже значит, что записей стало меньше
+            anchor_lost = anchor_lost or not anchor_checked
+            if not anchor_lost:
+                self.conn.execute(
+                    "INSERT OR REPLACE INTO cursors (bmc, service, last_id, seen) VALUES (?, ?, ?, ?)",
+                    (bmc, service, last_id, seen),
+                )
+
+        if anchor_lost and not _resync:
+            # Журнал очищен или ротирован - перечитываем его целиком
+            logger.info("Журнал %s (%s) изменился с прошлого прогона, полная загрузка", service, bmc)
+            return self.ingest_service(session, service_url, timeout, _resync=True)
+
+        if new:
+            logger.info("Журнал %s (%s): загружено новых записей %s", service, bmc, new)
+        return new
+
+    def _insert(self, bmc, service, entry):
+        created_raw = entry.get('Created')
+        self.conn.execute(
+            "INSERT OR REPLACE INTO entries "
+            "(bmc, service, id, created, created_raw, severity, message_id, message, entry_type, raw) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (
+                bmc,
+                service,
+                entry.get('Id'),
+                parse_redfish_time(created_raw),
+                created_raw,
+                entry.get('Severity'),
+                entry.get('MessageId'),
+                entry.get('Message'),
+                entry.get('EntryType'),
+                json.dumps(entry, ensure_ascii=False),
+            ),
+        )
+
+    # --- Запросы ---
+    def find_events(self, message_id=None, severity=None, since=None, until=None,
+                    service=None, bmc=None, limit=None):
+        """Ищет записи; message_id - шаблон SQL LIKE (например, '%PowerOn%'), bmc - URL BMC"""
+        conditions = []
+        params = []
+        if bmc:
+            conditions.append("bmc = ?")
+            params.append(bmc_key(bmc))
+        if message_id:
+            conditions.append("message_id LIKE ?")
+            params.append(message_id)
+        if severity:
+            conditions.append("severity = ?")
+            params.append(severity)
+        if since is not None:
+            conditions.append("created >= ?")
+            params.append(since)
+        if until is not None:
+            conditions.append("created <= ?")
+            params.append(until)
+        if service:
+            conditions.append("service = ?")
+            params.append(service)
+
+        query = "SELECT * FROM entries"
+        if conditions:
+            query += " WHERE " + " AND ".join(conditions)
+        query += " ORDER BY created"
+        if limit:
+            query += f" LIMIT {int(limit)}"
+        return [dict(row) for row in self.conn.execute(query, params)]
+
+    def wait_for_event(self, session, base_url, timeout=30, poll_interval=2, **filters):
+        """Дозагружает журналы, пока не появится подходящая запись или не истечет timeout"""
+        deadline = time.monotonic() + timeout
+        while True:
+            self.ingest(session, base_url)
+            events = self.find_events(bmc=base_url, limit=1, **filters)
+            if events:
+                return events[0]
+            if time.monotonic() >= deadline:
+                return None
+            time.sleep(poll_interval)
@@ -0,0 +1,350 @@
+"""Потоковая загрузка образа прошивки через Redfish UpdateService.
+
+Образ отображается в память (mmap) один раз и отдается всем целям: тело запроса
+читается из отображения блоками по мере отправки в сокет, поэтому память
+процесса не растет с размером образа и числом целей. Режимы UPDATE_MODE:
+
+* multipart - MultipartHttpPushUri: часть UpdateParameters (Targets,
+  @Redfish.OperationApplyTime = UPDATE_APPLY_TIME) и часть UpdateFile,
+  Content-Length известен заранее;
+* raw - HttpPushUri, application/octet-stream с Content-Length;
+* chunked - HttpPushUri с Transfer-Encoding: chunked (блоки по CHUNK_SIZE).
+
+В raw и chunked момент применения определяет настройка BMC
+HttpPushUriOptions.HttpPushUriApplyTime; по умолчанию OpenBMC применяет образ
+сразу и перезагружается, поэтому режим по умолчанию - multipart с OnReset.
+
+Для каждой цели фиксируются ход отправки (байты по времени), скорость загрузки,
+время ответа после последнего байта и ход задачи TaskService (TaskState,
+PercentComplete) до завершения или UPDATE_TIMEOUT. Цели FIRMWARE_TARGETS
+загружаются параллельно; отчет - reports/firmware_upload.json.
+
+    python bmc_firmware.py upload OBMC-Romulus-image.mtd
+    FIRMWARE_TARGETS=http://127.0.0.1:8772/redfish/v1 python bmc_firmware.py upload image.tar
+"""
+import json
+import logging
+import mmap
+import os
+import sys
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+import requests
+import urllib3
+
+from bmc_transport import new_session
+from redfish_client import REDFISH_URL, make_redfish_request
+
+logger = logging.getLogger(__name__)
+
+urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
+
+# --- Конфигурация ---
+REPORTS_DIR = os.getenv('REPORTS_DIR', 'reports')
+USERNAME = "root"
+PASSWORD = "0penBmc"
+FIRMWARE_IMAGE = os.getenv('FIRMWARE_IMAGE', 'OBMC-Romulus-image.mtd')
+TARGETS = os.getenv('FIRMWARE_TARGETS', REDFISH_URL).split(',')
+UPDATE_MODE = os.getenv('UPDATE_MODE', 'multipart')
+UPDATE_APPLY_TIME = os.getenv('UPDATE_APPLY_TIME', 'OnReset')
+UPDATE_TIMEOUT = float(os.getenv('UPDATE_TIMEOUT', '900'))
+POLL_INTERVAL = float(os.getenv('UPDATE_POLL_INTERVAL', '2'))
+# Таймаут на чтение ответа после отправки образа: BMC может проверять образ до ответа
+UPLOAD_READ_TIMEOUT = float(os.getenv('UPDATE_UPLOAD_TIMEOUT', '300'))
+CHUNK_SIZE = 64 * 1024
+PROGRESS_INTERVAL = 0.5
+TERMINAL_STATES = ('Completed', 'Exception', 'Killed', 'Cancelled')
+MODES = ('multipart', 'raw', 'chunked')
+
+
+class MappedImage:
+    """Образ прошивки, отображенный в память только для чтения"""
+
+    def __init__(self, path):
+        self.path = path
+        self.name = os.path.basename(path)
+        with open(path, 'rb') as f:
+            self.map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self.size = len(self.map)
+        # Чтение идет последовательно: ядро может читать страницы с опережением
+        if hasattr(self.map, 'madvise') and hasattr(mmap, 'MADV_SEQUENTIAL'):
+            self.map.madvise(mmap.MADV_SEQUENTIAL)
+
+    def view(self):
+        return memoryview(self.map)
+
+    def close(self):
+        self.map.close()
+
+
+class UploadProgress:
+    """Отправленные байты по времени для одной цели"""
+
+    def __init__(self, total):
+        self.total = total
+        self.sent = 0
+        self.started = None
+        self.finished = None
+        self.timeline = []
+        self._next_report = 0.1
+
+    def add(self, count):
+        now = time.perf_counter()
+        if self.started is None:
+            self.started = now
+        self.sent += count
+        if not self.timeline or now - self.started - self.timeline[-1][0] >= PROGRESS_INTERVAL \
+                or self.sent == self.total:
+            self.timeline.append((round(now - self.started, 3), self.sent))
+        if self.sent == self.total:
+            self.finished = now
+        if self.total and self.sent / self.total >= self._next_report:
+            logger.debug("Отправлено %.0f%% образа", self.sent * 100 / self.total)
+            self._next_report += 0.1
+
+    @property
+    def seconds(self):
+        if self.started is None or self.finished is None:
+            return None
+        return self.finished - self.started
+
+
+class UploadBody:
+    """Тело запроса из сегментов (bytes и срезы mmap) с известной длиной
+
+    requests видит __len__ и ставит Content-Length, а urllib3 читает тело
+    блоками через read(), так что в памяти одновременно не больше одного блока.
+    """
+
+    def __init__(self, segments, progress):
+        self.segments = [memoryview(segment) for segment in segments]
+        self.length = sum(len(segment) for segment in self.segments)
+        self.progress = progress
+        self._index = 0
+        self._offset = 0
+
+    def __len__(self):
+        return self.length
+
+    def read(self, size=-1):
+        size = CHUNK_SIZE if size is None or size < 0 else size
+        while self._index < len(self.segments):
+            segment = self.segments[self._index]
+            if self._offset < len(segment):
+                block = bytes(segment[self._offset:self._offset + size])
+                self._offset += len(block)
+                self.progress.add(len(block))
+                return block
+            self._index += 1
+            self._offset = 0
+        return b''
+
+    def __iter__(self):
+        while True:
+            block = self.read(CHUNK_SIZE)
+            if not block:
+                return
+            yield block
+
+
+def chunked_body(view, progress):
+    """Генератор без длины: requests отправляет его с Transfer-Encoding: chunked"""
+    for offset in range(0, len(view), CHUNK_SIZE):
+        block = bytes(view[offset:offset + CHUNK_SIZE])
+        progress.add(len(block))
+        yield block
+
+
+def multipart_body(image, parameters, progress):
+    """multipart/form-data из частей UpdateParameters и UpdateFile; возвращает (тело, Content-Type)"""
+    boundary = uuid.uuid4().hex
+    preamble = (
+        f"--{boundary}\r\n"
+        'Content-Disposition: form-data; name="UpdateParameters"\r\n'
+        "Content-Type: application/json\r\n\r\n"
+        f"{json.dumps(parameters)}\r\n"
+        f"--{boundary}\r\n"
+        f'Content-Disposition: form-data; name="UpdateFile"; filename="{image.name}"\r\n'
+        "Content-Type: application/octet-stream\r\n\r\n"
+    ).encode('utf-8')
+    epilogue = f"\r\n--{boundary}--\r\n".encode('utf-8')
+    body = UploadBody([preamble, image.view(), epilogue], progress)
+    return body, f"multipart/form-data; boundary={boundary}"
+
+
+class FirmwareUpload:
+    """Загрузка образа на одну цель и отслеживание задачи обновления"""
+
+    def __init__(self, base_url, image, mode=UPDATE_MODE):
+        if mode not in MODES:
+            raise ValueError(f"UPDATE_MODE должен быть одним из {MODES}: {mode}")
+        self.base_url = base_url.rstrip('/')
+        self.api_path = urlsplit(self.base_url).path
+        self.origin = '{0.scheme}://{0.netloc}'.format(urlsplit(self.base_url))
+        self.image = image
+        self.mode = mode
+        self.session = new_session(verify=False, pool_maxsize=2)
+        self.session.auth = (USERNAME, PASSWORD)
+        self.session.headers.update({'OData-Version': '4.0'})
+        self.result = {'target': self.base_url, 'mode': mode, 'bytes': image.size}
+
+    def push_uri(self):
+        response = make_redfish_request(self.session, 'GET', '/UpdateService', base_url=self.base_url)
+        response.raise_for_status()
+        service = response.json()
+        key = 'MultipartHttpPushUri' if self.mode == 'multipart' else 'HttpPushUri'
+        if not service.get(key):
+            raise ValueError(f"UpdateService не поддерживает {key}")
+        return service[key]
+
+    def upload(self):
+        """Отправляет образ; возвращает URI задачи TaskService или None"""
+        uri = self.push_uri()
+        progress = UploadProgress(self.image.size)
+        if self.mode == 'multipart':
+            parameters = {
+                'Targets': [f"{self.api_path}/Managers/bmc"],
+                '@Redfish.OperationApplyTime': UPDATE_APPLY_TIME,
+            }
+            body, content_type = multipart_body(self.image, parameters, progress)
+            progress.total = len(body)
+        elif self.mode == 'raw':
+            body, content_type = UploadBody([self.image.view()], progress), 'application/octet-stream'
+        else:
+            body, content_type = chunked_body(self.image.view(), progress), 'application/octet-stream'
+
+        response = self.session.post(
+            f"{self.origin}{uri}", data=body, headers={'Content-Type': content_type},
+            timeout=(10, UPLOAD_READ_TIMEOUT),
+        )
+        responded = time.perf_counter()
+        seconds = progress.seconds
+        self.result.update({
+            'status': response.status_code,
+            'upload_seconds': round(seconds, 3) if seconds else None,
+            'throughput_mbps': round(progress.sent * 8 / seconds / 1e6, 2) if seconds else None,
+            'response_after_upload_ms': round((responded - progress.finished) * 1000, 1)
+            if progress.finished else None,
+            'progress': progress.timeline,
+        })
+        logger.info(
+            "%s: образ %s (%s байт) отправлен за %s с (%s Мбит/с), HTTP %s",
+            self.base_url, self.image.name, progress.sent, self.result['upload_seconds'],
+            self.result['throughput_mbps'], response.status_code,
+        )
+        if response.status_code not in (200, 202):
+            self.result['error'] = f"HTTP {response.status_code}: {response.text[:200]}"
+            return None
+        return self.task_uri(response)
+
+    @staticmethod
+    def task_uri(response):
+        """Задача из тела ответа (Task) или из Location (монитор задачи .../Monitor)"""
+        try:
+            task = response.json().get('@odata.id')
+        except ValueError:
+            task = None
+        if task and '/TaskService/Tasks/' in task:
+            return task
+        location = response.headers.get('Location')
+        if location:
+            path = urlsplit(location).path
+            return path[:-len('/Monitor')] if path.endswith('/Monitor') else path
+        return None
+
+    def track(self, task_uri):
+        """Опрашивает задачу до завершения; сохраняет смены состояния и процента"""
+        started = time.perf_counter()
+        endpoint = task_uri[len(self.api_path):] if task_uri.startswith(self.api_path) else task_uri
+        timeline = []
+        state = None
+        while time.perf_counter() - started < UPDATE_TIMEOUT:
+            try:
+                response = make_redfish_request(self.session, 'GET', endpoint, base_url=self.base_url)
+                task = response.json() if response.status_code == 200 else {}
+            except (requests.exceptions.RequestException, ValueError) as e:
+                # BMC может перезагружаться после применения образа
+                logger.debug("%s: задача %s недоступна: %s", self.base_url, task_uri, e)
+                task = {}
+            if task:
+                state = task.get('TaskState')
+                point = (state, task.get('PercentComplete'))
+                if not timeline or timeline[-1][1:] != point:
+                    timeline.append((round(time.perf_counter() - started, 1), *point))
+                if state in TERMINAL_STATES:
+                    self.result['messages'] = [message.get('Message') for message in task.get('Messages', [])]
+                    break
+            time.sleep(POLL_INTERVAL)
+        self.result['task'] = {
+            'uri': task_uri,
+            'state': state,
+            'seconds': round(time.perf_counter() - started, 1),
+            'timeline': timeline,
+        }
+        if state != 'Completed':
+            self.result['error'] = f"задача {task_uri}: {state or 'нет ответа'}"
+        logger.info("%s: задача %s завершилась (%s) за %s с", self.base_url, task_uri, state,
+                    self.result['task']['seconds'])
+
+    def run(self):
+        try:
+            task_uri = self.upload()
+            if task_uri:
+                self.track(task_uri)
+            elif 'error' not in self.result:
+                self.result['error'] = 'ответ без задачи TaskService'
+        except (requests.exceptions.RequestException, ValueError) as e:
+            self.result['error'] = f"{type(e).__name__}: {e}"
+            logger.error("%s: загрузка не выполнена: %s", self.base_url, e)
+        finally:
+            self.session.close()
+        return self.result
+
+
+def upload_all(path=FIRMWARE_IMAGE, targets=TARGETS, mode=UPDATE_MODE):
+    """Параллельная загрузка на все цели; возвращает и сохраняет отчет"""
+    image = MappedImage(path)
+    started = time.perf_counter()
+    try:
+        with ThreadPoolExecutor(max_workers=len(targets), thread_name_prefix='firmware') as pool:
+            results = list(pool.map(lambda target: FirmwareUpload(target, image, mode).run(), targets))
+    finally:
+        image.close()
+    elapsed = time.perf_counter() - started
+    # Цели загружаются одновременно: общая скорость - все байты за время самой долгой загрузки
+    durations = [result['upload_seconds'] for result in results if result.get('upload_seconds')]
+    uploaded = sum(result['bytes'] for result in results if result.get('upload_seconds'))
+    report = {
+        'image': path,
+        'bytes': image.size,
+        'mode': mode,
+        'apply_time': UPDATE_APPLY_TIME if mode == 'multipart' else None,
+        'targets': results,
+        'wall_seconds': round(elapsed, 1),
+        'aggregate_upload_mbps': round(uploaded * 8 / max(durations) / 1e6, 2) if durations else None,
+        'failed': [result['target'] for result in results if 'error' in result],
+    }
+    os.makedirs(REPORTS_DIR, exist_ok=True)
+    with open(os.path.join(REPORTS_DIR, 'firmware_upload.json'), 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+    return report
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2 or sys.argv[1] != 'upload':
+        print(__doc__)
+        sys.exit(2)
+
+    from bmc_log import setup_logging
+    setup_logging('firmware')
+    report = upload_all(sys.argv[2] if len(sys.argv) > 2 else FIRMWARE_IMAGE)
+    for result in report['targets']:
+        task = result.get('task', {})
+        print(
+            f"{result['target']}: {result.get('throughput_mbps')} Mbit/s, "
+            f"task {task.get('state')} in {task.get('seconds')} s{' - ' + result['error'] if 'error' in result else ''}"
+        )
+    sys.exit(1 if report['failed'] else 0)
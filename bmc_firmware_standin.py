@@ -0,0 +1,159 @@
+"""Локальная заглушка Redfish UpdateService и TaskService для проверки bmc_firmware.py.
+
+Принимает образ на HttpPushUri (Content-Length или Transfer-Encoding: chunked) и
+на MultipartHttpPushUri, читает тело потоком, считая байты и SHA-256, и не
+хранит его. FIRMWARE_STANDIN_MBPS ограничивает скорость приема, как у BMC в QEMU.
+После приема создается задача, которая за FIRMWARE_STANDIN_APPLY_SECONDS проходит
+от 0 до 100% и завершается (Completed); в Messages - размер и хэш принятого тела.
+
+    python bmc_firmware_standin.py --port 8772
+    FIRMWARE_TARGETS=http://127.0.0.1:8772/redfish/v1 python bmc_firmware.py upload image.bin
+"""
+import argparse
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from bmc_log import setup_logging
+
+logger = logging.getLogger(__name__)
+
+# --- Конфигурация ---
+RATE_MBPS = float(os.getenv('FIRMWARE_STANDIN_MBPS', '0'))  # 0 - без ограничения
+APPLY_SECONDS = float(os.getenv('FIRMWARE_STANDIN_APPLY_SECONDS', '5'))
+READ_SIZE = 64 * 1024
+
+UPDATE_SERVICE = {
+    '@odata.id': '/redfish/v1/UpdateService',
+    'HttpPushUri': '/redfish/v1/UpdateService/update',
+    'MultipartHttpPushUri': '/redfish/v1/UpdateService/update-multipart',
+}
+
+
+class TaskTable:
+    """Задачи обновления: прогресс вычисляется по времени с момента создания"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.tasks = {}
+
+    def create(self, message):
+        with self._lock:
+            task_id = str(len(self.tasks))
+            self.tasks[task_id] = (time.monotonic(), message)
+        return task_id
+
+    def get(self, task_id):
+        with self._lock:
+            if task_id not in self.tasks:
+                return None
+            created, message = self.tasks[task_id]
+        percent = min(100, int((time.monotonic() - created) * 100 / APPLY_SECONDS)) if APPLY_SECONDS else 100
+        return {
+            '@odata.id': f"/redfish/v1/TaskService/Tasks/{task_id}",
+            'Id': task_id,
+            'TaskState': 'Completed' if percent >= 100 else 'Running',
+            'PercentComplete': percent,
+            'Messages': [{'Message': message}],
+        }
+
+
+tasks = TaskTable()
+
+
+class StandinHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        if self.path == UPDATE_SERVICE['@odata.id']:
+            self._send_json(UPDATE_SERVICE)
+        elif self.path.startswith('/redfish/v1/TaskService/Tasks/'):
+            task = tasks.get(self.path.rstrip('/').rsplit('/', 1)[-1])
+            self._send_json(task or {'error': 'not found'}, 200 if task else 404)
+        else:
+            self._send_json({'error': 'not found'}, 404)
+
+    def do_POST(self):
+        if self.path not in (UPDATE_SERVICE['HttpPushUri'], UPDATE_SERVICE['MultipartHttpPushUri']):
+            self._send_json({'error': 'not found'}, 404)
+            return
+        started = time.monotonic()
+        digest = hashlib.sha256()
+        received = 0
+        for block in self._body():
+            digest.update(block)
+            received += len(block)
+            if RATE_MBPS:
+                # Ограничение скорости: не опережать received * 8 / RATE_MBPS секунд
+                delay = started + received * 8 / (RATE_MBPS * 1e6) - time.monotonic()
+                if delay > 0:
+                    time.sleep(delay)
+        message = f"Received {received} bytes, sha256 {digest.hexdigest()}"
+        logger.info("Заглушка UpdateService: %s за %.2f с", message, time.monotonic() - started)
+        task = tasks.get(tasks.create(message))
+        self._send_json(task, 202, {'Location': f"{task['@odata.id']}/Monitor"})
+
+    def _body(self):
+        """Тело запроса блоками: по Content-Length или по чанкам"""
+        if self.headers.get('Transfer-Encoding', '').lower() == 'chunked':
+            while True:
+                size = int(self.rfile.readline().split(b';')[0], 16)
+                if size == 0:
+                    self.rfile.readline()
+                    return
+                remaining = size
+                while remaining:
+                    block = self.rfile.read(min(remaining, READ_SIZE))
+                    remaining -= len(block)
+                    yield block
+                self.rfile.readline()
+        remaining = int(self.headers.get('Content-Length', 0))
+        while remaining:
+            block = self.rfile.read(min(remaining, READ_SIZE))
+            if not block:
+                return
+            remaining -= len(block)
+            yield block
+
+    def _send_json(self, body, status=200, headers=None):
+        data = json.dumps(body).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        logger.debug("Заглушка UpdateService: " + format, *args)
+
+
+def start_standin(host='127.0.0.1', port=0):
+    """Запускает заглушку в фоновом потоке; возвращает (сервер, базовый URL Redfish)"""
+    server = ThreadingHTTPServer((host, port), StandinHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name='firmware-standin', daemon=True).start()
+    base_url = f"http://{host}:{server.server_address[1]}/redfish/v1"
+    logger.info("Заглушка UpdateService запущена: %s", base_url)
+    return server, base_url
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8772)
+    args = parser.parse_args()
+
+    setup_logging('firmware_standin')
+    server = ThreadingHTTPServer((args.host, args.port), StandinHandler)
+    server.daemon_threads = True
+    logger.info("Заглушка UpdateService: http://%s:%s/redfish/v1", args.host, args.port)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        server.shutdown()
@@ -0,0 +1,305 @@
+"""HDR гистограммы задержек с объединяемыми логами.
+
+Гистограмма хранит счетчики в log-linear корзинах: фиксированная память и
+точность перцентилей до HDR_SIGNIFICANT_DIGITS значащих цифр во всем диапазоне.
+Значения записываются в микросекундах. Логи (*.hlog) разных прогонов, воркеров
+Locust и стендов объединяются без потери точности:
+
+    python bmc_hdr.py report reports/latency_*.hlog
+    python bmc_hdr.py merge merged.hlog run1/latency_locust.hlog run2/latency_locust.hlog
+"""
+import base64
+import functools
+import os
+import sys
+import threading
+import time
+import zlib
+from array import array
+
+# --- Конфигурация ---
+REPORTS_DIR = os.getenv('REPORTS_DIR', 'reports')
+SIGNIFICANT_DIGITS = int(os.getenv('HDR_SIGNIFICANT_DIGITS', '3'))
+LOWEST_US = 1
+HIGHEST_US = int(os.getenv('HDR_HIGHEST_US', str(3600 * 10**6)))  # 1 час
+PERCENTILES = (50, 90, 95, 99, 99.9, 100)
+
+
+class HdrHistogram:
+    """Гистограмма с динамическим диапазоном (алгоритм HdrHistogram)"""
+
+    def __init__(self, lowest=LOWEST_US, highest=HIGHEST_US, significant_digits=SIGNIFICANT_DIGITS):
+        if not 1 <= significant_digits <= 5:
+            raise ValueError(f"significant_digits должен быть от 1 до 5: {significant_digits}")
+        if lowest < 1 or highest < 2 * lowest:
+            raise ValueError(f"Недопустимый диапазон: {lowest}..{highest}")
+        self.lowest = lowest
+        self.highest = highest
+        self.significant_digits = significant_digits
+
+        largest_single_unit = 2 * 10**significant_digits
+        self.unit_magnitude = lowest.bit_length() - 1
+        sub_bucket_count_magnitude = (largest_single_unit - 1).bit_length()
+        self.sub_bucket_half_count_magnitude = max(sub_bucket_count_magnitude, 1) - 1
+        self.sub_bucket_count = 1 << (self.sub_bucket_half_count_magnitude + 1)
+        self.sub_bucket_half_count = self.sub_bucket_count // 2
+        self.sub_bucket_mask = (self.sub_bucket_count - 1) << self.unit_magnitude
+
+        smallest_untrackable = self.sub_bucket_count << self.unit_magnitude
+        bucket_count = 1
+        while smallest_untrackable <= highest:
+            smallest_untrackable <<= 1
+            bucket_count += 1
+        self.bucket_count = bucket_count
+
+        self.counts = array('q', bytes(8 * (bucket_count + 1) * self.sub_bucket_half_count))
+        self.total_count = 0
+        self.min_value = None
+        self.max_value = 0
+
+    @property
+    def config(self):
+        return (self.lowest, self.highest, self.significant_digits)
+
+    # --- Индексация ---
+    def _counts_index(self, value):
+        bucket_index = (value | self.sub_bucket_mask).bit_length() - self.unit_magnitude \
+            - (self.sub_bucket_half_count_magnitude + 1)
+        sub_bucket_index = value >> (bucket_index + self.unit_magnitude)
+        return ((bucket_index + 1) << self.sub_bucket_half_count_magnitude) \
+            + (sub_bucket_index - self.sub_bucket_half_count)
+
+    def _value_from_index(self, index):
+        bucket_index = (index >> self.sub_bucket_half_count_magnitude) - 1
+        sub_bucket_index = (index & (self.sub_bucket_half_count - 1)) + self.sub_bucket_half_count
+        if bucket_index < 0:
+            sub_bucket_index -= self.sub_bucket_half_count
+            bucket_index = 0
+        return sub_bucket_index << (bucket_index + self.unit_magnitude), bucket_index
+
+    def _highest_equivalent(self, index):
+        value, bucket_index = self._value_from_index(index)
+        return value + (1 << (bucket_index + self.unit_magnitude)) - 1
+
+    # --- Запись ---
+    def record(self, value, count=1):
+        """Записывает значение (целое, в микросекундах); выходящие за диапазон обрезаются"""
+        value = min(max(int(value), 0), self.highest)
+        self.counts[self._counts_index(value)] += count
+        self.total_count += count
+        if self.min_value is None or value < self.min_value:
+            self.min_value = value
+        if value > self.max_value:
+            self.max_value = value
+
+    def add(self, other):
+        """Добавляет счетчики другой гистограммы"""
+        if other.config == self.config:
+            for index, count in enumerate(other.counts):
+                if count:
+                    self.counts[index] += count
+            self.total_count += other.total_count
+            if other.min_value is not None and (self.min_value is None or other.min_value < self.min_value):
+                self.min_value = other.min_value
+            self.max_value = max(self.max_value, other.max_value)
+        else:
+            for value, count in other.recorded_values():
+                self.record(value, count)
+        return self
+
+    def recorded_values(self):
+        for index, count in enumerate(self.counts):
+            if count:
+                yield self._highest_equivalent(index), count
+
+    # --- Чтение ---
+    def value_at_percentile(self, percentile):
+        if not self.total_count:
+            return None
+        target = max(1, int(percentile / 100.0 * self.total_count + 0.5))
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if seen >= target:
+                return min(self._highest_equivalent(index), self.max_value)
+        return self.max_value
+
+    def percentiles(self, percentiles=PERCENTILES):
+        return {p: self.value_at_percentile(p) for p in percentiles}
+
+    # --- Сериализация ---
+    def encode(self):
+        """Счетчики: zigzag varint, серии нулей - отрицательной длиной; затем zlib + base64"""
+        out = bytearray()
+        zeros = 0
+        last = len(self.counts)
+        while last > 0 and not self.counts[last - 1]:
+            last -= 1
+        for count in self.counts[:last]:
+            if count == 0:
+                zeros += 1
+                continue
+            if zeros:
+                _write_varint(out, -zeros)
+                zeros = 0
+            _write_varint(out, count)
+        return base64.b64encode(zlib.compress(bytes(out), 9)).decode('ascii')
+
+    @classmethod
+    def decode(cls, data, lowest=LOWEST_US, highest=HIGHEST_US, significant_digits=SIGNIFICANT_DIGITS):
+        histogram = cls(lowest, highest, significant_digits)
+        raw = zlib.decompress(base64.b64decode(data))
+        index = 0
+        position = 0
+        while position < len(raw):
+            value, position = _read_varint(raw, position)
+            if value < 0:
+                index += -value
+                continue
+            histogram.counts[index] = value
+            histogram.total_count += value
+            value_at_index = histogram._highest_equivalent(index)
+            if histogram.min_value is None:
+                histogram.min_value, _ = histogram._value_from_index(index)
+            histogram.max_value = value_at_index
+            index += 1
+        return histogram
+
+
+def _write_varint(out, value):
+    value = (value << 1) ^ (value >> 63)  # zigzag
+    while True:
+        byte = value & 0x7F
+        value >>= 7
+        if value:
+            out.append(byte | 0x80)
+        else:
+            out.append(byte)
+            return
+
+
+def _read_varint(data, position):
+    result = 0
+    shift = 0
+    while True:
+        byte = data[position]
+        position += 1
+        result |= (byte & 0x7F) << shift
+        shift += 7
+        if not byte & 0x80:
+            break
+    return (result >> 1) ^ -(result & 1), position
+
+
+class LatencyRecorder:
+    """Набор гистограмм по именам операций с экспортом в hlog"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.histograms = {}
+        self.started = time.time()
+
+    def record(self, name, seconds):
+        with self._lock:
+            histogram = self.histograms.get(name)
+            if histogram is None:
+                histogram = self.histograms[name] = HdrHistogram()
+            # round, а не int(): 0.012345 с * 1e6 = 12344.999... и попадало бы в соседнюю корзину
+            histogram.record(round(seconds * 1e6))
+
+    def timed(self, name):
+        """Декоратор: записывает длительность вызова функции"""
+        def decorator(func):
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                start = time.perf_counter()
+                try:
+                    return func(*args, **kwargs)
+                finally:
+                    self.record(name, time.perf_counter() - start)
+            return wrapper
+        return decorator
+
+    def export(self, path):
+        """Сохраняет все гистограммы в один hlog файл"""
+        with self._lock:
+            histograms = dict(self.histograms)
+        if not histograms:
+            return None
+        write_log(path, histograms, self.started, time.time() - self.started)
+        return path
+
+
+def write_log(path, histograms, start_time, duration):
+    """Формат: заголовок #[...], затем строки Tag=<имя>,<start>,<duration>,<max us>,<base64>"""
+    any_histogram = next(iter(histograms.values()))
+    lowest, highest, digits = any_histogram.config
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(f"#[Unit: us]\n#[Lowest: {lowest}]\n#[Highest: {highest}]\n#[SignificantDigits: {digits}]\n")
+        f.write(f"#[StartTime: {start_time:.3f}]\n")
+        for name, histogram in sorted(histograms.items()):
+            tag = name.replace(',', ' ')
+            f.write(f"Tag={tag},{start_time:.3f},{duration:.3f},{histogram.max_value},{histogram.encode()}\n")
+
+
+def read_log(path):
+    """Читает hlog: возвращает {тег: HdrHistogram}; одинаковые теги суммируются"""
+    header = {}
+    histograms = {}
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            if line.startswith('#['):
+                key, _, value = line[2:-1].partition(': ')
+                header[key] = value
+                continue
+            tag, _start, _duration, max_value, encoded = line.split(',', 4)
+            histogram = HdrHistogram.decode(
+                encoded,
+                lowest=int(header.get('Lowest', LOWEST_US)),
+                highest=int(header.get('Highest', HIGHEST_US)),
+                significant_digits=int(header.get('SignificantDigits', SIGNIFICANT_DIGITS)),
+            )
+            # Точный максимум хранится отдельно от корзин
+            histogram.max_value = int(max_value)
+            tag = tag[len('Tag='):]
+            if tag in histograms:
+                histograms[tag].add(histogram)
+            else:
+                histograms[tag] = histogram
+    return histograms
+
+
+def merge_logs(paths):
+    merged = {}
+    for path in paths:
+        for tag, histogram in read_log(path).items():
+            if tag in merged:
+                merged[tag].add(histogram)
+            else:
+                merged[tag] = histogram
+    return merged
+
+
+latency = LatencyRecorder()
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 3 or sys.argv[1] not in ('report', 'merge'):
+        print(__doc__)
+        sys.exit(2)
+
+    if sys.argv[1] == 'merge':
+        merged = merge_logs(sys.argv[3:])
+        write_log(sys.argv[2], merged, time.time(), 0)
+        print(f"Merged {len(sys.argv) - 3} logs into {sys.argv[2]}")
+    else:
+        merged = merge_logs(sys.argv[2:])
+        for tag, histogram in sorted(merged.items()):
+            values = ", ".join(
+                f"p{p}={value / 1000:.2f}ms" for p, value in histogram.percentiles().items()
+            )
+            print(f"{tag} (n={histogram.total_count}): {values}")
@@ -0,0 +1,836 @@
+"""Клиент IPMI 2.0 (RMCP+) для чтения сенсоров BMC и сравнение задержки с Redfish.
+
+Реализация на чистом Python: RAKP обмен ключами, целостность HMAC-SHA1-96 или
+HMAC-SHA256-128 и шифрование AES-CBC-128 (cipher suite 3 и 17, которые
+поддерживает netipmid OpenBMC). Порт 623/udp BMC проброшен QEMU на 2623.
+
+* Сессии кэшируются по (хост, порт, пользователь, cipher suite) и используются
+  повторно, пока не простаивают дольше IPMI_SESSION_IDLE секунд.
+* Запросы отправляются конвейером: до IPMI_WINDOW запросов в полете,
+  ответы сопоставляются по rqSeq, потерянные отправляются повторно.
+* SDR репозиторий читается один раз на сессию; показания всех сенсоров - одной
+  пачкой Get Sensor Reading.
+
+    python bmc_ipmi.py sensors
+    python bmc_ipmi.py bench
+    IPMI_PORT=9623 python bmc_ipmi_standin.py & IPMI_PORT=9623 python bmc_ipmi.py bench
+"""
+import atexit
+import hashlib
+import hmac
+import json
+import logging
+import math
+import os
+import socket
+import struct
+import sys
+import threading
+import time
+from urllib.parse import urljoin
+
+import requests
+import urllib3
+
+from bmc_hdr import LatencyRecorder
+from bmc_resources import BMCResourceSampler
+from bmc_transport import new_session
+from redfish_stream import iter_members
+
+logger = logging.getLogger(__name__)
+
+urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
+
+# --- Конфигурация ---
+REPORTS_DIR = os.getenv('REPORTS_DIR', 'reports')
+IPMI_HOST = os.getenv('IPMI_HOST', '127.0.0.1')
+IPMI_PORT = int(os.getenv('IPMI_PORT', '2623'))
+IPMI_USERNAME = "root"
+IPMI_PASSWORD = "0penBmc"
+IPMI_CIPHER_SUITE = int(os.getenv('IPMI_CIPHER_SUITE', '17'))
+IPMI_TIMEOUT = float(os.getenv('IPMI_TIMEOUT', '1'))
+IPMI_RETRIES = int(os.getenv('IPMI_RETRIES', '3'))
+# Запросов в полете на сессию (rqSeq - 6 бит, поэтому не больше 63)
+IPMI_WINDOW = min(int(os.getenv('IPMI_WINDOW', '8')), 63)
+# netipmid закрывает сессию после 60 с простоя
+SESSION_IDLE = float(os.getenv('IPMI_SESSION_IDLE', '45'))
+REDFISH_URL = os.getenv('REDFISH_URL', 'https://127.0.0.1:2443/redfish/v1')
+BENCH_SECONDS = float(os.getenv('IPMI_BENCH_SECONDS', '20'))
+
+RMCP_HEADER = bytes((0x06, 0x00, 0xFF, 0x07))
+BMC_ADDRESS = 0x20
+REMOTE_ADDRESS = 0x81
+PRIVILEGE_ADMIN = 0x04
+# RAKP1: поиск пользователя только по имени (бит 4) и роль администратора
+RAKP_ROLE = 0x10 | PRIVILEGE_ADMIN
+
+# Типы payload RMCP+
+PAYLOAD_IPMI = 0x00
+PAYLOAD_OPEN_SESSION_REQUEST = 0x10
+PAYLOAD_OPEN_SESSION_RESPONSE = 0x11
+PAYLOAD_RAKP1 = 0x12
+PAYLOAD_RAKP2 = 0x13
+PAYLOAD_RAKP3 = 0x14
+PAYLOAD_RAKP4 = 0x15
+PAYLOAD_ENCRYPTED = 0x80
+PAYLOAD_AUTHENTICATED = 0x40
+
+# NetFn и команды
+NETFN_SENSOR = 0x04
+NETFN_APP = 0x06
+NETFN_STORAGE = 0x0A
+CMD_GET_SENSOR_READING = 0x2D
+CMD_GET_CHANNEL_AUTH_CAPABILITIES = 0x38
+CMD_CLOSE_SESSION = 0x3C
+CMD_GET_SDR_REPOSITORY_INFO = 0x20
+CMD_RESERVE_SDR_REPOSITORY = 0x22
+CMD_GET_SDR = 0x23
+
+# Completion codes, при которых Get SDR читается частями
+CC_CANNOT_RETURN_BYTES = (0xCA, 0xFF, 0xC7, 0xC8)
+CC_RESERVATION_CANCELED = 0xC5
+SDR_CHUNK = 16
+
+# cipher suite -> (RAKP алгоритм, алгоритм целостности, шифрование, хэш, длина ICV)
+CIPHER_SUITES = {
+    3: (0x01, 0x01, 0x01, hashlib.sha1, 12),     # RAKP-HMAC-SHA1, HMAC-SHA1-96, AES-CBC-128
+    17: (0x03, 0x04, 0x01, hashlib.sha256, 16),  # RAKP-HMAC-SHA256, HMAC-SHA256-128, AES-CBC-128
+}
+
+# Базовые единицы IPMI (Table 43-15), которые встречаются у сенсоров OpenBMC
+UNITS = {1: 'Celsius', 2: 'Fahrenheit', 4: 'Volts', 5: 'Amps', 6: 'Watts', 18: 'RPM', 19: 'Hz'}
+
+LINEARIZATION = {
+    0: lambda x: x,
+    1: math.log,
+    2: math.log10,
+    3: math.log2,
+    4: math.exp,
+    5: lambda x: 10 ** x,
+    6: lambda x: 2 ** x,
+    7: lambda x: 1 / x,
+    8: lambda x: x ** 2,
+    9: lambda x: x ** 3,
+    10: math.sqrt,
+    11: lambda x: math.copysign(abs(x) ** (1 / 3), x),
+}
+
+
+class IPMIError(Exception):
+    """Ошибка протокола или ненулевой completion code"""
+
+    def __init__(self, message, completion_code=None):
+        super().__init__(message)
+        self.completion_code = completion_code
+
+
+# --- AES-128 (FIPS-197) ---
+def _rotl8(value, shift):
+    return ((value << shift) | (value >> (8 - shift))) & 0xFF
+
+
+def _build_sbox():
+    sbox = [0] * 256
+    p = q = 1
+    while True:
+        # p умножается на 3, q делится на 3 в GF(2^8): q = p^-1
+        p = (p ^ (p << 1) ^ (0x1B if p & 0x80 else 0)) & 0xFF
+        q ^= q << 1
+        q ^= q << 2
+        q ^= q << 4
+        q &= 0xFF
+        if q & 0x80:
+            q ^= 0x09
+        sbox[p] = q ^ _rotl8(q, 1) ^ _rotl8(q, 2) ^ _rotl8(q, 3) ^ _rotl8(q, 4) ^ 0x63
+        if p == 1:
+            break
+    sbox[0] = 0x63
+    return sbox
+
+
+def _gmul(a, b):
+    result = 0
+    while b:
+        if b & 1:
+            result ^= a
+        a = ((a << 1) ^ 0x1B) & 0xFF if a & 0x80 else a << 1
+        b >>= 1
+    return result
+
+
+SBOX = _build_sbox()
+INV_SBOX = [0] * 256
+for _i, _v in enumerate(SBOX):
+    INV_SBOX[_v] = _i
+MUL = {n: [_gmul(x, n) for x in range(256)] for n in (2, 3, 9, 11, 13, 14)}
+SHIFT_ROWS = [(r + 4 * ((c + r) % 4)) for c in range(4) for r in range(4)]
+INV_SHIFT_ROWS = [(r + 4 * ((c - r) % 4)) for c in range(4) for r in range(4)]
+
+
+class AES128:
+    """Блочный шифр AES-128; сообщения IPMI короткие, поэтому скорость не критична"""
+
+    def __init__(self, key):
+        if len(key) != 16:
+            raise ValueError("AES-128: ключ должен быть 16 байт")
+        words = [list(key[i:i + 4]) for i in range(0, 16, 4)]
+        rcon = 1
+        for i in range(4, 44):
+            word = list(words[i - 1])
+            if i % 4 == 0:
+                word = [SBOX[b] for b in word[1:] + word[:1]]
+                word[0] ^= rcon
+                rcon = _gmul(rcon, 2)
+            words.append([a ^ b for a, b in zip(words[i - 4], word)])
+        self.round_keys = [sum(words[r * 4:r * 4 + 4], []) for r in range(11)]
+
+    def encrypt_block(self, block):
+        state = [b ^ k for b, k in zip(block, self.round_keys[0])]
+        m2, m3 = MUL[2], MUL[3]
+        for rnd in range(1, 11):
+            state = [SBOX[state[i]] for i in SHIFT_ROWS]
+            if rnd != 10:
+                mixed = []
+                for c in range(0, 16, 4):
+                    a0, a1, a2, a3 = state[c:c + 4]
+                    mixed += (
+                        m2[a0] ^ m3[a1] ^ a2 ^ a3,
+                        a0 ^ m2[a1] ^ m3[a2] ^ a3,
+                        a0 ^ a1 ^ m2[a2] ^ m3[a3],
+                        m3[a0] ^ a1 ^ a2 ^ m2[a3],
+                    )
+                state = mixed
+            state = [b ^ k for b, k in zip(state, self.round_keys[rnd])]
+        return bytes(state)
+
+    def decrypt_block(self, block):
+        state = [b ^ k for b, k in zip(block, self.round_keys[10])]
+        m9, m11, m13, m14 = MUL[9], MUL[11], MUL[13], MUL[14]
+        for rnd in range(9, -1, -1):
+            state = [INV_SBOX[state[i]] for i in INV_SHIFT_ROWS]
+            state = [b ^ k for b, k in zip(state, self.round_keys[rnd])]
+            if rnd:
+                mixed = []
+                for c in range(0, 16, 4):
+                    a0, a1, a2, a3 = state[c:c + 4]
+                    mixed += (
+                        m14[a0] ^ m11[a1] ^ m13[a2] ^ m9[a3],
+                        m9[a0] ^ m14[a1] ^ m11[a2] ^ m13[a3],
+                        m13[a0] ^ m9[a1] ^ m14[a2] ^ m11[a3],
+                        m11[a0] ^ m13[a1] ^ m9[a2] ^ m14[a3],
+                    )
+                state = mixed
+        return bytes(state)
+
+    def encrypt_cbc(self, iv, data):
+        out = bytearray()
+        previous = iv
+        for i in range(0, len(data), 16):
+            previous = self.encrypt_block(bytes(a ^ b for a, b in zip(data[i:i + 16], previous)))
+            out += previous
+        return bytes(out)
+
+    def decrypt_cbc(self, iv, data):
+        out = bytearray()
+        previous = iv
+        for i in range(0, len(data), 16):
+            block = data[i:i + 16]
+            out += bytes(a ^ b for a, b in zip(self.decrypt_block(block), previous))
+            previous = block
+        return bytes(out)
+
+
+# --- Формат сообщений ---
+def checksum(data):
+    return -sum(data) & 0xFF
+
+
+def ipmi_request(netfn, cmd, data, seq):
+    """Сообщение IPMI: rsAddr, netFn/LUN, cs, rqAddr, rqSeq/LUN, cmd, данные, cs"""
+    header = bytes((BMC_ADDRESS, netfn << 2))
+    body = bytes((REMOTE_ADDRESS, (seq & 0x3F) << 2, cmd)) + bytes(data)
+    return header + bytes((checksum(header),)) + body + bytes((checksum(body),))
+
+
+def ipmi_response(request, completion_code, data=b''):
+    """Ответ на сообщение request (используется заглушкой)"""
+    netfn, seq, cmd = request[1] >> 2, request[4] >> 2, request[5]
+    header = bytes((REMOTE_ADDRESS, (netfn | 1) << 2))
+    body = bytes((BMC_ADDRESS, seq << 2, cmd, completion_code)) + bytes(data)
+    return header + bytes((checksum(header),)) + body + bytes((checksum(body),))
+
+
+def parse_ipmi_message(message):
+    """-> (netfn, rqSeq, cmd, данные после cmd); проверяет контрольные суммы"""
+    if len(message) < 7 or checksum(message[:2]) != message[2] or checksum(message[3:-1]) != message[-1]:
+        raise IPMIError("Неверная контрольная сумма сообщения IPMI")
+    return message[1] >> 2, message[4] >> 2, message[5], message[6:-1]
+
+
+def presession_packet(message):
+    """Пакет IPMI 1.5 без сессии (Get Channel Authentication Capabilities)"""
+    return RMCP_HEADER + bytes((0x00,)) + bytes(8) + bytes((len(message),)) + message
+
+
+def parse_presession_packet(packet):
+    if packet[:4] != RMCP_HEADER or packet[4] != 0x00:
+        raise IPMIError("Ожидался пакет IPMI 1.5")
+    return packet[14:14 + packet[13]]
+
+
+class SessionKeys:
+    """Ключи активной сессии: K1 для целостности, K2 (16 байт) для AES"""
+
+    def __init__(self, cipher_suite, sik):
+        _, _, _, self.hash, self.icv_length = CIPHER_SUITES[cipher_suite]
+        self.k1 = hmac.new(sik, b'\x01' * 20, self.hash).digest()
+        self.aes = AES128(hmac.new(sik, b'\x02' * 20, self.hash).digest()[:16])
+
+    def auth_code(self, data):
+        return hmac.new(self.k1, data, self.hash).digest()[:self.icv_length]
+
+
+def v2_packet(payload_type, session_id, sequence, payload, keys=None):
+    """Пакет RMCP+; с keys payload шифруется и подписывается"""
+    if keys is not None:
+        pad = (16 - (len(payload) + 1) % 16) % 16
+        plain = payload + bytes(range(1, pad + 1)) + bytes((pad,))
+        iv = os.urandom(16)
+        payload = iv + keys.aes.encrypt_cbc(iv, plain)
+        payload_type |= PAYLOAD_ENCRYPTED | PAYLOAD_AUTHENTICATED
+    header = struct.pack('<BBIIH', 0x06, payload_type, session_id, sequence, len(payload))
+    packet = header + payload
+    if keys is not None:
+        pad = (4 - (len(packet) + 2) % 4) % 4
+        packet += b'\xFF' * pad + bytes((pad, 0x07))
+        packet += keys.auth_code(packet)
+    return RMCP_HEADER + packet
+
+
+def parse_v2_packet(packet, keys=None):
+    """-> (тип payload, session id, sequence, payload); проверяет подпись и расшифровывает"""
+    if packet[:4] != RMCP_HEADER or len(packet) < 16 or packet[4] != 0x06:
+        raise IPMIError("Ожидался пакет RMCP+")
+    payload_type, session_id, sequence, length = struct.unpack_from('<BIIH', packet, 5)
+    payload = packet[16:16 + length]
+    if payload_type & PAYLOAD_AUTHENTICATED:
+        if keys is None:
+            raise IPMIError("Подписанный пакет без ключей сессии")
+        signed = packet[4:len(packet) - keys.icv_length]
+        if not hmac.compare_digest(keys.auth_code(signed), packet[len(packet) - keys.icv_length:]):
+            raise IPMIError("Неверная подпись пакета RMCP+")
+    if payload_type & PAYLOAD_ENCRYPTED:
+        if keys is None or len(payload) < 32 or len(payload) % 16:
+            raise IPMIError("Некорректный зашифрованный payload")
+        plain = keys.aes.decrypt_cbc(payload[:16], payload[16:])
+        payload = plain[:len(plain) - 1 - plain[-1]]
+    return payload_type & 0x3F, session_id, sequence, payload
+
+
+def algorithm_payloads(cipher_suite):
+    auth, integrity, confidentiality, _, _ = CIPHER_SUITES[cipher_suite]
+    return b''.join(
+        bytes((kind, 0, 0, 0x08, algorithm, 0, 0, 0))
+        for kind, algorithm in ((0, auth), (1, integrity), (2, confidentiality))
+    )
+
+
+def user_key(password):
+    """K_uid: пароль, дополненный нулями до 20 байт"""
+    return password.encode('utf-8')[:20].ljust(20, b'\x00')
+
+
+
+
+# --- Сессия ---
+class IPMISession:
+    """Сессия RMCP+ поверх UDP с конвейерной отправкой запросов"""
+
+    def __init__(self, host=IPMI_HOST, port=IPMI_PORT, username=IPMI_USERNAME, password=IPMI_PASSWORD,
+                 cipher_suite=IPMI_CIPHER_SUITE, timeout=IPMI_TIMEOUT, retries=IPMI_RETRIES):
+        if cipher_suite not in CIPHER_SUITES:
+            raise ValueError(f"Неподдерживаемый cipher suite: {cipher_suite}")
+        self.address = (host, port)
+        self.username = username
+        self.password = password
+        self.cipher_suite = cipher_suite
+        self.timeout = timeout
+        self.retries = retries
+        self.socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.socket.connect(self.address)
+        self._lock = threading.Lock()
+        self.keys = None
+        self.session_id = 0
+        self.console_session_id = struct.unpack('<I', os.urandom(4))[0] | 1
+        self.sequence = 0
+        self.rq_seq = 0
+        self.last_used = time.monotonic()
+        self.sdr = None
+        self.stats = {'requests': 0, 'retransmits': 0, 'open_seconds': None}
+
+    # --- Обмен пакетами ---
+    def _exchange(self, packet, parse):
+        """Отправляет пакет без сессии и ждет разбираемый ответ (с повторами)"""
+        for attempt in range(self.retries + 1):
+            if attempt:
+                self.stats['retransmits'] += 1
+            self.socket.send(packet)
+            deadline = time.monotonic() + self.timeout
+            while True:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self.socket.settimeout(remaining)
+                try:
+                    result = parse(self.socket.recv(1024))
+                except socket.timeout:
+                    break
+                except IPMIError as e:
+                    logger.debug("Пропущен пакет: %s", e)
+                    continue
+                if result is not None:
+                    return result
+        raise IPMIError(f"Нет ответа от {self.address[0]}:{self.address[1]}")
+
+    def _session_payload(self, packet, expected_type, tag):
+        payload_type, _, _, payload = parse_v2_packet(packet)
+        if payload_type != expected_type or payload[0] != tag:
+            return None
+        if payload[1] != 0:
+            raise IPMIError(f"RMCP+ status 0x{payload[1]:02x} (payload 0x{payload_type:02x})", payload[1])
+        return payload
+
+    def open(self):
+        """Get Channel Authentication Capabilities, Open Session и RAKP 1-4"""
+        started = time.perf_counter()
+        request = ipmi_request(NETFN_APP, CMD_GET_CHANNEL_AUTH_CAPABILITIES, (0x8E, PRIVILEGE_ADMIN), 0)
+
+        def parse_caps(packet):
+            _, _, cmd, data = parse_ipmi_message(parse_presession_packet(packet))
+            return data if cmd == CMD_GET_CHANNEL_AUTH_CAPABILITIES else None
+
+        caps = self._exchange(presession_packet(request), parse_caps)
+        if caps[0] != 0:
+            raise IPMIError(f"Get Channel Auth Capabilities: 0x{caps[0]:02x}", caps[0])
+        if not caps[2] & 0x80:
+            raise IPMIError("BMC не поддерживает IPMI 2.0 (RMCP+)")
+
+        tag = 1
+        payload = bytes((tag, 0, 0, 0)) + struct.pack('<I', self.console_session_id) \
+            + algorithm_payloads(self.cipher_suite)
+        response = self._exchange(
+            v2_packet(PAYLOAD_OPEN_SESSION_REQUEST, 0, 0, payload),
+            lambda packet: self._session_payload(packet, PAYLOAD_OPEN_SESSION_RESPONSE, tag),
+        )
+        managed_id = struct.unpack_from('<I', response, 8)[0]
+
+        tag = 2
+        name = self.username.encode('utf-8')
+        role = RAKP_ROLE
+        console_random = os.urandom(16)
+        rakp1 = bytes((tag, 0, 0, 0)) + struct.pack('<I', managed_id) + console_random \
+            + bytes((role, 0, 0, len(name))) + name
+        rakp2 = self._exchange(
+            v2_packet(PAYLOAD_RAKP1, 0, 0, rakp1),
+            lambda packet: self._session_payload(packet, PAYLOAD_RAKP2, tag),
+        )
+        digest = CIPHER_SUITES[self.cipher_suite][3]
+        kuid = user_key(self.password)
+        managed_random, guid, key_auth = rakp2[8:24], rakp2[24:40], rakp2[40:]
+        ids = struct.pack('<II', self.console_session_id, managed_id)
+        expected = hmac.new(
+            kuid, ids + console_random + managed_random + guid + bytes((role, len(name))) + name, digest
+        ).digest()
+        if not hmac.compare_digest(expected, key_auth):
+            raise IPMIError("RAKP2: неверный код аутентификации (пароль?)")
+
+        tag = 3
+        auth_code = hmac.new(
+            kuid, managed_random + struct.pack('<I', self.console_session_id) + bytes((role, len(name))) + name,
+            digest,
+        ).digest()
+        rakp3 = bytes((tag, 0, 0, 0)) + struct.pack('<I', managed_id) + auth_code
+        rakp4 = self._exchange(
+            v2_packet(PAYLOAD_RAKP3, 0, 0, rakp3),
+            lambda packet: self._session_payload(packet, PAYLOAD_RAKP4, tag),
+        )
+        sik = hmac.new(kuid, console_random + managed_random + bytes((role, len(name))) + name, digest).digest()
+        keys = SessionKeys(self.cipher_suite, sik)
+        icv = hmac.new(sik, console_random + struct.pack('<I', managed_id) + guid, digest).digest()
+        if not hmac.compare_digest(icv[:keys.icv_length], rakp4[8:8 + keys.icv_length]):
+            raise IPMIError("RAKP4: неверный integrity check value")
+
+        self.keys = keys
+        self.session_id = managed_id
+        self.sequence = 0
+        self.last_used = time.monotonic()
+        self.stats['open_seconds'] = round(time.perf_counter() - started, 4)
+        logger.info(
+            "IPMI сессия 0x%08x открыта (cipher suite %s) за %.1f мс",
+            managed_id, self.cipher_suite, self.stats['open_seconds'] * 1000,
+        )
+        return self
+
+    def _send_request(self, netfn, cmd, data, seq):
+        self.sequence = (self.sequence + 1) & 0xFFFFFFFF or 1
+        self.socket.send(v2_packet(
+            PAYLOAD_IPMI, self.session_id, self.sequence, ipmi_request(netfn, cmd, data, seq), self.keys
+        ))
+
+    def request_many(self, requests_list, window=IPMI_WINDOW):
+        """Конвейер: [(netfn, cmd, data)] -> [(completion code, данные)] в том же порядке"""
+        if self.keys is None:
+            raise IPMIError("Сессия не открыта")
+        with self._lock:
+            results = [None] * len(requests_list)
+            pending = {}  # rqSeq -> [индекс, время отправки, попытка]
+            queue = list(range(len(requests_list)))
+            queue.reverse()
+            while queue or pending:
+                while queue and len(pending) < window:
+                    index = queue.pop()
+                    self.rq_seq = (self.rq_seq + 1) % 64
+                    netfn, cmd, data = requests_list[index]
+                    self._send_request(netfn, cmd, data, self.rq_seq)
+                    pending[self.rq_seq] = [index, time.monotonic(), 0]
+                self._receive(requests_list, pending, results)
+            self.stats['requests'] += len(requests_list)
+            self.last_used = time.monotonic()
+            return results
+
+    def _receive(self, requests_list, pending, results):
+        deadline = min(sent + self.timeout for _, sent, _ in pending.values())
+        self.socket.settimeout(max(deadline - time.monotonic(), 0.001))
+        try:
+            packet = self.socket.recv(4096)
+        except socket.timeout:
+            now = time.monotonic()
+            for seq, entry in pending.items():
+                index, sent, attempt = entry
+                if now - sent < self.timeout:
+                    continue
+                if attempt >= self.retries:
+                    netfn, cmd, _ = requests_list[index]
+                    raise IPMIError(f"Нет ответа на netfn 0x{netfn:02x} cmd 0x{cmd:02x}")
+                # Повтор с тем же rqSeq, но новым номером пакета сессии
+                self._send_request(*requests_list[index], seq)
+                entry[1:] = [now, attempt + 1]
+                self.stats['retransmits'] += 1
+            return
+        try:
+            payload_type, session_id, _, payload = parse_v2_packet(packet, self.keys)
+            if payload_type != PAYLOAD_IPMI or session_id != self.console_session_id:
+                return
+            _, seq, cmd, data = parse_ipmi_message(payload)
+        except IPMIError as e:
+            logger.debug("Пропущен пакет: %s", e)
+            return
+        entry = pending.get(seq)
+        if entry is None or requests_list[entry[0]][1] != cmd or not data:
+            return  # дубликат ответа на повторную отправку
+        del pending[seq]
+        results[entry[0]] = (data[0], data[1:])
+
+    def request(self, netfn, cmd, data=b''):
+        """Один запрос; ненулевой completion code -> IPMIError"""
+        completion_code, data = self.request_many([(netfn, cmd, data)])[0]
+        if completion_code != 0:
+            raise IPMIError(f"netfn 0x{netfn:02x} cmd 0x{cmd:02x}: completion code 0x{completion_code:02x}",
+                            completion_code)
+        return data
+
+    def idle(self):
+        return time.monotonic() - self.last_used
+
+    def close(self):
+        if self.keys is not None:
+            try:
+                self.request(NETFN_APP, CMD_CLOSE_SESSION, struct.pack('<I', self.session_id))
+            except IPMIError as e:
+                logger.debug("Close Session: %s", e)
+            self.keys = None
+        self.socket.close()
+
+
+# --- Кэш сессий ---
+_sessions = {}
+_sessions_lock = threading.Lock()
+session_cache_stats = {'hits': 0, 'opened': 0, 'expired': 0}
+
+
+def get_session(host=IPMI_HOST, port=IPMI_PORT, username=IPMI_USERNAME, password=IPMI_PASSWORD,
+                cipher_suite=IPMI_CIPHER_SUITE):
+    """Открытая сессия из кэша или новая, если прежняя простаивала дольше SESSION_IDLE"""
+    key = (host, port, username, cipher_suite)
+    with _sessions_lock:
+        session = _sessions.get(key)
+        if session is not None and session.keys is not None and session.idle() < SESSION_IDLE:
+            session_cache_stats['hits'] += 1
+            return session
+        if session is not None:
+            session_cache_stats['expired'] += 1
+            session.close()
+        session = IPMISession(host, port, username, password, cipher_suite).open()
+        session_cache_stats['opened'] += 1
+        _sessions[key] = session
+        return session
+
+
+def close_sessions():
+    with _sessions_lock:
+        for session in _sessions.values():
+            session.close()
+        _sessions.clear()
+
+
+atexit.register(close_sessions)
+
+
+# --- SDR и сенсоры ---
+def _signed(value, bits):
+    return value - (1 << bits) if value & (1 << (bits - 1)) else value
+
+
+class SensorRecord:
+    """Сенсор из SDR (Full или Compact Sensor Record) и перевод сырого показания"""
+
+    def __init__(self, record):
+        self.record_type = record[3]
+        self.number = record[7]
+        self.owner = record[5]
+        self.lun = record[6] & 0x03
+        self.sensor_type = record[12]
+        self.analog_format = record[20] >> 6
+        self.unit = UNITS.get(record[21], f"unit {record[21]}")
+        name_offset = 47 if self.record_type == 0x01 else 31
+        self.name = record[name_offset + 1:name_offset + 1 + (record[name_offset] & 0x1F)].decode('latin-1')
+        if self.record_type == 0x01:
+            self.linearization = record[23] & 0x7F
+            self.m = _signed(record[24] | ((record[25] & 0xC0) << 2), 10)
+            self.b = _signed(record[26] | ((record[27] & 0xC0) << 2), 10)
+            self.r_exp = _signed(record[29] >> 4, 4)
+            self.b_exp = _signed(record[29] & 0x0F, 4)
+        else:
+            self.linearization, self.m, self.b, self.r_exp, self.b_exp = 0, 1, 0, 0, 0
+
+    def convert(self, raw):
+        """y = L[(M * x + B * 10^Bexp) * 10^Rexp]"""
+        if self.analog_format == 1:
+            raw = raw - 0xFF if raw & 0x80 else raw
+        elif self.analog_format == 2:
+            raw = _signed(raw, 8)
+        value = (self.m * raw + self.b * 10 ** self.b_exp) * 10 ** self.r_exp
+        return round(LINEARIZATION.get(self.linearization, LINEARIZATION[0])(value), 3)
+
+    def as_dict(self):
+        return {'number': self.number, 'name': self.name, 'unit': self.unit, 'sensor_type': self.sensor_type}
+
+
+class IPMIClient:
+    """Чтение SDR и показаний сенсоров через кэшированную сессию"""
+
+    def __init__(self, session=None):
+        self.session = session or get_session()
+
+    def _reserve(self):
+        return self.session.request(NETFN_STORAGE, CMD_RESERVE_SDR_REPOSITORY)[:2]
+
+    def _read_record(self, reservation, record_id):
+        """Запись SDR целиком или по SDR_CHUNK байт, если BMC не отдает всю сразу"""
+        key = struct.pack('<H', record_id)
+        code, data = self.session.request_many([(NETFN_STORAGE, CMD_GET_SDR, reservation + key + b'\x00\xFF')])[0]
+        if code == 0:
+            return data[:2], data[2:]
+        if code not in CC_CANNOT_RETURN_BYTES:
+            raise IPMIError(f"Get SDR 0x{record_id:04x}: completion code 0x{code:02x}", code)
+        header = self.session.request(NETFN_STORAGE, CMD_GET_SDR, reservation + key + b'\x00\x05')
+        next_id, record = header[:2], bytearray(header[2:])
+        length = record[4] + 5
+        # Части одной записи не зависят друг от друга и читаются конвейером
+        chunks = self.session.request_many([
+            (NETFN_STORAGE, CMD_GET_SDR, reservation + key + bytes((offset, min(SDR_CHUNK, length - offset))))
+            for offset in range(5, length, SDR_CHUNK)
+        ])
+        for code, chunk in chunks:
+            if code != 0:
+                raise IPMIError(f"Get SDR 0x{record_id:04x}: completion code 0x{code:02x}", code)
+            record += chunk[2:]
+        return next_id, bytes(record)
+
+    def sdr_records(self):
+        """Все сенсоры SDR репозитория (читается один раз на сессию)"""
+        if self.session.sdr is not None:
+            return self.session.sdr
+        records = []
+        reservation = self._reserve()
+        record_id = 0
+        while record_id != 0xFFFF:
+            try:
+                next_id, record = self._read_record(reservation, record_id)
+            except IPMIError as e:
+                if e.completion_code != CC_RESERVATION_CANCELED:
+                    raise
+                reservation = self._reserve()
+                continue
+            if len(record) > 5 and record[3] in (0x01, 0x02):
+                records.append(SensorRecord(record))
+            record_id = struct.unpack('<H', next_id)[0]
+        self.session.sdr = records
+        logger.info("SDR: %s сенсоров", len(records))
+        return records
+
+    def read_sensor(self, sensor):
+        code, data = self.session.request_many([(NETFN_SENSOR, CMD_GET_SENSOR_READING, bytes((sensor.number,)))])[0]
+        return self._reading(sensor, code, data)
+
+    def read_sensors(self, sensors=None):
+        """Показания всех сенсоров одной конвейерной пачкой: {имя: значение или None}"""
+        sensors = self.sdr_records() if sensors is None else sensors
+        results = self.session.request_many([
+            (NETFN_SENSOR, CMD_GET_SENSOR_READING, bytes((sensor.number,))) for sensor in sensors
+        ])
+        return {sensor.name: self._reading(sensor, code, data) for sensor, (code, data) in zip(sensors, results)}
+
+    @staticmethod
+    def _reading(sensor, completion_code, data):
+        # Бит 5 - показание недоступно, бит 6 = 0 - опрос сенсора отключен
+        if completion_code != 0 or len(data) < 2 or data[1] & 0x20 or not data[1] & 0x40:
+            return None
+        return sensor.convert(data[0])
+
+
+# --- Сравнение с Redfish ---
+def _percentiles(histogram):
+    return {f"p{p}": round(value / 1000, 3) for p, value in histogram.percentiles((50, 95, 99)).items()}
+
+
+def redfish_sensor_urls(session, base_url=REDFISH_URL):
+    """URI сенсоров всех шасси (/Chassis/<id>/Sensors)"""
+    urls = []
+    for chassis in iter_members(session, f"{base_url}/Chassis"):
+        chassis_url = urljoin(base_url, chassis['@odata.id'])
+        response = session.get(chassis_url, timeout=10)
+        response.raise_for_status()
+        sensors = response.json().get('Sensors', {}).get('@odata.id')
+        if sensors:
+            urls += [
+                urljoin(base_url, member['@odata.id'])
+                for member in iter_members(session, urljoin(base_url, sensors))
+            ]
+    return urls
+
+
+class ReadPathBenchmark:
+    """Задержка чтения сенсора и нагрузка на CPU BMC: IPMI против Redfish
+
+    Каждая фаза длится BENCH_SECONDS: сенсоры читаются по одному (задержка на
+    сенсор) и пачками (IPMI конвейером, Redfish последовательными GET). CPU BMC
+    усредняется по выборкам ManagerDiagnosticData за время фазы.
+    """
+
+    def __init__(self, duration=BENCH_SECONDS):
+        self.duration = duration
+        self.latency = LatencyRecorder()
+        self.sampler = BMCResourceSampler(1)
+        self.report = {'duration_s': duration, 'ipmi': {}, 'redfish': {}}
+
+    def _phase(self, name, read_one, read_all, sensors):
+        started = time.time()
+        deadline = time.perf_counter() + self.duration
+        rounds = 0
+        while time.perf_counter() < deadline:
+            for sensor in sensors:
+                start = time.perf_counter()
+                read_one(sensor)
+                self.latency.record(f"{name} per sensor", time.perf_counter() - start)
+            start = time.perf_counter()
+            read_all()
+            self.latency.record(f"{name} all sensors", time.perf_counter() - start)
+            rounds += 1
+        ended = time.time()
+        user = self.sampler.mean('cpu_user_percent', started, ended)
+        kernel = self.sampler.mean('cpu_kernel_percent', started, ended)
+        return {
+            'sensors': len(sensors),
+            'rounds': rounds,
+            'per_sensor_ms': _percentiles(self.latency.histograms[f"{name} per sensor"]),
+            'all_sensors_ms': _percentiles(self.latency.histograms[f"{name} all sensors"]),
+            'bmc_cpu_user_percent': user,
+            'bmc_cpu_kernel_percent': kernel,
+        }
+
+    def run_ipmi(self):
+        started = time.perf_counter()
+        client = IPMIClient()
+        self.report['ipmi']['session_open_ms'] = round((time.perf_counter() - started) * 1000, 2)
+        started = time.perf_counter()
+        sensors = client.sdr_records()
+        self.report['ipmi']['sdr_read_ms'] = round((time.perf_counter() - started) * 1000, 2)
+        self.report['ipmi'].update(self._phase('ipmi', client.read_sensor, client.read_sensors, sensors))
+        self.report['ipmi']['session'] = dict(client.session.stats)
+        self.report['ipmi']['session_cache'] = dict(session_cache_stats)
+
+    def run_redfish(self):
+        session = new_session(verify=False)
+        session.auth = (IPMI_USERNAME, IPMI_PASSWORD)
+        urls = redfish_sensor_urls(session)
+        if not urls:
+            raise IPMIError("Redfish: сенсоры не найдены")
+
+        def read_one(url):
+            response = session.get(url, timeout=10)
+            response.raise_for_status()
+            return response.json().get('Reading')
+
+        def read_all():
+            return [read_one(url) for url in urls]
+
+        self.report['redfish'].update(self._phase('redfish', read_one, read_all, urls))
+        session.close()
+
+    def run(self):
+        self.sampler.start()
+        try:
+            for name, phase in (('ipmi', self.run_ipmi), ('redfish', self.run_redfish)):
+                try:
+                    phase()
+                except (IPMIError, OSError, requests.exceptions.RequestException) as e:
+                    logger.warning("Фаза %s не выполнена: %s", name, e)
+                    self.report[name]['error'] = str(e)
+        finally:
+            self.sampler.stop()
+        self.save()
+        return self.report
+
+    def save(self):
+        os.makedirs(REPORTS_DIR, exist_ok=True)
+        with open(os.path.join(REPORTS_DIR, 'ipmi_vs_redfish.json'), 'w', encoding='utf-8') as f:
+            json.dump(self.report, f, indent=2, ensure_ascii=False)
+        self.latency.export(os.path.join(REPORTS_DIR, 'latency_ipmi_vs_redfish.hlog'))
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2 or sys.argv[1] not in ('sensors', 'bench'):
+        print(__doc__)
+        sys.exit(2)
+
+    from bmc_log import setup_logging
+    setup_logging('ipmi')
+    if sys.argv[1] == 'sensors':
+        client = IPMIClient()
+        units = {sensor.name: sensor.unit for sensor in client.sdr_records()}
+        for name, value in client.read_sensors().items():
+            print(f"{name:32s} {'n/a' if value is None else value} {units[name]}")
+    else:
+        report = ReadPathBenchmark().run()
+        for side in ('ipmi', 'redfish'):
+            data = report[side]
+            if 'error' in data:
+                print(f"{side}: {data['error']}")
+            else:
+                cpu = data['bmc_cpu_user_percent']
+                print(
+                    f"{side}: per sensor p50 {data['per_sensor_ms']['p50']} ms, "
+                    f"all {data['sensors']} sensors p50 {data['all_sensors_ms']['p50']} ms, "
+                    f"BMC CPU user {'n/a' if cpu is None else f'{cpu}%'}"
+                )
@@ -0,0 +1,273 @@
+"""Локальная заглушка IPMI 2.0 (RMCP+) по UDP для прогонов без QEMU.
+
+Поддерживает то, что использует bmc_ipmi.py: Get Channel Authentication
+Capabilities, открытие сессии с RAKP (cipher suite 3 и 17), шифрованные
+сообщения, SDR репозиторий (Full и Compact Sensor Records) и Get Sensor Reading.
+Показания сенсоров медленно меняются, чтобы сравнение не читало константы.
+
+    python bmc_ipmi_standin.py --port 9623
+    IPMI_PORT=9623 python bmc_ipmi.py sensors
+"""
+import argparse
+import hmac
+import logging
+import os
+import random
+import socket
+import struct
+import threading
+
+from bmc_ipmi import (
+    CIPHER_SUITES, CMD_CLOSE_SESSION, CMD_GET_CHANNEL_AUTH_CAPABILITIES, CMD_GET_SDR,
+    CMD_GET_SDR_REPOSITORY_INFO, CMD_GET_SENSOR_READING, CMD_RESERVE_SDR_REPOSITORY, IPMI_PASSWORD,
+    IPMI_USERNAME, IPMIError, NETFN_APP, NETFN_SENSOR, NETFN_STORAGE, PAYLOAD_IPMI, PAYLOAD_OPEN_SESSION_REQUEST,
+    PAYLOAD_OPEN_SESSION_RESPONSE, PAYLOAD_RAKP1, PAYLOAD_RAKP2, PAYLOAD_RAKP3, PAYLOAD_RAKP4, SessionKeys,
+    algorithm_payloads, ipmi_response, parse_ipmi_message, parse_presession_packet, parse_v2_packet,
+    presession_packet, user_key, v2_packet,
+)
+from bmc_log import setup_logging
+
+logger = logging.getLogger(__name__)
+
+# --- Конфигурация ---
+# Максимум байт за один Get SDR (0xFF - без ограничения); меньше - клиент читает записи частями
+MAX_SDR_READ = int(os.getenv('IPMI_STANDIN_MAX_READ', '255'))
+# Доля отбрасываемых запросов - для проверки повторной отправки
+DROP_RATE = float(os.getenv('IPMI_STANDIN_DROP', '0'))
+
+# (номер, имя, базовая единица, M, R exp, начальное сырое значение); Compact Record - последний
+SENSORS = (
+    (0x01, 'ambient', 1, 1, 0, 24),
+    (0x02, 'cpu0_core_temp', 1, 1, 0, 41),
+    (0x03, 'p0_vcore', 4, 1, -2, 120),
+    (0x04, 'fan0', 18, 100, 0, 52),
+    (0x05, 'total_power', 6, 2, 0, 60),
+    (0x06, 'pcie_temp', 1, 1, 0, 35),
+)
+
+# RMCP+ status codes
+STATUS_UNAUTHORIZED_NAME = 0x0D
+STATUS_INVALID_INTEGRITY = 0x0F
+STATUS_INVALID_SESSION = 0x02
+STATUS_NO_CIPHER_SUITE = 0x11
+
+
+def full_sensor_record(record_id, number, name, unit, m, r_exp):
+    """SDR Full Sensor Record (тип 01) с линейным преобразованием y = M * x * 10^Rexp"""
+    body = bytearray(43)
+    body[0:3] = bytes((0x20, 0x00, number))       # владелец, LUN, номер сенсора
+    body[3:5] = bytes((0x07, 0x01))                # сущность: процессор, экземпляр 1
+    body[7] = 0x01                                 # тип сенсора: температура (для отчета не важен)
+    body[8] = 0x01                                 # пороговый сенсор
+    body[15] = 0x00                                # беззнаковое аналоговое значение
+    body[16] = unit
+    body[18] = 0x00                                # линейный
+    body[19] = m & 0xFF
+    body[20] = (m >> 2) & 0xC0
+    body[24] = (r_exp & 0x0F) << 4
+    encoded = name.encode('latin-1')
+    body[42] = 0xC0 | len(encoded)
+    body += encoded
+    return struct.pack('<HBBB', record_id, 0x51, 0x01, len(body)) + bytes(body)
+
+
+def compact_sensor_record(record_id, number, name, unit):
+    body = bytearray(27)
+    body[0:3] = bytes((0x20, 0x00, number))
+    body[16] = unit
+    encoded = name.encode('latin-1')
+    body[26] = 0xC0 | len(encoded)
+    body += encoded
+    return struct.pack('<HBBB', record_id, 0x51, 0x02, len(body)) + bytes(body)
+
+
+class StandinSession:
+    def __init__(self, console_id, cipher_suite):
+        self.console_id = console_id
+        self.cipher_suite = cipher_suite
+        self.keys = None
+        self.sequence = 0
+        self.console_random = None
+        self.managed_random = os.urandom(16)
+        self.role = None
+        self.name = b''
+
+
+class IPMIStandin:
+    """Однопоточный UDP сервер: ответы на запросы одной сессии идут в порядке приема"""
+
+    def __init__(self, host='127.0.0.1', port=0):
+        self.socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.socket.bind((host, port))
+        self.address = self.socket.getsockname()
+        self.guid = os.urandom(16)
+        self.sessions = {}
+        self.reservation = 0
+        self.readings = {number: raw for number, _, _, _, _, raw in SENSORS}
+        *full, compact = SENSORS
+        self.sdr = [
+            full_sensor_record(index, number, name, unit, m, r_exp)
+            for index, (number, name, unit, m, r_exp, _) in enumerate(full)
+        ]
+        self.sdr.append(compact_sensor_record(len(full), compact[0], compact[1], compact[2]))
+        self._stop = threading.Event()
+
+    def serve_forever(self):
+        self.socket.settimeout(0.5)
+        while not self._stop.is_set():
+            try:
+                packet, peer = self.socket.recvfrom(4096)
+            except socket.timeout:
+                continue
+            if DROP_RATE and random.random() < DROP_RATE:
+                continue
+            try:
+                response = self.handle(packet)
+            except (IPMIError, IndexError, struct.error) as e:
+                logger.debug("Заглушка IPMI: пропущен пакет от %s: %s", peer, e)
+                continue
+            if response:
+                self.socket.sendto(response, peer)
+
+    def shutdown(self):
+        self._stop.set()
+
+    # --- Разбор пакетов ---
+    def handle(self, packet):
+        if packet[4] == 0x00:
+            request = parse_presession_packet(packet)
+            _, _, cmd, _ = parse_ipmi_message(request)
+            if cmd != CMD_GET_CHANNEL_AUTH_CAPABILITIES:
+                return None
+            # Канал 1, поддержка IPMI 2.0 (бит 7) и расширенных возможностей RMCP+
+            return presession_packet(ipmi_response(request, 0, bytes((0x01, 0x80, 0x04, 0x02, 0, 0, 0, 0))))
+
+        session_id = struct.unpack_from('<I', packet, 6)[0]
+        session = self.sessions.get(session_id)
+        payload_type, _, _, payload = parse_v2_packet(packet, session.keys if session else None)
+        if payload_type == PAYLOAD_OPEN_SESSION_REQUEST:
+            return self.open_session(payload)
+        if payload_type == PAYLOAD_RAKP1:
+            return self.rakp1(payload)
+        if payload_type == PAYLOAD_RAKP3:
+            return self.rakp3(payload)
+        if payload_type == PAYLOAD_IPMI and session is not None and session.keys is not None:
+            return self.command(session_id, session, payload)
+        return None
+
+    def open_session(self, payload):
+        tag, console_id = payload[0], struct.unpack_from('<I', payload, 4)[0]
+        suite = next((s for s in CIPHER_SUITES if algorithm_payloads(s) == payload[8:32]), None)
+        if suite is None:
+            return v2_packet(PAYLOAD_OPEN_SESSION_RESPONSE, 0, 0, bytes((tag, STATUS_NO_CIPHER_SUITE, 0, 0)))
+        managed_id = struct.unpack('<I', os.urandom(4))[0] | 1
+        self.sessions[managed_id] = StandinSession(console_id, suite)
+        response = bytes((tag, 0, 0x04, 0)) + struct.pack('<II', console_id, managed_id) + payload[8:32]
+        return v2_packet(PAYLOAD_OPEN_SESSION_RESPONSE, 0, 0, response)
+
+    def rakp1(self, payload):
+        tag, managed_id = payload[0], struct.unpack_from('<I', payload, 4)[0]
+        session = self.sessions.get(managed_id)
+        if session is None:
+            return v2_packet(PAYLOAD_RAKP2, 0, 0, bytes((tag, STATUS_INVALID_SESSION, 0, 0)) + bytes(4))
+        session.console_random = payload[8:24]
+        session.role = payload[24]
+        session.name = payload[28:28 + payload[27]]
+        console = struct.pack('<I', session.console_id)
+        if session.name != IPMI_USERNAME.encode('utf-8'):
+            return v2_packet(PAYLOAD_RAKP2, 0, 0, bytes((tag, STATUS_UNAUTHORIZED_NAME, 0, 0)) + console)
+        digest = CIPHER_SUITES[session.cipher_suite][3]
+        auth = hmac.new(
+            user_key(IPMI_PASSWORD),
+            console + struct.pack('<I', managed_id) + session.console_random + session.managed_random
+            + self.guid + bytes((session.role, len(session.name))) + session.name,
+            digest,
+        ).digest()
+        response = bytes((tag, 0, 0, 0)) + console + session.managed_random + self.guid + auth
+        return v2_packet(PAYLOAD_RAKP2, 0, 0, response)
+
+    def rakp3(self, payload):
+        tag, managed_id = payload[0], struct.unpack_from('<I', payload, 4)[0]
+        session = self.sessions.get(managed_id)
+        if session is None or session.console_random is None:
+            return v2_packet(PAYLOAD_RAKP4, 0, 0, bytes((tag, STATUS_INVALID_SESSION, 0, 0)) + bytes(4))
+        console = struct.pack('<I', session.console_id)
+        digest = CIPHER_SUITES[session.cipher_suite][3]
+        kuid = user_key(IPMI_PASSWORD)
+        role_name = bytes((session.role, len(session.name))) + session.name
+        expected = hmac.new(kuid, session.managed_random + console + role_name, digest).digest()
+        if not hmac.compare_digest(expected, payload[8:]):
+            del self.sessions[managed_id]
+            return v2_packet(PAYLOAD_RAKP4, 0, 0, bytes((tag, STATUS_INVALID_INTEGRITY, 0, 0)) + console)
+        sik = hmac.new(kuid, session.console_random + session.managed_random + role_name, digest).digest()
+        session.keys = SessionKeys(session.cipher_suite, sik)
+        icv = hmac.new(sik, session.console_random + struct.pack('<I', managed_id) + self.guid, digest).digest()
+        return v2_packet(PAYLOAD_RAKP4, 0, 0, bytes((tag, 0, 0, 0)) + console + icv[:session.keys.icv_length])
+
+    # --- Команды ---
+    def command(self, managed_id, session, message):
+        netfn, _, cmd, data = parse_ipmi_message(message)
+        code, response = self.execute(netfn, cmd, data)
+        if netfn == NETFN_APP and cmd == CMD_CLOSE_SESSION and code == 0:
+            self.sessions.pop(managed_id, None)
+        session.sequence += 1
+        return v2_packet(PAYLOAD_IPMI, session.console_id, session.sequence,
+                         ipmi_response(message, code, response), session.keys)
+
+    def execute(self, netfn, cmd, data):
+        if netfn == NETFN_APP and cmd == CMD_CLOSE_SESSION:
+            return 0, b''
+        if netfn == NETFN_STORAGE and cmd == CMD_GET_SDR_REPOSITORY_INFO:
+            return 0, bytes((0x51,)) + struct.pack('<HH', len(self.sdr), 0xFFFF) + bytes(9)
+        if netfn == NETFN_STORAGE and cmd == CMD_RESERVE_SDR_REPOSITORY:
+            self.reservation = (self.reservation + 1) & 0xFFFF or 1
+            return 0, struct.pack('<H', self.reservation)
+        if netfn == NETFN_STORAGE and cmd == CMD_GET_SDR:
+            return self.get_sdr(data)
+        if netfn == NETFN_SENSOR and cmd == CMD_GET_SENSOR_READING:
+            return self.sensor_reading(data[0])
+        return 0xC1, b''  # команда не поддерживается
+
+    def get_sdr(self, data):
+        reservation, record_id, offset, count = struct.unpack('<HHBB', data[:6])
+        if offset and reservation != self.reservation:
+            return 0xC5, b''
+        if record_id >= len(self.sdr):
+            return 0xCB, b''  # запись не найдена
+        record = self.sdr[record_id]
+        if count == 0xFF:
+            if len(record) - offset > MAX_SDR_READ:
+                return 0xCA, b''
+            count = len(record) - offset
+        next_id = record_id + 1 if record_id + 1 < len(self.sdr) else 0xFFFF
+        return 0, struct.pack('<H', next_id) + record[offset:offset + count]
+
+    def sensor_reading(self, number):
+        if number not in self.readings:
+            return 0xCB, b''
+        self.readings[number] = max(1, min(254, self.readings[number] + random.choice((-1, 0, 0, 1))))
+        return 0, bytes((self.readings[number], 0x40, 0x00, 0x00))
+
+
+def start_standin(host='127.0.0.1', port=0):
+    """Запускает заглушку в фоновом потоке; возвращает (сервер, порт)"""
+    server = IPMIStandin(host, port)
+    thread = threading.Thread(target=server.serve_forever, name='ipmi-standin', daemon=True)
+    thread.start()
+    logger.info("Заглушка IPMI запущена: udp://%s:%s", *server.address)
+    return server, server.address[1]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=int(os.getenv('IPMI_PORT', '9623')))
+    args = parser.parse_args()
+
+    setup_logging('ipmi_standin')
+    server = IPMIStandin(args.host, args.port)
+    logger.info("Заглушка IPMI: udp://%s:%s", args.host, args.port)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,278 @@
+"""Структурированное логирование тестов с фоновой записью.
+
+Вызывающий поток только кладет LogRecord в очередь: сообщение не форматируется
+(аргументы передаются отдельно, а не f-строкой), в stderr и файл пишет фоновый
+поток QueueListener. Каждая запись сохраняется JSON строкой в
+reports/log_<name>.jsonl; уровни задаются для отдельных модулей:
+
+    LOG_LEVEL=INFO LOG_LEVELS="bmc_transport=DEBUG,urllib3=WARNING" python -m pytest tests_Redfish.py
+    python bmc_log.py bench 200000
+"""
+import atexit
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import sys
+import threading
+import time
+
+# --- Конфигурация ---
+REPORTS_DIR = os.getenv('REPORTS_DIR', 'reports')
+LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO')
+# Уровни отдельных логгеров: "модуль=УРОВЕНЬ,..."
+LOG_LEVELS = os.getenv('LOG_LEVELS', '')
+# LOG_JSON=0 - не писать reports/log_<name>.jsonl
+LOG_JSON = os.getenv('LOG_JSON', '1') != '0'
+# LOG_CALLER=0 - не искать модуль и строку вызова (findCaller обходит стек на каждый вызов)
+LOG_CALLER = os.getenv('LOG_CALLER', '1') != '0'
+FORMAT = '%(asctime)s - %(levelname)s - %(message)s'
+
+# Стандартные атрибуты LogRecord; остальные (extra=..., фильтры) попадают в JSON
+RECORD_ATTRS = frozenset(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime'}
+
+_listener = None
+_state_lock = threading.Lock()
+
+
+def parse_levels(spec):
+    """"bmc_transport=DEBUG,urllib3=WARNING" -> {'bmc_transport': 10, 'urllib3': 30}"""
+    levels = {}
+    for part in filter(None, (p.strip() for p in spec.split(','))):
+        name, _, level = part.partition('=')
+        value = logging.getLevelName(level.strip().upper())
+        if not isinstance(value, int):
+            raise ValueError(f"Неизвестный уровень логирования: {part}")
+        levels[name.strip()] = value
+    return levels
+
+
+class DeferredQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler без форматирования в вызывающем потоке
+
+    Стандартный prepare() вызывает format() до постановки в очередь. Записи не
+    покидают процесс, поэтому сообщение собирается уже обработчиками фонового
+    потока. Аргументы должны быть неизменяемыми (строки, числа), как принято в
+    logging.
+    """
+
+    def prepare(self, record):
+        return record
+
+
+class ContextFilter(logging.Filter):
+    """Добавляет в запись поля из getters (например, node ID текущего теста)"""
+
+    def __init__(self, **getters):
+        super().__init__()
+        self.getters = getters
+
+    def filter(self, record):
+        for name, getter in self.getters.items():
+            setattr(record, name, getter())
+        return True
+
+
+class JsonLinesHandler(logging.Handler):
+    """Одна JSON строка на запись; файл буферизуется и сбрасывается на ошибках и при закрытии"""
+
+    def __init__(self, path):
+        super().__init__()
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        self.path = path
+        self.stream = open(path, 'w', encoding='utf-8', buffering=1 << 16)
+
+    def to_dict(self, record):
+        entry = {
+            'ts': round(record.created, 6),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+            'thread': record.threadName,
+        }
+        if LOG_CALLER:
+            entry['module'] = record.module
+            entry['line'] = record.lineno
+        for key, value in vars(record).items():
+            if key not in RECORD_ATTRS and value is not None:
+                entry[key] = value
+        if record.exc_info:
+            entry['exception'] = logging.Formatter().formatException(record.exc_info)
+        return entry
+
+    def emit(self, record):
+        try:
+            self.stream.write(json.dumps(self.to_dict(record), ensure_ascii=False, default=str) + '\n')
+            if record.levelno >= logging.ERROR:
+                self.stream.flush()
+        except Exception:
+            self.handleError(record)
+
+    def close(self):
+        with self.lock:
+            if not self.stream.closed:
+                self.stream.close()
+        super().close()
+
+
+class LogPipeline:
+    """Очередь и фоновый поток, стоящие перед обработчиками корневого логгера"""
+
+    def __init__(self, name, console=True, fields=None):
+        self.root = logging.getLogger()
+        # Обработчики, установленные до нас (например, Locust), переезжают за очередь
+        self.original = list(self.root.handlers)
+        handlers = list(self.original)
+        if not handlers and console:
+            stream = logging.StreamHandler(sys.stderr)
+            stream.setFormatter(logging.Formatter(FORMAT))
+            handlers.append(stream)
+        self.json_handler = None
+        if LOG_JSON:
+            self.json_handler = JsonLinesHandler(os.path.join(REPORTS_DIR, f"log_{name}.jsonl"))
+            handlers.append(self.json_handler)
+
+        self.queue = queue.SimpleQueue()
+        self.handler = DeferredQueueHandler(self.queue)
+        if fields:
+            self.handler.addFilter(ContextFilter(**fields))
+        self.listener = logging.handlers.QueueListener(self.queue, *handlers, respect_handler_level=True)
+        for handler in self.original:
+            self.root.removeHandler(handler)
+        self.root.addHandler(self.handler)
+        self.listener.start()
+
+    def stop(self):
+        """Дописывает очередь и возвращает корневому логгеру исходные обработчики"""
+        self.root.removeHandler(self.handler)
+        self.listener.stop()
+        for handler in self.original:
+            self.root.addHandler(handler)
+        if self.json_handler is not None:
+            self.json_handler.close()
+
+
+def setup_logging(name, console=True, fields=None):
+    """Включает фоновую запись логов процесса (повторный вызов ничего не меняет)
+
+    console=False - не добавлять вывод в stderr (PyTest сам собирает логи тестов);
+    fields - {поле: функция} для значений, вычисляемых в момент вызова логгера.
+    """
+    global _listener
+    with _state_lock:
+        if _listener is not None:
+            return _listener
+        logging.getLogger().setLevel(LOG_LEVEL.upper())
+        for logger_name, level in parse_levels(LOG_LEVELS).items():
+            logging.getLogger(logger_name).setLevel(level)
+        if not LOG_CALLER:
+            # Документированный способ отключить findCaller (module/lineno будут пустыми)
+            logging._srcfile = None
+        logging.logMultiprocessing = False
+        _listener = LogPipeline(name, console=console, fields=fields)
+        atexit.register(shutdown_logging)
+        return _listener
+
+
+def shutdown_logging():
+    global _listener
+    with _state_lock:
+        if _listener is None:
+            return
+        _listener.stop()
+        _listener = None
+
+
+# --- Микробенчмарк ---
+def _bench_logger(name, handler):
+    logger = logging.getLogger(f"bmc_log.bench.{name}")
+    logger.handlers[:] = [handler]
+    logger.propagate = False
+    logger.setLevel(logging.INFO)
+    return logger
+
+
+def _per_call_ns(call, n):
+    start = time.perf_counter_ns()
+    for i in range(n):
+        call(i)
+    return (time.perf_counter_ns() - start) / n
+
+
+def benchmark(n=100000):
+    """Стоимость одного вызова логгера в вызывающем потоке, нс
+
+    Запись идет в os.devnull, поэтому измеряются форматирование, обработчики и
+    блокировки, а не скорость терминала. Для очереди время фонового потока не
+    входит в результат.
+    """
+    sensor = {'Name': 'CPU Temp', 'ReadingCelsius': 41.5}
+    devnull = open(os.devnull, 'w', encoding='utf-8')
+    stream = logging.StreamHandler(devnull)
+    stream.setFormatter(logging.Formatter(FORMAT))
+    sync_logger = _bench_logger('sync', stream)
+
+    listener_stream = logging.StreamHandler(devnull)
+    listener_stream.setFormatter(logging.Formatter(FORMAT))
+    bench_queue = queue.SimpleQueue()
+    listener = logging.handlers.QueueListener(bench_queue, listener_stream)
+    queued_logger = _bench_logger('queued', DeferredQueueHandler(bench_queue))
+    stock_logger = _bench_logger('stock_queue', logging.handlers.QueueHandler(bench_queue))
+    json_logger = _bench_logger('json', JsonLinesHandler(os.devnull))
+    listener.start()
+
+    cases = {
+        'sync_stream_fstring': lambda i: sync_logger.info(
+            f"  - {sensor.get('Name')}: {sensor.get('ReadingCelsius')}°C ({i})"
+        ),
+        'sync_stream_lazy': lambda i: sync_logger.info(
+            "  - %s: %s°C (%d)", sensor.get('Name'), sensor.get('ReadingCelsius'), i
+        ),
+        'sync_json_lazy': lambda i: json_logger.info(
+            "  - %s: %s°C (%d)", sensor.get('Name'), sensor.get('ReadingCelsius'), i
+        ),
+        'stdlib_queue_lazy': lambda i: stock_logger.info(
+            "  - %s: %s°C (%d)", sensor.get('Name'), sensor.get('ReadingCelsius'), i
+        ),
+        'deferred_queue_lazy': lambda i: queued_logger.info(
+            "  - %s: %s°C (%d)", sensor.get('Name'), sensor.get('ReadingCelsius'), i
+        ),
+        'disabled_fstring': lambda i: sync_logger.debug(
+            f"  - {sensor.get('Name')}: {sensor.get('ReadingCelsius')}°C ({i})"
+        ),
+        'disabled_lazy': lambda i: sync_logger.debug(
+            "  - %s: %s°C (%d)", sensor.get('Name'), sensor.get('ReadingCelsius'), i
+        ),
+    }
+    srcfile = logging._srcfile
+    results = {}
+    try:
+        for caller in (True, False):
+            logging._srcfile = srcfile if caller else None
+            for case, call in cases.items():
+                _per_call_ns(call, min(n, 1000))  # прогрев
+                name = case if caller else f"{case}_no_caller"
+                results[name] = round(_per_call_ns(call, n), 1)
+    finally:
+        logging._srcfile = srcfile
+        listener.stop()
+        for logger in (sync_logger, queued_logger, stock_logger, json_logger):
+            for handler in logger.handlers:
+                handler.close()
+        devnull.close()
+    return results
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2 or sys.argv[1] != 'bench':
+        print(__doc__)
+        sys.exit(2)
+
+    calls = int(sys.argv[2]) if len(sys.argv) > 2 else 100000
+    results = benchmark(calls)
+    for case, ns in results.items():
+        print(f"{case:32s} {ns / 1000:8.2f} us/call")
+    os.makedirs(REPORTS_DIR, exist_ok=True)
+    with open(os.path.join(REPORTS_DIR, 'logging_bench.json'), 'w', encoding='utf-8') as f:
+        json.dump({'calls': calls, 'ns_per_call': results}, f, indent=2)
@@ -0,0 +1,321 @@
+"""Профиль процесса QEMU на хосте: узкое место в эмуляторе или в прошивке BMC.
+
+bmcweb работает на одном эмулируемом ARM ядре (qemu-system-arm -m 256, TCG).
+Рост задержек может означать как загруженную прошивку, так и перегруженный хост,
+которому не хватает времени на эмуляцию. QemuProfiler раз в QEMU_SAMPLE_INTERVAL
+секунд читает /proc процесса QEMU и хоста:
+
+* CPU всего процесса и потока vCPU (% одного ядра хоста), RSS, I/O, переключения
+  контекста (добровольные и вытеснения);
+* время ожидания vCPU в очереди планировщика (/proc/<pid>/task/<tid>/schedstat) -
+  доля секунды, когда эмулятор был готов работать, но ядро хоста было занято;
+* загрузку CPU хоста и iowait.
+
+Каждая выборка получает вердикт:
+
+* host_overloaded - vCPU ждет процессор хоста дольше QEMU_VCPU_WAIT % времени
+  или хост загружен выше QEMU_HOST_BUSY %, а vCPU не упирается в ядро;
+* host_io - iowait хоста выше QEMU_HOST_IOWAIT %;
+* guest_saturated - поток vCPU занимает ядро хоста на QEMU_VCPU_SATURATED % и
+  больше без ожидания: эмулируемое ядро загружено самой прошивкой;
+* ok.
+
+Первые два означают, что узкое место - эмулятор, и задержки прогона не
+характеризуют BMC. Выборки попадают в трассу pytest (counter события) и вместе
+с метриками Locust на тот же момент - в reports/qemu_profile_<name>.json.
+Имена потоков vCPU ("CPU 0/TCG") QEMU задает с -name ...,debug-threads=on;
+без них vCPU считается самый загруженный поток, кроме главного.
+
+    QEMU_PROFILE=1 python -m pytest tests_Redfish.py
+    python bmc_qemu.py sample 30
+"""
+import glob
+import json
+import logging
+import os
+import statistics
+import sys
+import threading
+import time
+
+from bmc_trace import tracer
+
+logger = logging.getLogger(__name__)
+
+# --- Конфигурация ---
+REPORTS_DIR = os.getenv('REPORTS_DIR', 'reports')
+# QEMU_PROFILE=1 - профилировать процесс QEMU во время Redfish и Locust тестов
+ENABLED = os.getenv('QEMU_PROFILE', '0') == '1'
+QEMU_PID = os.getenv('QEMU_PID')
+QEMU_PROCESS = os.getenv('QEMU_PROCESS', 'qemu-system-arm')
+SAMPLE_INTERVAL = float(os.getenv('QEMU_SAMPLE_INTERVAL', '1'))
+VCPU_SATURATED = float(os.getenv('QEMU_VCPU_SATURATED', '90'))
+VCPU_WAIT = float(os.getenv('QEMU_VCPU_WAIT', '20'))
+HOST_BUSY = float(os.getenv('QEMU_HOST_BUSY', '90'))
+HOST_IOWAIT = float(os.getenv('QEMU_HOST_IOWAIT', '20'))
+CLK_TCK = os.sysconf('SC_CLK_TCK')
+PAGE_SIZE = os.sysconf('SC_PAGE_SIZE')
+
+EMULATOR_BOTTLENECKS = ('host_overloaded', 'host_io')
+
+
+def find_qemu_pid(process=QEMU_PROCESS):
+    """PID процесса QEMU: QEMU_PID или первый процесс с process в командной строке"""
+    if QEMU_PID:
+        return int(QEMU_PID)
+    for path in glob.glob('/proc/[0-9]*/cmdline'):
+        try:
+            with open(path, 'rb') as f:
+                argv = f.read().split(b'\0')
+        except OSError:
+            continue
+        if argv and os.path.basename(argv[0]).decode('utf-8', 'replace') == process:
+            return int(path.split('/')[2])
+    return None
+
+
+def _read(path):
+    try:
+        with open(path, encoding='utf-8') as f:
+            return f.read()
+    except OSError:  # процесс завершился или нет прав (io чужого процесса)
+        return None
+
+
+def _stat_fields(text):
+    """Поля /proc/.../stat после имени процесса (имя может содержать пробелы)"""
+    return text.rsplit(')', 1)[1].split()
+
+
+def read_process(pid):
+    """Счетчики процесса и его потоков на текущий момент"""
+    stat = _read(f'/proc/{pid}/stat')
+    if stat is None:
+        return None
+    fields = _stat_fields(stat)
+    counters = {
+        'cpu_ticks': int(fields[11]) + int(fields[12]),
+        'rss_bytes': int(fields[21]) * PAGE_SIZE,
+        'threads': {},
+        'voluntary': 0,
+        'nonvoluntary': 0,
+    }
+    for task in glob.glob(f'/proc/{pid}/task/*'):
+        tid = int(os.path.basename(task))
+        task_stat, schedstat = _read(f'{task}/stat'), _read(f'{task}/schedstat')
+        if task_stat is None:
+            continue
+        task_fields = _stat_fields(task_stat)
+        counters['threads'][tid] = {
+            'name': (_read(f'{task}/comm') or '').strip(),
+            'cpu_ticks': int(task_fields[11]) + int(task_fields[12]),
+            'wait_ns': int(schedstat.split()[1]) if schedstat else 0,
+        }
+        for line in (_read(f'{task}/status') or '').splitlines():
+            if line.startswith('voluntary_ctxt_switches'):
+                counters['voluntary'] += int(line.split()[1])
+            elif line.startswith('nonvoluntary_ctxt_switches'):
+                counters['nonvoluntary'] += int(line.split()[1])
+    io = _read(f'/proc/{pid}/io')
+    if io:
+        values = dict(line.split(': ') for line in io.splitlines() if ': ' in line)
+        counters['read_bytes'] = int(values.get('read_bytes', 0))
+        counters['write_bytes'] = int(values.get('write_bytes', 0))
+    return counters
+
+
+def read_host():
+    """/proc/stat хоста -> (всего jiffies, простой, iowait)"""
+    values = [int(value) for value in _read('/proc/stat').splitlines()[0].split()[1:]]
+    return sum(values), values[3], values[4]
+
+
+def vcpu_threads(pid, threads):
+    """Потоки vCPU: по имени (debug-threads=on) или самый загруженный, кроме главного"""
+    named = [tid for tid, thread in threads.items() if thread['name'].startswith('CPU ')]
+    if named:
+        return named
+    others = [tid for tid in threads if tid != pid]
+    if not others:
+        return [pid]
+    return [max(others, key=lambda tid: threads[tid]['cpu_ticks'])]
+
+
+def _rate(current, previous, key, seconds):
+    if key not in current or key not in previous:
+        return None
+    return round((current[key] - previous[key]) / seconds, 1)
+
+
+def verdict(sample):
+    """Что ограничивает скорость в этой выборке (см. описание модуля)"""
+    vcpu = sample.get('vcpu_percent') or 0
+    if (sample.get('vcpu_wait_percent') or 0) >= VCPU_WAIT or (
+            (sample.get('host_busy_percent') or 0) >= HOST_BUSY and vcpu < VCPU_SATURATED):
+        return 'host_overloaded'
+    if (sample.get('host_iowait_percent') or 0) >= HOST_IOWAIT:
+        return 'host_io'
+    if vcpu >= VCPU_SATURATED:
+        return 'guest_saturated'
+    return 'ok'
+
+
+class QemuProfiler:
+    """Фоновые выборки /proc процесса QEMU с вердиктом об узком месте
+
+    context - функция, возвращающая метрики клиента на момент выборки (RPS и p95
+    Locust), чтобы рост задержек можно было сопоставить с вердиктами.
+    """
+
+    def __init__(self, pid=None, interval=SAMPLE_INTERVAL, context=None):
+        self.pid = pid
+        self.interval = interval
+        self.context = context
+        self.samples = []
+        self._previous = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    def sample(self):
+        """Новая выборка; первая только запоминает счетчики и возвращает None"""
+        if self.pid is None:
+            self.pid = find_qemu_pid()
+            if self.pid is None:
+                return None
+        at, now = time.perf_counter(), time.time()
+        process, host = read_process(self.pid), read_host()
+        if process is None:
+            logger.warning("Процесс QEMU %s не найден", self.pid)
+            self.pid, self._previous = None, None
+            return None
+        previous, self._previous = self._previous, (at, process, host)
+        if previous is None:
+            return None
+
+        seconds = at - previous[0]
+        before, host_before = previous[1], previous[2]
+        sample = {
+            'timestamp': now,
+            'cpu_percent': round((process['cpu_ticks'] - before['cpu_ticks']) / CLK_TCK / seconds * 100, 1),
+            'rss_bytes': process['rss_bytes'],
+            'threads': len(process['threads']),
+            'voluntary_ctxt_per_s': _rate(process, before, 'voluntary', seconds),
+            'nonvoluntary_ctxt_per_s': _rate(process, before, 'nonvoluntary', seconds),
+            'read_bytes_per_s': _rate(process, before, 'read_bytes', seconds),
+            'write_bytes_per_s': _rate(process, before, 'write_bytes', seconds),
+        }
+        vcpu, wait = [], []
+        for tid in vcpu_threads(self.pid, process['threads']):
+            thread, thread_before = process['threads'][tid], before['threads'].get(tid)
+            if thread_before is None:
+                continue
+            vcpu.append((thread['cpu_ticks'] - thread_before['cpu_ticks']) / CLK_TCK / seconds * 100)
+            wait.append((thread['wait_ns'] - thread_before['wait_ns']) / 1e9 / seconds * 100)
+        if vcpu:
+            sample['vcpu_percent'] = round(max(vcpu), 1)
+            sample['vcpu_wait_percent'] = round(max(wait), 1)
+        total = host[0] - host_before[0]
+        if total:
+            sample['host_busy_percent'] = round((total - (host[1] - host_before[1]) - (host[2] - host_before[2]))
+                                                * 100.0 / total, 1)
+            sample['host_iowait_percent'] = round((host[2] - host_before[2]) * 100.0 / total, 1)
+        sample['verdict'] = verdict(sample)
+        if self.context is not None:
+            sample.update(self.context())
+        self.samples.append(sample)
+
+        tracer.add_counter('QEMU CPU %', {
+            'process': sample['cpu_percent'], 'vcpu': sample.get('vcpu_percent'),
+            'vcpu_wait': sample.get('vcpu_wait_percent'), 'host': sample.get('host_busy_percent'),
+        }, at, category='qemu')
+        tracer.add_counter('QEMU bottleneck', {
+            'emulator': int(sample['verdict'] in EMULATOR_BOTTLENECKS),
+        }, at, category='qemu')
+        return sample
+
+    def _run(self):
+        while not self._stop.is_set():
+            self.sample()
+            self._stop.wait(self.interval)
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name='qemu-profiler', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.interval + 5)
+            self._thread = None
+
+    def summary(self):
+        result = {'samples': len(self.samples), 'verdicts': {}}
+        for sample in self.samples:
+            result['verdicts'][sample['verdict']] = result['verdicts'].get(sample['verdict'], 0) + 1
+        for key in ('cpu_percent', 'vcpu_percent', 'vcpu_wait_percent', 'host_busy_percent',
+                    'nonvoluntary_ctxt_per_s', 'rss_bytes'):
+            values = [sample[key] for sample in self.samples if sample.get(key) is not None]
+            if values:
+                result[key] = {'mean': round(statistics.mean(values), 1), 'max': max(values)}
+        emulator = sum(result['verdicts'].get(name, 0) for name in EMULATOR_BOTTLENECKS)
+        result['emulator_bottleneck_ratio'] = round(emulator / len(self.samples), 3) if self.samples else None
+        # p95 клиента по вердиктам: выше ли задержки, когда тормозит эмулятор
+        p95 = {}
+        for sample in self.samples:
+            if sample.get('p95_ms') is not None:
+                p95.setdefault(sample['verdict'], []).append(sample['p95_ms'])
+        if p95:
+            result['p95_ms_by_verdict'] = {name: round(statistics.mean(values), 1) for name, values in p95.items()}
+        return result
+
+    def report(self, name):
+        """Сохраняет выборки в reports/qemu_profile_<name>.json"""
+        if not self.samples:
+            return None
+        summary = self.summary()
+        data = {
+            'pid': self.pid,
+            'interval_s': self.interval,
+            'thresholds': {
+                'vcpu_saturated': VCPU_SATURATED, 'vcpu_wait': VCPU_WAIT,
+                'host_busy': HOST_BUSY, 'host_iowait': HOST_IOWAIT,
+            },
+            'summary': summary,
+            'samples': self.samples,
+        }
+        os.makedirs(REPORTS_DIR, exist_ok=True)
+        path = os.path.join(REPORTS_DIR, f"qemu_profile_{name}.json")
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, indent=2, ensure_ascii=False)
+        if summary['emulator_bottleneck_ratio']:
+            logger.warning(
+                "Эмулятор был узким местом в %.0f%% выборок (%s): задержки не характеризуют BMC",
+                summary['emulator_bottleneck_ratio'] * 100, summary['verdicts'],
+            )
+        else:
+            logger.info("Профиль QEMU: %s", summary)
+        return path
+
+
+qemu_profiler = QemuProfiler()
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2 or sys.argv[1] != 'sample':
+        print(__doc__)
+        sys.exit(2)
+
+    seconds = float(sys.argv[2]) if len(sys.argv) > 2 else 10
+    if find_qemu_pid() is None:
+        print(f"Процесс {QEMU_PROCESS} не найден (задайте QEMU_PID)")
+        sys.exit(1)
+    deadline = time.monotonic() + seconds
+    while time.monotonic() < deadline:
+        sample = qemu_profiler.sample()
+        if sample:
+            print(json.dumps(sample, ensure_ascii=False))
+        time.sleep(SAMPLE_INTERVAL)
+    print(json.dumps(qemu_profiler.summary(), indent=2, ensure_ascii=False))
@@ -0,0 +1,257 @@
+"""Повторы, circuit breaker и адаптивные таймауты для запросов к BMC.
+
+Эмулируемый BMC иногда зависает на десятки секунд. Без защиты каждый оставшийся
+тест ждет свой полный таймаут. Здесь:
+
+* идемпотентные запросы (GET, HEAD, PUT, DELETE, OPTIONS) повторяются с
+  экспоненциальной задержкой и случайным разбросом (full jitter);
+* таймаут запроса вычисляется по наблюдаемым задержкам (p99 * множитель) и
+  удваивается при повторе, но не превышает таймаут вызывающего кода;
+* после BREAKER_THRESHOLD отказавших запросов подряд (после всех повторов)
+  circuit breaker размыкается, и запросы сразу завершаются CircuitOpenError
+  до пробного запроса через BREAKER_RESET секунд.
+
+Счетчики повторов и срабатываний пишутся в reports/resilience_<name>.json.
+"""
+import json
+import logging
+import os
+import random
+import threading
+import time
+from collections import defaultdict, deque
+from urllib.parse import urlsplit
+
+import requests
+
+logger = logging.getLogger(__name__)
+
+# --- Конфигурация ---
+REPORTS_DIR = os.getenv('REPORTS_DIR', 'reports')
+RETRY_ATTEMPTS = int(os.getenv('BMC_RETRY_ATTEMPTS', '3'))
+RETRY_BASE_DELAY = float(os.getenv('BMC_RETRY_BASE_DELAY', '0.5'))
+RETRY_MAX_DELAY = float(os.getenv('BMC_RETRY_MAX_DELAY', '8'))
+BREAKER_THRESHOLD = int(os.getenv('BMC_BREAKER_THRESHOLD', '5'))
+BREAKER_RESET = float(os.getenv('BMC_BREAKER_RESET', '30'))
+TIMEOUT_DEFAULT = 10.0
+TIMEOUT_MIN = float(os.getenv('BMC_TIMEOUT_MIN', '2'))
+TIMEOUT_MAX = float(os.getenv('BMC_TIMEOUT_MAX', '30'))
+TIMEOUT_FACTOR = float(os.getenv('BMC_TIMEOUT_FACTOR', '4'))
+TIMEOUT_MIN_SAMPLES = 20
+
+IDEMPOTENT_METHODS = frozenset(('GET', 'HEAD', 'PUT', 'DELETE', 'OPTIONS'))
+RETRY_STATUSES = frozenset((502, 503, 504))
+
+
+class CircuitOpenError(requests.exceptions.ConnectionError):
+    """BMC считается недоступным; запрос не отправлялся"""
+
+
+class CircuitBreaker:
+    """Размыкается после threshold отказов подряд; через reset_timeout пропускает пробный запрос"""
+
+    def __init__(self, threshold=BREAKER_THRESHOLD, reset_timeout=BREAKER_RESET):
+        self.threshold = threshold
+        self.reset_timeout = reset_timeout
+        self._lock = threading.Lock()
+        self.state = 'closed'
+        self.failures = 0
+        self.opened_at = None
+        self.opened_count = 0
+        self.rejected = 0
+
+    def allow(self):
+        """True, если запрос можно отправить; в half-open пропускается один пробный"""
+        with self._lock:
+            if self.state == 'closed':
+                return True
+            if self.state == 'open' and time.monotonic() - self.opened_at >= self.reset_timeout:
+                self.state = 'half_open'
+                logger.info("Circuit breaker: пробный запрос к BMC")
+                return True
+            self.rejected += 1
+            return False
+
+    def in_trial(self):
+        """Идет пробный запрос: повторять его нельзя, исход сразу решает состояние"""
+        with self._lock:
+            return self.state == 'half_open'
+
+    def is_open(self):
+        with self._lock:
+            return self.state == 'open' and time.monotonic() - self.opened_at < self.reset_timeout
+
+    def record_success(self):
+        with self._lock:
+            if self.state != 'closed':
+                logger.info("Circuit breaker: BMC снова отвечает")
+            self.state = 'closed'
+            self.failures = 0
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.state == 'half_open' or (self.state == 'closed' and self.failures >= self.threshold):
+                self.state = 'open'
+                self.opened_at = time.monotonic()
+                self.opened_count += 1
+                logger.warning(
+                    "Circuit breaker разомкнут после %s отказов подряд; следующая попытка через %.0f с",
+                    self.failures, self.reset_timeout,
+                )
+
+
+class AdaptiveTimeouts:
+    """Таймауты по наблюдаемым задержкам: отдельно по ключу запроса и общий"""
+
+    def __init__(self, factor=TIMEOUT_FACTOR, minimum=TIMEOUT_MIN, maximum=TIMEOUT_MAX, window=200):
+        self.factor = factor
+        self.minimum = minimum
+        self.maximum = maximum
+        self._lock = threading.Lock()
+        self._samples = defaultdict(lambda: deque(maxlen=window))
+        self._all = deque(maxlen=window)
+
+    def record(self, key, seconds):
+        with self._lock:
+            self._samples[key].append(seconds)
+            self._all.append(seconds)
+
+    @staticmethod
+    def _p99(samples):
+        ordered = sorted(samples)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * 0.99))]
+
+    def timeout(self, key, limit=None, attempt=0):
+        """Таймаут попытки attempt; limit - таймаут, переданный вызывающим кодом"""
+        with self._lock:
+            samples = self._samples.get(key)
+            if samples and len(samples) >= TIMEOUT_MIN_SAMPLES:
+                base = self._p99(samples) * self.factor
+            elif len(self._all) >= TIMEOUT_MIN_SAMPLES:
+                base = self._p99(self._all) * self.factor
+            else:
+                base = TIMEOUT_DEFAULT
+        value = min(max(base, self.minimum) * 2 ** attempt, self.maximum)
+        return min(value, limit) if limit is not None else value
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                key: {
+                    'samples': len(samples),
+                    'p99_ms': round(self._p99(samples) * 1000, 1),
+                }
+                for key, samples in self._samples.items() if samples
+            }
+
+
+class Resilience:
+    """Общий слой повторов, circuit breaker и таймаутов со статистикой"""
+
+    def __init__(self, attempts=RETRY_ATTEMPTS, base_delay=RETRY_BASE_DELAY, max_delay=RETRY_MAX_DELAY):
+        self.attempts = attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.breaker = CircuitBreaker()
+        self.timeouts = AdaptiveTimeouts()
+        self._lock = threading.Lock()
+        self.counters = defaultdict(int)
+
+    def count(self, name, value=1):
+        with self._lock:
+            self.counters[name] += value
+
+    def backoff(self, attempt):
+        """Full jitter: случайная задержка от 0 до base * 2^attempt (не больше max_delay)"""
+        delay = random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+        self.count('retries')
+        self.count('retry_sleep_ms', round(delay * 1000))
+        time.sleep(delay)
+        return delay
+
+    def check_breaker(self, what):
+        if not self.breaker.allow():
+            self.count('fast_failed')
+            raise CircuitOpenError(f"BMC не отвечает (circuit breaker разомкнут), {what} не выполнен")
+
+    def send(self, send, request, **kwargs):
+        """Оборачивает HTTPAdapter.send: повторы только для идемпотентных методов"""
+        method = request.method.upper()
+        key = f"{method} {urlsplit(request.url).path}"
+        idempotent = method in IDEMPOTENT_METHODS
+        attempts = self.attempts if idempotent else 1
+        limit = kwargs.get('timeout')
+        adaptive = idempotent and (limit is None or isinstance(limit, (int, float)))
+
+        # Отказ в breaker засчитывается один раз на запрос, когда повторы исчерпаны;
+        # пробный запрос (half-open) не повторяется и всегда размыкает или замыкает breaker
+        for attempt in range(attempts):
+            self.check_breaker(key)
+            trial = self.breaker.in_trial()
+            if adaptive:
+                kwargs['timeout'] = self.timeouts.timeout(key, limit, attempt)
+            self.count('attempts')
+            start = time.perf_counter()
+            try:
+                response = send(request, **kwargs)
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+                self.count('timeouts' if isinstance(e, requests.exceptions.Timeout) else 'connection_errors')
+                if trial or attempt + 1 >= attempts:
+                    self.breaker.record_failure()
+                    raise
+                logger.warning("%s: %s, повтор %s/%s", key, type(e).__name__, attempt + 1, attempts - 1)
+                self.backoff(attempt)
+                continue
+            except BaseException:
+                # ChunkedEncodingError, TooManyRedirects и прочее: вне пробы не отказ BMC,
+                # но проба не должна оставить breaker в half_open навсегда
+                if trial:
+                    self.breaker.record_failure()
+                raise
+
+            if response.status_code in RETRY_STATUSES:
+                self.count('retryable_statuses')
+                if not trial and attempt + 1 < attempts:
+                    logger.warning("%s: HTTP %s, повтор %s/%s", key, response.status_code, attempt + 1, attempts - 1)
+                    response.close()
+                    self.backoff(attempt)
+                    continue
+                self.breaker.record_failure()
+                return response
+
+            self.breaker.record_success()
+            self.timeouts.record(key, time.perf_counter() - start)
+            return response
+
+    def as_dict(self):
+        with self._lock:
+            counters = dict(self.counters)
+        return {
+            'counters': counters,
+            'breaker': {
+                'state': self.breaker.state,
+                'opened': self.breaker.opened_count,
+                'rejected': self.breaker.rejected,
+            },
+            'latency': self.timeouts.snapshot(),
+        }
+
+    def report(self, name):
+        """Логирует счетчики и сохраняет их в reports/resilience_<name>.json"""
+        data = self.as_dict()
+        if not data['counters']:
+            return data
+        counters = data['counters']
+        logger.info(
+            "Resilience: попыток %s, повторов %s, размыканий breaker %s, отклонено %s",
+            counters.get('attempts', 0), counters.get('retries', 0),
+            data['breaker']['opened'], counters.get('fast_failed', 0),
+        )
+        os.makedirs(REPORTS_DIR, exist_ok=True)
+        with open(os.path.join(REPORTS_DIR, f"resilience_{name}.json"), 'w', encoding='utf-8') as f:
+            json.dump(data, f, indent=2, ensure_ascii=False)
+        return data
+
+
+resilience = Resilience()
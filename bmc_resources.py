@@ -0,0 +1,86 @@
+"""Загрузка BMC по данным Redfish ManagerDiagnosticData (память и CPU).
+
+Опрос выполняется в фоновом потоке; выборки за отрезок времени усредняются,
+чтобы сравнить нагрузку на BMC от разных фаз теста (soak профиль Locust,
+сравнение IPMI и Redfish).
+"""
+import logging
+import os
+import statistics
+import threading
+import time
+
+import requests
+
+from bmc_transport import new_session
+
+logger = logging.getLogger(__name__)
+
+# --- Конфигурация ---
+BMC_HOST = os.getenv('BMC_HOST', 'https://localhost:2443')
+BMC_AUTH = ("root", "0penBmc")
+
+
+class BMCResourceSampler:
+    """Фоновый опрос памяти и CPU BMC через Redfish Manager"""
+
+    def __init__(self, interval, host=BMC_HOST):
+        self.interval = interval
+        self.url = f"{host}/redfish/v1/Managers/bmc/ManagerDiagnosticData"
+        self.samples = []
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name='bmc-sampler', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=self.interval)
+
+    def _run(self):
+        session = new_session()
+        session.auth = BMC_AUTH
+        started = time.time()
+        while not self._stop.is_set():
+            sample = self.sample(session)
+            if sample:
+                sample['elapsed_s'] = round(time.time() - started, 1)
+                self.samples.append(sample)
+            self._stop.wait(self.interval)
+        session.close()
+
+    def sample(self, session):
+        try:
+            response = session.get(self.url, timeout=10)
+            if response.status_code != 200:
+                logger.warning("ManagerDiagnosticData недоступен: HTTP %s", response.status_code)
+                return None
+            data = response.json()
+        except (requests.exceptions.RequestException, ValueError) as e:
+            logger.warning("Не удалось получить ресурсы BMC: %s", e)
+            return None
+
+        memory = data.get('MemoryStatistics', {})
+        processor = data.get('ProcessorStatistics', {})
+        return {
+            'timestamp': time.time(),
+            'memory_total_bytes': memory.get('TotalBytes'),
+            'memory_available_bytes': memory.get('AvailableBytes'),
+            'memory_free_bytes': memory.get('FreeBytes'),
+            'cpu_user_percent': processor.get('UserPercent'),
+            'cpu_kernel_percent': processor.get('KernelPercent'),
+            'uptime_s': data.get('ServiceRootUptimeSeconds'),
+        }
+
+    def mean(self, key, start=None, end=None):
+        """Среднее значение key по выборкам с timestamp в [start, end]"""
+        values = [
+            sample[key] for sample in self.samples
+            if sample.get(key) is not None
+            and (start is None or sample['timestamp'] >= start)
+            and (end is None or sample['timestamp'] <= end)
+        ]
+        return round(statistics.mean(values), 2) if values else None
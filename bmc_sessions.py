@@ -0,0 +1,370 @@
+"""Нагрузочный тест Redfish SessionService: скорость входа и емкость таблицы сессий.
+
+Ступени SESSION_RATES (входов в секунду) выполняются по расписанию (open loop):
+каждая попытка создает сессию POST /SessionService/Sessions, держит ее
+SESSION_HOLD_SECONDS и удаляет DELETE с собственным токеном. По ступеням
+считаются перцентили задержки входа (от фактического и от запланированного
+старта) и доля отказов; ступень, на которой отказов больше
+SESSION_FAILURE_THRESHOLD, считается точкой насыщения, и подъем прекращается.
+
+Затем проверяется емкость таблицы: сессии создаются без удаления, пока bmcweb не
+начнет отказывать, после чего все удаляются и измеряется, через сколько таблица
+вернется к исходному размеру и снова примет вход.
+
+Все созданные сессии удаляются при любом завершении (в том числе по SIGTERM от
+Jenkins). Сессии создаются с Context = метка прогона, поэтому сессии, ответ на
+создание которых не дошел до клиента, находятся в коллекции по этой метке;
+чужие сессии (WebUI, другие прогоны) не трогаются.
+
+    python bmc_sessions.py
+    SESSION_RATES=5,10,20,40 SESSION_STEP_SECONDS=20 python bmc_sessions.py
+"""
+import json
+import logging
+import os
+import signal
+import socket
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+import requests
+import urllib3
+
+from bmc_hdr import LatencyRecorder
+from bmc_log import setup_logging
+from bmc_transport import new_session
+
+logger = logging.getLogger(__name__)
+
+urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
+
+# --- Конфигурация ---
+REPORTS_DIR = os.getenv('REPORTS_DIR', 'reports')
+REDFISH_URL = os.getenv('REDFISH_URL', 'https://127.0.0.1:2443/redfish/v1')
+USERNAME = "root"
+PASSWORD = "0penBmc"
+RATES = [float(rate) for rate in os.getenv('SESSION_RATES', '2,5,10,20,40').split(',')]
+STEP_SECONDS = float(os.getenv('SESSION_STEP_SECONDS', '15'))
+HOLD_SECONDS = float(os.getenv('SESSION_HOLD_SECONDS', '1'))
+MAX_INFLIGHT = int(os.getenv('SESSION_MAX_INFLIGHT', '64'))
+FAILURE_THRESHOLD = float(os.getenv('SESSION_FAILURE_THRESHOLD', '0.05'))
+# Верхняя граница пробы емкости, чтобы не держать сессии бесконечно, если лимита нет
+CAPACITY_LIMIT = int(os.getenv('SESSION_CAPACITY_LIMIT', '200'))
+RECLAIM_TIMEOUT = float(os.getenv('SESSION_RECLAIM_TIMEOUT', '60'))
+REQUEST_TIMEOUT = 10
+PERCENTILES = (50, 95, 99)
+
+
+def _ms(microseconds):
+    return round(microseconds / 1000, 2)
+
+
+class SessionLedger:
+    """Сессии, созданные бенчмарком и еще не удаленные: {URI: токен}"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.sessions = {}
+
+    def add(self, uri, token):
+        with self._lock:
+            self.sessions[uri] = token
+
+    def discard(self, uri):
+        with self._lock:
+            self.sessions.pop(uri, None)
+
+    def pending(self):
+        with self._lock:
+            return dict(self.sessions)
+
+    def __len__(self):
+        with self._lock:
+            return len(self.sessions)
+
+
+class StepStats:
+    """Итоги одной ступени частоты входов"""
+
+    def __init__(self, rate):
+        self.rate = rate
+        self.latency = LatencyRecorder()
+        self._lock = threading.Lock()
+        self.attempts = 0
+        self.created = 0
+        self.errors = {}
+
+    def record(self, created, error=None):
+        with self._lock:
+            self.attempts += 1
+            if created:
+                self.created += 1
+            else:
+                self.errors[error] = self.errors.get(error, 0) + 1
+
+    @property
+    def failure_ratio(self):
+        return (self.attempts - self.created) / self.attempts if self.attempts else 0.0
+
+    def summary(self, elapsed):
+        result = {
+            'target_rate': self.rate,
+            'achieved_rate': round(self.created / elapsed, 2) if elapsed else None,
+            'attempts': self.attempts,
+            'created': self.created,
+            'failure_ratio': round(self.failure_ratio, 4),
+            'errors': self.errors,
+        }
+        for name, histogram in self.latency.histograms.items():
+            values = histogram.percentiles(PERCENTILES)
+            result[f"{name}_ms"] = {f"p{p}": _ms(values[p]) for p in PERCENTILES}
+        return result
+
+
+class SessionBenchmark:
+    """Ступени частоты входов, проба емкости таблицы сессий и гарантированная очистка"""
+
+    def __init__(self, base_url=REDFISH_URL):
+        self.base_url = base_url.rstrip('/')
+        self.origin = '{0.scheme}://{0.netloc}'.format(urlsplit(self.base_url))
+        self.sessions_url = f"{self.base_url}/SessionService/Sessions"
+        # Управляющая сессия с Basic Auth: список коллекции и удаление чужими руками
+        self.control = new_session(verify=False, pool_maxsize=4)
+        self.control.auth = (USERNAME, PASSWORD)
+        # Входы выполняются без авторизации, как у нового клиента
+        self.clients = new_session(verify=False, pool_maxsize=MAX_INFLIGHT)
+        self.ledger = SessionLedger()
+        self.baseline = set()
+        # Метка сессий этого прогона (свойство Context ресурса Session)
+        self.context = f"bmc_sessions {socket.gethostname()} {os.getpid()} {int(time.time())}"
+        self.hlog = LatencyRecorder()
+        self.report = {'rates': RATES, 'step_seconds': STEP_SECONDS, 'hold_seconds': HOLD_SECONDS}
+
+    # --- Коллекция сессий ---
+    def list_sessions(self):
+        response = self.control.get(self.sessions_url, timeout=REQUEST_TIMEOUT)
+        response.raise_for_status()
+        return {member['@odata.id'] for member in response.json().get('Members', [])}
+
+    def session_timeout(self):
+        response = self.control.get(f"{self.base_url}/SessionService", timeout=REQUEST_TIMEOUT)
+        return response.json().get('SessionTimeout') if response.status_code == 200 else None
+
+    def _uri(self, response):
+        """URI созданной сессии: заголовок Location или @odata.id в теле"""
+        location = response.headers.get('Location')
+        if location:
+            return urlsplit(location).path
+        try:
+            return response.json().get('@odata.id')
+        except ValueError:
+            return None
+
+    # --- Вход и выход ---
+    def login(self):
+        """Создает сессию; возвращает (URI, токен) или строку с причиной отказа"""
+        body = {'UserName': USERNAME, 'Password': PASSWORD}
+        if self.context:
+            body['Context'] = self.context
+        try:
+            response = self.clients.post(self.sessions_url, json=body, timeout=REQUEST_TIMEOUT)
+        except requests.exceptions.RequestException as e:
+            return type(e).__name__
+        if response.status_code == 400 and self.context:
+            # Старый bmcweb не знает Context: без метки очистка идет только по журналу
+            logger.warning("SessionService не принимает Context, сессии без метки прогона")
+            self.context = None
+            return self.login()
+        token = response.headers.get('X-Auth-Token')
+        uri = self._uri(response)
+        if response.status_code != 201 or not token or not uri:
+            return f"HTTP {response.status_code}"
+        self.ledger.add(uri, token)
+        return uri, token
+
+    def logout(self, uri, token=None):
+        """Удаляет сессию ее собственным токеном (или управляющей сессией без токена)"""
+        try:
+            if token:
+                response = self.clients.delete(
+                    f"{self.origin}{uri}", headers={'X-Auth-Token': token}, timeout=REQUEST_TIMEOUT
+                )
+            else:
+                response = self.control.delete(f"{self.origin}{uri}", timeout=REQUEST_TIMEOUT)
+        except requests.exceptions.RequestException as e:
+            logger.warning("Не удалось удалить сессию %s: %s", uri, e)
+            return False
+        # 404 - сессию уже удалил bmcweb (истек таймаут или таблица переполнена)
+        if response.status_code in (200, 202, 204, 404):
+            self.ledger.discard(uri)
+            return True
+        logger.warning("Удаление сессии %s: HTTP %s", uri, response.status_code)
+        return False
+
+    def cycle(self, stats, intended):
+        started = time.perf_counter()
+        result = self.login()
+        done = time.perf_counter()
+        if isinstance(result, str):
+            stats.record(False, result)
+            return
+        stats.record(True)
+        stats.latency.record('login', done - started)
+        stats.latency.record('login_corrected', done - intended)
+        self.hlog.record(f"login @ {stats.rate:g}/s", done - started)
+        time.sleep(HOLD_SECONDS)
+        started = time.perf_counter()
+        if self.logout(*result):
+            stats.latency.record('logout', time.perf_counter() - started)
+
+    # --- Фазы ---
+    def run_step(self, rate):
+        """Одна ступень: rate входов в секунду в течение STEP_SECONDS"""
+        stats = StepStats(rate)
+        total = max(1, int(rate * STEP_SECONDS))
+        pool = ThreadPoolExecutor(max_workers=MAX_INFLIGHT, thread_name_prefix='login')
+        try:
+            origin = time.perf_counter()
+            for i in range(total):
+                intended = origin + i / rate
+                delay = intended - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+                pool.submit(self.cycle, stats, intended)
+        except BaseException:
+            # При SIGTERM очередь входов отменяется до очистки
+            pool.shutdown(cancel_futures=True)
+            raise
+        # Входы в очереди за MAX_INFLIGHT тоже часть ступени: их задержка считается от intended
+        pool.shutdown(wait=True)
+        elapsed = time.perf_counter() - origin
+        summary = stats.summary(elapsed)
+        logger.info(
+            "Ступень %g входов/с: создано %s из %s, p99 входа %s мс, отказов %.1f%%",
+            rate, stats.created, stats.attempts,
+            summary.get('login_ms', {}).get('p99'), stats.failure_ratio * 100,
+        )
+        return stats, summary
+
+    def ramp(self):
+        steps = []
+        saturation = None
+        for rate in RATES:
+            stats, summary = self.run_step(rate)
+            steps.append(summary)
+            if stats.failure_ratio > FAILURE_THRESHOLD:
+                saturation = {'rate': rate, 'failure_ratio': summary['failure_ratio'], 'errors': summary['errors']}
+                logger.warning("Насыщение SessionService на %g входов/с", rate)
+                break
+        self.report['steps'] = steps
+        self.report['saturation'] = saturation
+
+    def probe_capacity(self):
+        """Создает сессии без удаления до первого отказа, затем измеряет освобождение таблицы"""
+        held = []
+        failure = None
+        started = time.perf_counter()
+        while len(held) < CAPACITY_LIMIT:
+            result = self.login()
+            if isinstance(result, str):
+                failure = result
+                break
+            held.append(result)
+        capacity = {
+            'created': len(held),
+            'preexisting': len(self.baseline),
+            'limit_reached': failure is not None,
+            'first_failure': failure,
+            'fill_seconds': round(time.perf_counter() - started, 3),
+        }
+        logger.info("Емкость таблицы сессий: создано %s (отказ: %s)", len(held), failure or 'нет')
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=min(MAX_INFLIGHT, 16), thread_name_prefix='logout') as pool:
+            list(pool.map(lambda session: self.logout(*session), held))
+        capacity['delete_seconds'] = round(time.perf_counter() - started, 3)
+        capacity.update(self.wait_reclaimed(started))
+        self.report['capacity'] = capacity
+
+    def wait_reclaimed(self, started):
+        """Время до возврата коллекции к исходному размеру и до первого успешного входа"""
+        result = {'reclaim_seconds': None, 'login_after_reclaim_ms': None}
+        deadline = time.monotonic() + RECLAIM_TIMEOUT
+        while time.monotonic() < deadline:
+            try:
+                if len(self.list_sessions() - self.baseline) == 0:
+                    result['reclaim_seconds'] = round(time.perf_counter() - started, 3)
+                    break
+            except requests.exceptions.RequestException as e:
+                logger.debug("Коллекция сессий недоступна: %s", e)
+            time.sleep(0.2)
+        login_started = time.perf_counter()
+        login = self.login()
+        if not isinstance(login, str):
+            result['login_after_reclaim_ms'] = round((time.perf_counter() - login_started) * 1000, 2)
+            self.logout(*login)
+        return result
+
+    def cleanup(self):
+        """Удаляет сессии бенчмарка: по журналу и по метке прогона в коллекции"""
+        pending = self.ledger.pending()
+        for uri, token in pending.items():
+            if not self.logout(uri, token):
+                self.logout(uri)
+        swept = 0
+        try:
+            for uri in (self.list_sessions() - self.baseline if self.context else ()):
+                response = self.control.get(f"{self.origin}{uri}", timeout=REQUEST_TIMEOUT)
+                if response.status_code == 200 and response.json().get('Context') == self.context:
+                    swept += self.logout(uri)
+            leaked = len(self.ledger)
+        except requests.exceptions.RequestException as e:
+            logger.error("Не удалось проверить коллекцию сессий после теста: %s", e)
+            leaked = len(self.ledger)
+        self.report['cleanup'] = {'ledger': len(pending), 'swept': swept, 'leaked': leaked}
+        if leaked:
+            logger.error("После теста осталось сессий: %s", leaked)
+        return leaked
+
+    def run(self):
+        self.baseline = self.list_sessions()
+        self.report['session_timeout'] = self.session_timeout()
+        try:
+            self.ramp()
+            self.probe_capacity()
+        finally:
+            leaked = self.cleanup()
+            self.save()
+        return leaked
+
+    def save(self):
+        os.makedirs(REPORTS_DIR, exist_ok=True)
+        with open(os.path.join(REPORTS_DIR, 'session_bench.json'), 'w', encoding='utf-8') as f:
+            json.dump(self.report, f, indent=2, ensure_ascii=False)
+        self.hlog.export(os.path.join(REPORTS_DIR, 'latency_session_bench.hlog'))
+
+
+def _terminate(signum, frame):
+    # SIGTERM (остановка сборки Jenkins) превращается в исключение, чтобы выполнилась очистка
+    raise SystemExit(128 + signum)
+
+
+if __name__ == "__main__":
+    setup_logging('session_bench')
+    signal.signal(signal.SIGTERM, _terminate)
+    benchmark = SessionBenchmark()
+    try:
+        leaked = benchmark.run()
+    except requests.exceptions.RequestException as e:
+        logger.error("SessionService недоступен: %s", e)
+        sys.exit(1)
+    saturation = benchmark.report.get('saturation')
+    capacity = benchmark.report.get('capacity', {})
+    print(
+        f"Saturation: {saturation['rate'] if saturation else 'not reached'} logins/s; "
+        f"session table: {capacity.get('created')} sessions, reclaimed in {capacity.get('reclaim_seconds')} s"
+    )
+    sys.exit(1 if leaked else 0)
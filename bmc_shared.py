@@ -0,0 +1,148 @@
+"""Общее состояние тестов между воркерами pytest-xdist.
+
+* SharedStore - JSON значения (токен сессии, /Systems/system), которые создает
+  первый воркер под файловой блокировкой, а остальные читают готовыми.
+* BMCStateLock - блокировка читатели/писатель: обычные тесты выполняются
+  параллельно, тест, меняющий состояние BMC (маркер mutates_bmc), ждет их
+  завершения и выполняется монопольно.
+* DurationHistory - длительности тестов прошлых прогонов; тесты упорядочиваются
+  от долгих к коротким, и --dist load распределяет их между воркерами равномерно.
+
+Без xdist все блокировки просто не конкурируют. Используется fcntl.flock (Linux).
+"""
+import fcntl
+import json
+import os
+import statistics
+import threading
+from contextlib import contextmanager
+
+# --- Конфигурация ---
+ROOT = os.path.dirname(os.path.abspath(__file__))
+DURATIONS_PATH = os.getenv('TEST_DURATIONS', os.path.join(ROOT, '.test_durations.json'))
+
+
+def xdist_worker():
+    """Имя воркера xdist (gw0, gw1, ...) или None в основном процессе"""
+    return os.getenv('PYTEST_XDIST_WORKER')
+
+
+@contextmanager
+def file_lock(path, exclusive=True):
+    with open(path, 'a+') as f:
+        fcntl.flock(f, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+        try:
+            yield
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+
+class SharedStore:
+    """Значения, общие для всех воркеров одного прогона (каталог - общий basetemp)"""
+
+    def __init__(self, directory):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        self.state = BMCStateLock(directory)
+
+    def _path(self, key, suffix):
+        return os.path.join(self.directory, f"{key}.{suffix}")
+
+    def get_or_create(self, key, factory):
+        """Возвращает сохраненное значение или создает его factory() (один раз на прогон)
+
+        Если factory() выбрасывает исключение (в том числе pytest.skip), ничего не
+        сохраняется, и следующий воркер попробует снова.
+        """
+        path = self._path(key, 'json')
+        with file_lock(self._path(key, 'lock')):
+            if os.path.exists(path):
+                with open(path, encoding='utf-8') as f:
+                    return json.load(f)
+            value = factory()
+            tmp_path = f"{path}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(value, f)
+            os.replace(tmp_path, path)
+            return value
+
+    def invalidate(self, key):
+        with file_lock(self._path(key, 'lock')):
+            try:
+                os.remove(self._path(key, 'json'))
+            except FileNotFoundError:
+                pass
+
+
+class BMCStateLock:
+    """Читатели/писатель на flock с турникетом, чтобы писатель не ждал бесконечно
+
+    Писатель сначала занимает турникет: новые читатели останавливаются на нем,
+    а уже работающие завершаются и освобождают блокировку состояния.
+    """
+
+    def __init__(self, directory):
+        self.gate = os.path.join(directory, 'bmc_state.gate')
+        self.lock = os.path.join(directory, 'bmc_state.lock')
+
+    @contextmanager
+    def shared(self):
+        with file_lock(self.gate):
+            pass
+        with file_lock(self.lock, exclusive=False):
+            yield
+
+    @contextmanager
+    def exclusive(self):
+        with file_lock(self.gate):
+            with file_lock(self.lock):
+                yield
+
+
+class DurationHistory:
+    """Длительности тестов (setup + call + teardown) по node ID между прогонами"""
+
+    def __init__(self, path=DURATIONS_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        try:
+            with open(path, encoding='utf-8') as f:
+                self.durations = json.load(f)
+        except (FileNotFoundError, ValueError):
+            self.durations = {}
+        self._current = {}
+        self._not_run = set()
+
+    def order(self, items):
+        """Сортирует тесты по убыванию длительности; новые тесты считаются самыми долгими
+
+        Порядок зависит только от файла истории, поэтому совпадает на всех воркерах.
+        """
+        known = [self.durations[item.nodeid] for item in items if item.nodeid in self.durations]
+        unknown = max(known) if known else 0.0
+        items.sort(key=lambda item: -self.durations.get(item.nodeid, unknown))
+
+    def record(self, report):
+        """Учитывает фазу теста; пропущенные тесты (skip, кэш результатов, circuit breaker) не учитываются"""
+        with self._lock:
+            if report.skipped or 'impact_cached' in report.keywords or 'breaker_open' in report.keywords:
+                self._not_run.add(report.nodeid)
+            self._current[report.nodeid] = self._current.get(report.nodeid, 0.0) + report.duration
+
+    def save(self):
+        with self._lock:
+            if not self._current:
+                return
+            # Сглаживаем с прошлым значением, чтобы один медленный прогон не ломал порядок.
+            # Длительность невыполненного теста (~0 с) не сохраняется, прошлое значение остается
+            for nodeid, duration in self._current.items():
+                if nodeid in self._not_run:
+                    continue
+                previous = self.durations.get(nodeid)
+                self.durations[nodeid] = round(
+                    duration if previous is None else statistics.mean((previous, duration)), 3
+                )
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(self.durations, f, indent=2, sort_keys=True)
+            os.replace(tmp_path, self.path)
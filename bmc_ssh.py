@@ -0,0 +1,302 @@
+"""Мультиплексированный SSH канал к BMC для диагностики во время тестов.
+
+Одно SSH соединение (порт 2222 проброшен QEMU на 22 BMC) держится весь прогон.
+Команды пакета выполняются параллельно, каждая в своем канале этого соединения,
+поэтому выборка стоит один RTT, а не новый TCP и SSH handshake на каждую команду.
+
+* DiagnosticsSampler раз в SSH_SAMPLE_INTERVAL секунд снимает загрузку CPU
+  системы и bmcweb, память, load average и задержку вызова D-Bus. Выборки
+  попадают в трассу (counter события рядом со спанами тестов) и в
+  reports/bmc_diag_<name>.json.
+* snapshot() добавляет хвост журнала; conftest.py прикладывает его к отчету
+  теста, выполнявшегося дольше SSH_SLOW_TEST секунд.
+
+Нужен paramiko; он импортируется при подключении, поэтому модуль загружается и
+без него. Ключ хоста не проверяется: у эмулируемого BMC он новый в каждом образе.
+
+    SSH_DIAG=1 python -m pytest tests_Redfish.py
+    python bmc_ssh.py snapshot
+"""
+import json
+import logging
+import os
+import statistics
+import sys
+import threading
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+from bmc_trace import tracer
+
+logger = logging.getLogger(__name__)
+
+# --- Конфигурация ---
+REPORTS_DIR = os.getenv('REPORTS_DIR', 'reports')
+# SSH_DIAG=1 - снимать диагностику BMC по SSH во время Redfish и Locust тестов
+ENABLED = os.getenv('SSH_DIAG', '0') == '1'
+SSH_HOST = os.getenv('SSH_HOST', '127.0.0.1')
+SSH_PORT = int(os.getenv('SSH_PORT', '2222'))
+SSH_USERNAME = "root"
+SSH_PASSWORD = "0penBmc"
+SSH_TIMEOUT = float(os.getenv('SSH_TIMEOUT', '10'))
+SAMPLE_INTERVAL = float(os.getenv('SSH_SAMPLE_INTERVAL', '5'))
+SLOW_TEST_SECONDS = float(os.getenv('SSH_SLOW_TEST', '5'))
+BMCWEB_PROCESS = os.getenv('SSH_BMCWEB_PROCESS', 'bmcweb')
+JOURNAL_LINES = int(os.getenv('SSH_JOURNAL_LINES', '30'))
+MAX_CHANNELS = 8
+PAGE_SIZE = 4096
+
+# Пакет диагностики: каждая команда выполняется в отдельном канале
+DIAGNOSTICS = {
+    'noop': 'true',
+    'loadavg': 'cat /proc/loadavg',
+    'cpu': 'head -n 1 /proc/stat',
+    'meminfo': 'cat /proc/meminfo',
+    'bmcweb': f'pid=$(pidof -s {BMCWEB_PROCESS}) && cat /proc/$pid/stat',
+    'dbus': 'busctl call org.freedesktop.DBus /org/freedesktop/DBus org.freedesktop.DBus.Peer Ping',
+}
+JOURNAL = f'journalctl -n {JOURNAL_LINES} -o short-monotonic --no-pager'
+
+CommandResult = namedtuple('CommandResult', 'status stdout stderr seconds')
+
+
+class SSHChannel:
+    """Одно SSH соединение; команды выполняются параллельно в отдельных каналах"""
+
+    def __init__(self, host=SSH_HOST, port=SSH_PORT, username=SSH_USERNAME, password=SSH_PASSWORD,
+                 timeout=SSH_TIMEOUT):
+        self.host = host
+        self.port = port
+        self.username = username
+        self.password = password
+        self.timeout = timeout
+        self._client = None
+        self._lock = threading.Lock()
+        self._pool = ThreadPoolExecutor(max_workers=MAX_CHANNELS, thread_name_prefix='ssh')
+        self.stats = {'connects': 0, 'commands': 0, 'failed': 0}
+
+    def transport(self):
+        """Активный транспорт; переподключается, если соединение оборвалось"""
+        with self._lock:
+            transport = self._client.get_transport() if self._client else None
+            if transport is not None and transport.is_active():
+                return transport
+            import paramiko
+
+            if self._client is not None:
+                self._client.close()
+            client = paramiko.SSHClient()
+            client.set_missing_host_key_policy(paramiko.AutoAddPolicy())
+            started = time.perf_counter()
+            client.connect(
+                self.host, port=self.port, username=self.username, password=self.password,
+                timeout=self.timeout, banner_timeout=self.timeout, auth_timeout=self.timeout,
+                look_for_keys=False, allow_agent=False,
+            )
+            transport = client.get_transport()
+            transport.set_keepalive(15)
+            self._client = client
+            self.stats['connects'] += 1
+            logger.info(
+                "SSH соединение с %s:%s установлено за %.0f мс",
+                self.host, self.port, (time.perf_counter() - started) * 1000,
+            )
+            return transport
+
+    def run(self, command, timeout=None):
+        """Выполняет команду в новом канале; ошибки не выбрасываются, а попадают в результат"""
+        timeout = timeout or self.timeout
+        started = time.perf_counter()
+        try:
+            channel = self.transport().open_session(timeout=timeout)
+            try:
+                channel.settimeout(timeout)
+                channel.exec_command(command)
+                stdout = channel.makefile('rb').read()
+                stderr = channel.makefile_stderr('rb').read()
+                status = channel.recv_exit_status()
+            finally:
+                channel.close()
+        except Exception as e:  # paramiko.SSHException, socket.timeout, OSError, ImportError
+            self.stats['failed'] += 1
+            return CommandResult(None, '', f"{type(e).__name__}: {e}", time.perf_counter() - started)
+        self.stats['commands'] += 1
+        return CommandResult(
+            status, stdout.decode('utf-8', 'replace'), stderr.decode('utf-8', 'replace'),
+            time.perf_counter() - started,
+        )
+
+    def run_many(self, commands, timeout=None):
+        """{имя: команда} -> {имя: CommandResult}; все команды идут одновременно"""
+        # Сначала соединение, чтобы параллельные каналы не открывали его наперегонки
+        try:
+            self.transport()
+        except Exception as e:  # нет paramiko или BMC недоступен
+            error = CommandResult(None, '', f"{type(e).__name__}: {e}", 0.0)
+            self.stats['failed'] += len(commands)
+            return {name: error for name in commands}
+        futures = {name: self._pool.submit(self.run, command, timeout) for name, command in commands.items()}
+        return {name: future.result() for name, future in futures.items()}
+
+    def close(self):
+        with self._lock:
+            if self._client is not None:
+                self._client.close()
+                self._client = None
+
+
+# --- Разбор выборки ---
+def parse_cpu(result):
+    """/proc/stat -> (всего jiffies, простой jiffies)"""
+    if result.status != 0 or not result.stdout.startswith('cpu'):
+        return None
+    values = [int(value) for value in result.stdout.split()[1:]]
+    return sum(values), values[3] + (values[4] if len(values) > 4 else 0)
+
+
+def parse_process(result):
+    """/proc/<pid>/stat -> (utime + stime jiffies, RSS в байтах)"""
+    if result.status != 0 or ')' not in result.stdout:
+        return None
+    fields = result.stdout.rsplit(')', 1)[1].split()
+    return int(fields[11]) + int(fields[12]), int(fields[21]) * PAGE_SIZE
+
+
+def parse_meminfo(result):
+    if result.status != 0:
+        return {}
+    values = {}
+    for line in result.stdout.splitlines():
+        key, _, rest = line.partition(':')
+        if rest.strip():
+            values[key] = int(rest.split()[0]) * 1024
+    return values
+
+
+def _percent(part, total):
+    return round(part * 100.0 / total, 2) if total else None
+
+
+class DiagnosticsSampler:
+    """Фоновые выборки диагностики BMC по SSH с выравниванием по трассе тестов
+
+    context - функция, возвращающая метрики клиента на момент выборки (например,
+    текущие RPS и p95 Locust), чтобы нагрузку на BMC можно было сопоставить с ними.
+    """
+
+    def __init__(self, channel=None, interval=SAMPLE_INTERVAL, context=None):
+        self.channel = channel or SSHChannel()
+        self.interval = interval
+        self.context = context
+        self.samples = []
+        self._previous = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    def sample(self):
+        results = self.channel.run_many(DIAGNOSTICS)
+        at = time.perf_counter()
+        sample = {'timestamp': time.time()}
+        if results['noop'].status is None:
+            sample['error'] = results['noop'].stderr
+            self.samples.append(sample)
+            return sample
+
+        cpu = parse_cpu(results['cpu'])
+        process = parse_process(results['bmcweb'])
+        memory = parse_meminfo(results['meminfo'])
+        if results['loadavg'].status == 0:
+            sample['loadavg'] = [float(value) for value in results['loadavg'].stdout.split()[:3]]
+        if self._previous and cpu and self._previous[0]:
+            total = cpu[0] - self._previous[0][0]
+            sample['cpu_percent'] = _percent(total - (cpu[1] - self._previous[0][1]), total)
+            if process and self._previous[1]:
+                sample['bmcweb_cpu_percent'] = _percent(process[0] - self._previous[1][0], total)
+        if process:
+            sample['bmcweb_rss_bytes'] = process[1]
+        sample['mem_available_bytes'] = memory.get('MemAvailable')
+        # Задержка вызова D-Bus за вычетом стоимости пустой команды в том же канале
+        if results['dbus'].status == 0:
+            sample['dbus_ms'] = round((results['dbus'].seconds - results['noop'].seconds) * 1000, 2)
+        sample['ssh_rtt_ms'] = round(results['noop'].seconds * 1000, 2)
+        self._previous = (cpu, process)
+        if self.context is not None:
+            sample.update(self.context())
+        self.samples.append(sample)
+
+        tracer.add_counter('BMC CPU %', {
+            'system': sample.get('cpu_percent'), 'bmcweb': sample.get('bmcweb_cpu_percent'),
+        }, at, category='bmc')
+        tracer.add_counter('BMC D-Bus ms', {'ping': sample.get('dbus_ms')}, at, category='bmc')
+        return sample
+
+    def snapshot(self):
+        """Текущие показатели и хвост журнала в виде текста для отчета теста"""
+        results = self.channel.run_many(dict(DIAGNOSTICS, journal=JOURNAL))
+        lines = []
+        for name in ('loadavg', 'cpu', 'bmcweb', 'dbus', 'journal'):
+            result = results[name]
+            lines.append(f"--- {name} (exit {result.status}, {result.seconds * 1000:.0f} ms)")
+            lines.append((result.stdout or result.stderr).rstrip())
+        return '\n'.join(lines)
+
+    def _run(self):
+        while not self._stop.is_set():
+            self.sample()
+            self._stop.wait(self.interval)
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name='bmc-ssh-diag', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.interval + SSH_TIMEOUT)
+            self._thread = None
+
+    def summary(self):
+        result = {'samples': len(self.samples)}
+        for key in ('cpu_percent', 'bmcweb_cpu_percent', 'dbus_ms', 'ssh_rtt_ms'):
+            values = [sample[key] for sample in self.samples if sample.get(key) is not None]
+            if values:
+                result[key] = {'mean': round(statistics.mean(values), 2), 'max': max(values)}
+        return result
+
+    def report(self, name):
+        """Сохраняет выборки в reports/bmc_diag_<name>.json"""
+        if not self.samples:
+            return None
+        data = {
+            'interval_s': self.interval,
+            'summary': self.summary(),
+            'channel': dict(self.channel.stats),
+            'samples': self.samples,
+        }
+        os.makedirs(REPORTS_DIR, exist_ok=True)
+        path = os.path.join(REPORTS_DIR, f"bmc_diag_{name}.json")
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, indent=2, ensure_ascii=False)
+        logger.info("Диагностика BMC по SSH: %s выборок, %s", len(self.samples), data['summary'])
+        return path
+
+
+diagnostics = DiagnosticsSampler()
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2 or sys.argv[1] not in ('snapshot', 'sample'):
+        print(__doc__)
+        sys.exit(2)
+
+    if sys.argv[1] == 'snapshot':
+        print(diagnostics.snapshot())
+    else:
+        diagnostics.sample()
+        time.sleep(1)
+        print(json.dumps(diagnostics.sample(), indent=2))
+    diagnostics.channel.close()
@@ -0,0 +1,111 @@
+"""Локальная заглушка SSH сервера BMC для проверки bmc_ssh.py без QEMU.
+
+Принимает вход root/0penBmc по паролю и выполняет exec запросы через /bin/sh
+на локальной машине, поэтому /proc, pidof и journalctl отвечают данными хоста.
+Процесс вместо bmcweb задается SSH_BMCWEB_PROCESS на стороне клиента.
+
+    python bmc_ssh_standin.py --port 2922
+    SSH_PORT=2922 SSH_BMCWEB_PROCESS=python3 python bmc_ssh.py sample
+"""
+import argparse
+import logging
+import socket
+import subprocess
+import threading
+
+import paramiko
+
+from bmc_log import setup_logging
+from bmc_ssh import SSH_PASSWORD, SSH_USERNAME
+
+logger = logging.getLogger(__name__)
+
+
+class StandinServer(paramiko.ServerInterface):
+    """Пароль и exec каналы; shell и проброс портов не поддерживаются"""
+
+    def get_allowed_auths(self, username):
+        return 'password'
+
+    def check_auth_password(self, username, password):
+        if username == SSH_USERNAME and password == SSH_PASSWORD:
+            return paramiko.AUTH_SUCCESSFUL
+        return paramiko.AUTH_FAILED
+
+    def check_channel_request(self, kind, chanid):
+        if kind == 'session':
+            return paramiko.OPEN_SUCCEEDED
+        return paramiko.OPEN_FAILED_ADMINISTRATIVELY_PROHIBITED
+
+    def check_channel_exec_request(self, channel, command):
+        threading.Thread(target=self.execute, args=(channel, command), daemon=True).start()
+        return True
+
+    @staticmethod
+    def execute(channel, command):
+        try:
+            process = subprocess.run(
+                ['/bin/sh', '-c', command.decode('utf-8')], capture_output=True, timeout=30,
+            )
+            channel.sendall(process.stdout)
+            channel.sendall_stderr(process.stderr)
+            channel.send_exit_status(process.returncode)
+        except (subprocess.TimeoutExpired, OSError) as e:
+            channel.sendall_stderr(f"{e}\n".encode('utf-8'))
+            channel.send_exit_status(255)
+        finally:
+            channel.close()
+
+
+class SSHStandin:
+    def __init__(self, host='127.0.0.1', port=0):
+        self.host_key = paramiko.RSAKey.generate(2048)
+        self.socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self.socket.bind((host, port))
+        self.socket.listen(16)
+        self.address = self.socket.getsockname()
+        self.transports = []
+
+    def serve_forever(self):
+        while True:
+            try:
+                client, peer = self.socket.accept()
+            except OSError:
+                return  # сокет закрыт shutdown()
+            transport = paramiko.Transport(client)
+            transport.add_server_key(self.host_key)
+            try:
+                transport.start_server(server=StandinServer())
+            except paramiko.SSHException as e:
+                logger.warning("Заглушка SSH: ошибка согласования с %s: %s", peer, e)
+                continue
+            self.transports.append(transport)
+
+    def shutdown(self):
+        self.socket.close()
+        for transport in self.transports:
+            transport.close()
+
+
+def start_standin(host='127.0.0.1', port=0):
+    """Запускает заглушку в фоновом потоке; возвращает (сервер, порт)"""
+    server = SSHStandin(host, port)
+    threading.Thread(target=server.serve_forever, name='ssh-standin', daemon=True).start()
+    logger.info("Заглушка SSH запущена: %s:%s", *server.address)
+    return server, server.address[1]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=2922)
+    args = parser.parse_args()
+
+    setup_logging('ssh_standin')
+    server = SSHStandin(args.host, args.port)
+    logger.info("Заглушка SSH: %s:%s", args.host, args.port)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        server.shutdown()
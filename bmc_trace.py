@@ -0,0 +1,252 @@
+"""Инструментирование тестов: тайминги HTTP/WebDriver и экспорт трассы в Chrome Trace формате.
+
+Трассу из reports/trace_*.json можно открыть в chrome://tracing или https://ui.perfetto.dev
+"""
+import functools
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from urllib.parse import urlsplit
+
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+
+from bmc_hdr import latency
+
+logger = logging.getLogger(__name__)
+
+# --- Конфигурация ---
+REPORTS_DIR = os.getenv('REPORTS_DIR', 'reports')
+TRACE_ENABLED = os.getenv('TRACE_ENABLED', '1') != '0'
+
+
+class Tracer:
+    """Потокобезопасный сборщик спанов (complete events, ph='X')"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._events = []
+        self._origin = time.perf_counter()
+        self._started_at = time.time()
+        self._local = threading.local()
+        self.current_test = None
+
+    def add_span(self, name, category, start, end, **args):
+        """Добавляет спан по отметкам time.perf_counter()"""
+        if not TRACE_ENABLED:
+            return
+        if self.current_test:
+            args['test'] = self.current_test
+        event = {
+            'name': name,
+            'cat': category,
+            'ph': 'X',
+            'ts': round((start - self._origin) * 1e6, 3),
+            'dur': round((end - start) * 1e6, 3),
+            'pid': os.getpid(),
+            'tid': threading.get_ident(),
+            'args': args,
+        }
+        with self._lock:
+            self._events.append(event)
+
+    def add_counter(self, name, values, at=None, category='counter'):
+        """Counter событие (ph='C'): значения на момент at (time.perf_counter()) рядом со спанами"""
+        if not TRACE_ENABLED:
+            return
+        event = {
+            'name': name,
+            'cat': category,
+            'ph': 'C',
+            'ts': round(((time.perf_counter() if at is None else at) - self._origin) * 1e6, 3),
+            'pid': os.getpid(),
+            'args': {key: value for key, value in values.items() if value is not None},
+        }
+        with self._lock:
+            self._events.append(event)
+
+    @contextmanager
+    def span(self, name, category, **args):
+        """Контекстный менеджер для замера произвольного участка кода"""
+        start = time.perf_counter()
+        try:
+            yield args
+        finally:
+            self.add_span(name, category, start, time.perf_counter(), **args)
+
+    @contextmanager
+    def test_scope(self, nodeid):
+        """Помечает все спаны внутри блока node ID теста"""
+        self.current_test = nodeid
+        try:
+            with self.span(nodeid, 'test'):
+                yield
+        finally:
+            self.current_test = None
+
+    def events(self):
+        with self._lock:
+            return list(self._events)
+
+    def clear(self):
+        with self._lock:
+            self._events.clear()
+
+    def export(self, path):
+        """Сохраняет трассу в JSON (Chrome Trace Event Format)"""
+        events = self.events()
+        if not events:
+            return None
+
+        metadata = [{
+            'name': 'process_name',
+            'ph': 'M',
+            'pid': os.getpid(),
+            'args': {'name': os.path.basename(path)},
+        }]
+        trace = {
+            'traceEvents': metadata + events,
+            'displayTimeUnit': 'ms',
+            'otherData': {
+                'started_at': self._started_at,
+                'span_count': len(events),
+            },
+        }
+
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(trace, f, ensure_ascii=False)
+        logger.info("Трасса сохранена: %s (%s спанов)", path, len(events))
+        return path
+
+
+tracer = Tracer()
+
+
+# --- Инструментирование urllib3/requests ---
+class _TracedConnectionMixin:
+    """Замеряет TCP connect и TLS handshake отдельными спанами"""
+
+    def _new_conn(self):
+        start = time.perf_counter()
+        try:
+            return super()._new_conn()
+        finally:
+            end = time.perf_counter()
+            tracer.add_span('connect', 'net', start, end, host=self.host, port=self.port)
+            tracer._local.tcp_end = end
+
+    def connect(self):
+        tracer._local.tcp_end = None
+        super().connect()
+        end = time.perf_counter()
+        tcp_end = getattr(tracer._local, 'tcp_end', None)
+        if isinstance(self, HTTPSConnection) and tcp_end is not None:
+            tracer.add_span('tls', 'net', tcp_end, end, host=self.host)
+        tracer._local.connect_end = end
+
+
+class TracedHTTPConnection(_TracedConnectionMixin, HTTPConnection):
+    pass
+
+
+class TracedHTTPSConnection(_TracedConnectionMixin, HTTPSConnection):
+    pass
+
+
+class TracedHTTPConnectionPool(HTTPConnectionPool):
+    ConnectionCls = TracedHTTPConnection
+
+
+class TracedHTTPSConnectionPool(HTTPSConnectionPool):
+    ConnectionCls = TracedHTTPSConnection
+
+
+class TracingAdapter(HTTPAdapter):
+    """HTTPAdapter, записывающий спаны ttfb/download/parse для каждого запроса"""
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            'http': TracedHTTPConnectionPool,
+            'https': TracedHTTPSConnectionPool,
+        }
+
+    def send(self, request, stream=False, **kwargs):
+        tracer._local.connect_end = None
+        label = f"{request.method} {urlsplit(request.url).path}"
+
+        start = time.perf_counter()
+        response = super().send(request, stream=stream, **kwargs)
+        headers_at = time.perf_counter()
+
+        # TTFB считаем от окончания установки соединения (если оно было новым)
+        first_byte_from = getattr(tracer._local, 'connect_end', None) or start
+        tracer.add_span('ttfb', 'http', first_byte_from, headers_at,
+                        request=label, status=response.status_code)
+
+        end = headers_at
+        if not stream:
+            # Session.send всё равно прочитает тело; читаем здесь, чтобы замерить загрузку
+            body = response.content
+            end = time.perf_counter()
+            tracer.add_span('download', 'http', headers_at, end,
+                            request=label, bytes=len(body or b''))
+
+        tracer.add_span(label, 'http', start, end, status=response.status_code)
+        latency.record(label, end - start)
+        _wrap_json(response, label)
+        return response
+
+
+def _wrap_json(response, label):
+    """Подменяет response.json() версией, записывающей спан parse"""
+    original = response.json
+
+    @functools.wraps(original)
+    def traced_json(**kwargs):
+        with tracer.span('parse', 'http', request=label):
+            return original(**kwargs)
+
+    response.json = traced_json
+
+
+def instrument_session(session):
+    """Подключает трассировку к requests.Session"""
+    if TRACE_ENABLED and not isinstance(session.get_adapter('https://'), TracingAdapter):
+        adapter = TracingAdapter()
+        session.mount('https://', adapter)
+        session.mount('http://', adapter)
+    return session
+
+
+# --- Инструментирование Selenium ---
+def instrument_driver(driver):
+    """Оборачивает command executor WebDriver: каждая команда - отдельный спан"""
+    if not TRACE_ENABLED:
+        return driver
+
+    executor = driver.command_executor
+    original = executor.execute
+
+    @functools.wraps(original)
+    def traced_execute(command, params):
+        start = time.perf_counter()
+        try:
+            return original(command, params)
+        finally:
+            end = time.perf_counter()
+            tracer.add_span(command, 'webdriver', start, end)
+            latency.record(f"webdriver {command}", end - start)
+
+    executor.execute = traced_execute
+    return driver
+
+
+def trace_path(name):
+    """Путь к файлу трассы в каталоге отчетов"""
+    return os.path.join(REPORTS_DIR, f"trace_{name}.json")
@@ -0,0 +1,247 @@
+"""Общий транспорт к BMC: пул соединений, keep-alive и повторное использование TLS сессий.
+
+Полный TLS handshake на эмулируемом ARM ядре bmcweb дорогой, поэтому все сессии
+(PyTest фикстуры, отдельные сессии тестов, пользователи Locust) используют один
+SSL контекст с кэшем TLS сессий и считают, сколько handshake удалось сэкономить.
+"""
+import json
+import logging
+import os
+import socket
+import ssl
+import threading
+
+import requests
+from urllib3.connection import HTTPConnection
+
+from bmc_trace import (
+    TracedHTTPConnectionPool,
+    TracedHTTPSConnection,
+    TracedHTTPSConnectionPool,
+    TracingAdapter,
+)
+
+logger = logging.getLogger(__name__)
+
+# --- Конфигурация ---
+REPORTS_DIR = os.getenv('REPORTS_DIR', 'reports')
+# Размер пула по умолчанию соответствует числу пользователей Locust
+POOL_MAXSIZE = int(os.getenv('BMC_POOL_SIZE', os.getenv('LOCUST_USERS', '5')))
+TLS_RESUMPTION = os.getenv('BMC_TLS_RESUMPTION', '1') != '0'
+
+# TCP keep-alive, чтобы простаивающие соединения не закрывались NAT-ом QEMU
+SOCKET_OPTIONS = HTTPConnection.default_socket_options + [
+    (socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1),
+]
+
+
+class HandshakeStats:
+    """Счетчики TLS handshake за прогон"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.full = 0
+        self.resumed = 0
+        self.http2_offered = None
+
+    def record(self, resumed):
+        with self._lock:
+            if resumed:
+                self.resumed += 1
+            else:
+                self.full += 1
+
+    def as_dict(self):
+        with self._lock:
+            total = self.full + self.resumed
+            data = {
+                'handshakes_total': total,
+                'handshakes_full': self.full,
+                'handshakes_resumed': self.resumed,
+                'resumption_ratio': round(self.resumed / total, 3) if total else 0.0,
+            }
+        if self.http2_offered is not None:
+            data['http2_offered'] = self.http2_offered
+        return data
+
+    def report(self, name):
+        """Логирует счетчики и сохраняет их в reports/transport_<name>.json"""
+        data = self.as_dict()
+        logger.info(
+            "TLS handshakes: всего %s, полных %s, возобновленных %s",
+            data['handshakes_total'], data['handshakes_full'], data['handshakes_resumed'],
+        )
+        if not data['handshakes_total']:
+            return data
+
+        os.makedirs(REPORTS_DIR, exist_ok=True)
+        path = os.path.join(REPORTS_DIR, f"transport_{name}.json")
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, indent=2)
+        return data
+
+
+handshake_stats = HandshakeStats()
+
+
+def _session_key(ssl_sock, server_hostname):
+    """(хост, порт) соединения: для IP адресов server_hostname равен None"""
+    try:
+        peer_host, peer_port = ssl_sock.getpeername()[:2]
+    except OSError:
+        return None
+    return (server_hostname or peer_host, peer_port)
+
+
+class _SessionCache:
+    """Последняя TLS сессия (тикет) для каждой пары (хост, порт)"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._sessions = {}
+
+    def get(self, key):
+        if key is None:
+            return None
+        with self._lock:
+            return self._sessions.get(key)
+
+    def remember(self, key, ssl_sock):
+        session = getattr(ssl_sock, 'session', None)
+        if key is None or session is None or not TLS_RESUMPTION:
+            return
+        with self._lock:
+            self._sessions[key] = session
+
+    def clear(self):
+        with self._lock:
+            self._sessions.clear()
+
+
+class ResumingSSLContext(ssl.SSLContext):
+    """SSL контекст, подставляющий сохраненную TLS сессию при новом соединении"""
+
+    def wrap_socket(self, sock, *args, server_hostname=None, session=None, **kwargs):
+        key = _session_key(sock, server_hostname)
+        if session is None and TLS_RESUMPTION:
+            session = self.session_cache.get(key)
+        ssl_sock = super().wrap_socket(
+            sock, *args, server_hostname=server_hostname, session=session, **kwargs
+        )
+        handshake_stats.record(ssl_sock.session_reused)
+        self.session_cache.remember(key, ssl_sock)
+        return ssl_sock
+
+
+def create_ssl_context(verify=False):
+    """Создает общий контекст; проверку имени хоста выполняет urllib3"""
+    context = ResumingSSLContext(ssl.PROTOCOL_TLS_CLIENT)
+    # Сессия привязана к контексту, поэтому кэш у каждого контекста свой
+    context.session_cache = _SessionCache()
+    context.check_hostname = False
+    if verify:
+        context.verify_mode = ssl.CERT_REQUIRED
+        context.load_default_certs()
+    else:
+        context.verify_mode = ssl.CERT_NONE
+    context.set_alpn_protocols(['http/1.1'])
+    return context
+
+
+_shared_contexts = {}
+_contexts_lock = threading.Lock()
+
+
+def shared_ssl_context(verify=False):
+    with _contexts_lock:
+        if verify not in _shared_contexts:
+            _shared_contexts[verify] = create_ssl_context(verify)
+        return _shared_contexts[verify]
+
+
+# --- Соединения и адаптер ---
+class ResumingHTTPSConnection(TracedHTTPSConnection):
+    """HTTPS соединение, обновляющее кэш TLS сессий после ответа сервера
+
+    В TLS 1.3 тикет приходит уже после handshake, поэтому сессию
+    сохраняем повторно, когда получен первый ответ.
+    """
+
+    def getresponse(self, *args, **kwargs):
+        # При Connection: close http.client обнуляет self.sock внутри getresponse
+        sock = self.sock
+        response = super().getresponse(*args, **kwargs)
+        cache = getattr(getattr(sock, 'context', None), 'session_cache', None)
+        if cache is not None:
+            cache.remember(_session_key(sock, self.server_hostname or self.host), sock)
+        return response
+
+
+class ResumingHTTPSConnectionPool(TracedHTTPSConnectionPool):
+    ConnectionCls = ResumingHTTPSConnection
+
+
+class TransportAdapter(TracingAdapter):
+    """HTTPAdapter с общим SSL контекстом, keep-alive и пулом под конкурентность
+
+    resilience - необязательный bmc_resilience.Resilience (повторы, circuit breaker,
+    адаптивные таймауты); Locust его не использует, чтобы не искажать нагрузку.
+    """
+
+    def __init__(self, pool_maxsize=POOL_MAXSIZE, verify=False, resilience=None, **kwargs):
+        self._ssl_context = shared_ssl_context(verify)
+        self.resilience = resilience
+        super().__init__(pool_connections=4, pool_maxsize=pool_maxsize, **kwargs)
+
+    def send(self, request, **kwargs):
+        if self.resilience is None:
+            return super().send(request, **kwargs)
+        return self.resilience.send(super().send, request, **kwargs)
+
+    def init_poolmanager(self, connections, maxsize, block=False, **pool_kwargs):
+        pool_kwargs.setdefault('ssl_context', self._ssl_context)
+        pool_kwargs.setdefault('socket_options', SOCKET_OPTIONS)
+        super().init_poolmanager(connections, maxsize, block=block, **pool_kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            'http': TracedHTTPConnectionPool,
+            'https': ResumingHTTPSConnectionPool,
+        }
+
+
+def new_session(verify=False, pool_maxsize=POOL_MAXSIZE, resilience=None):
+    """requests.Session поверх общего транспорта"""
+    session = requests.Session()
+    mount_transport(session, verify=verify, pool_maxsize=pool_maxsize, resilience=resilience)
+    session.verify = verify
+    session.headers.update({'Connection': 'keep-alive'})
+    return session
+
+
+def mount_transport(session, verify=False, pool_maxsize=POOL_MAXSIZE, resilience=None):
+    """Подключает общий транспорт к существующей сессии (например, HttpSession Locust)"""
+    adapter = TransportAdapter(pool_maxsize=pool_maxsize, verify=verify, resilience=resilience)
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    return session
+
+
+def probe_http2(host, port, timeout=5):
+    """Проверяет, предлагает ли сервер HTTP/2 через ALPN
+
+    requests/urllib3 работают только по HTTP/1.1, поэтому результат
+    попадает в отчет о транспорте: стоит ли переходить на HTTP/2 клиент.
+    """
+    context = ssl.SSLContext(ssl.PROTOCOL_TLS_CLIENT)
+    context.check_hostname = False
+    context.verify_mode = ssl.CERT_NONE
+    context.set_alpn_protocols(['h2', 'http/1.1'])
+    try:
+        with socket.create_connection((host, port), timeout=timeout) as sock:
+            with context.wrap_socket(sock, server_hostname=host) as ssl_sock:
+                offered = ssl_sock.selected_alpn_protocol() == 'h2'
+    except (OSError, ssl.SSLError) as e:
+        logger.warning("Не удалось проверить ALPN %s:%s: %s", host, port, e)
+        return None
+
+    handshake_stats.http2_offered = offered
+    return offered
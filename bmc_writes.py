@@ -0,0 +1,362 @@
+"""Нагрузочный тест записи Redfish: учетные записи AccountService и PATCH настроек.
+
+Для каждого уровня параллельности WRITE_CONCURRENCY выполняются две фазы по
+WRITE_OPERATIONS операций:
+
+* accounts - жизненный цикл учетной записи: POST в AccountService/Accounts,
+  PATCH RoleId с If-Match и DELETE. Записи у потоков разные, конфликтов быть
+  не должно;
+* settings - все потоки меняют одни и те же настройки (серверы NTP в
+  Managers/bmc/NetworkProtocol и HostName первого EthernetInterface): GET
+  дает ETag, PATCH идет с If-Match. Ответ 412 - запись опередил другой поток:
+  ресурс перечитывается, и PATCH повторяется до WRITE_MAX_RETRIES раз.
+
+По фазам считаются пропускная способность, перцентили задержки операций и доля
+конфликтов (412 от всех отправленных PATCH). Если BMC не отдает ETag, PATCH
+выполняется без If-Match (побеждает последний), это отмечается в отчете.
+
+Исходное состояние восстанавливается при любом завершении (в том числе по
+SIGTERM): удаляются созданные записи (по журналу и по новым записям коллекции
+с префиксом прогона), настройки NTP и HostName возвращаются к исходным и
+перечитываются для проверки. Код выхода 1, если что-то восстановить не удалось.
+
+    python bmc_writes.py
+    WRITE_CONCURRENCY=1,8 WRITE_OPERATIONS=40 python bmc_writes.py
+"""
+import json
+import logging
+import os
+import signal
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+import requests
+import urllib3
+
+from bmc_hdr import LatencyRecorder
+from bmc_log import setup_logging
+from bmc_transport import new_session
+from redfish_client import REDFISH_URL, make_redfish_request
+
+logger = logging.getLogger(__name__)
+
+urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
+
+# --- Конфигурация ---
+REPORTS_DIR = os.getenv('REPORTS_DIR', 'reports')
+USERNAME = "root"
+PASSWORD = "0penBmc"
+CONCURRENCY = [int(level) for level in os.getenv('WRITE_CONCURRENCY', '1,4,8').split(',')]
+OPERATIONS = int(os.getenv('WRITE_OPERATIONS', '20'))
+MAX_RETRIES = int(os.getenv('WRITE_MAX_RETRIES', '3'))
+# Имена учетных записей: <префикс><id прогона>_<n>; OpenBMC ограничивает имя 16 символами
+ACCOUNT_PREFIX = os.getenv('WRITE_ACCOUNT_PREFIX', 'wb')
+ACCOUNT_PASSWORD = os.getenv('WRITE_ACCOUNT_PASSWORD', 'Bench-Passw0rd')
+# Значения, которые по очереди записывают потоки фазы settings
+NTP_SERVERS = [servers.split(',') for servers in
+               os.getenv('WRITE_NTP_SERVERS', '10.0.0.1,10.0.0.2;10.0.0.3').split(';')]
+HOSTNAMES = os.getenv('WRITE_HOSTNAMES', 'bench-a,bench-b').split(',')
+NETWORK_PROTOCOL = "/Managers/bmc/NetworkProtocol"
+ACCOUNTS = "/AccountService/Accounts"
+PERCENTILES = (50, 95, 99)
+SUCCESS = (200, 201, 202, 204)
+
+
+def _ms(microseconds):
+    return round(microseconds / 1000, 2)
+
+
+class PhaseStats:
+    """Итоги одной фазы на одном уровне параллельности"""
+
+    def __init__(self, phase, concurrency):
+        self.phase = phase
+        self.concurrency = concurrency
+        self.latency = LatencyRecorder()
+        self._lock = threading.Lock()
+        self.operations = 0
+        self.completed = 0
+        self.patches = 0
+        self.conflicts = 0
+        self.errors = {}
+
+    def record(self, completed, error=None):
+        with self._lock:
+            self.operations += 1
+            if completed:
+                self.completed += 1
+            else:
+                self.errors[error] = self.errors.get(error, 0) + 1
+
+    def count_patch(self, conflict):
+        with self._lock:
+            self.patches += 1
+            self.conflicts += conflict
+
+    def summary(self, elapsed):
+        result = {
+            'phase': self.phase,
+            'concurrency': self.concurrency,
+            'operations': self.operations,
+            'completed': self.completed,
+            'throughput_ops': round(self.completed / elapsed, 2) if elapsed else None,
+            'patches': self.patches,
+            'conflicts': self.conflicts,
+            'conflict_rate': round(self.conflicts / self.patches, 4) if self.patches else 0.0,
+            'errors': self.errors,
+        }
+        for name, histogram in self.latency.histograms.items():
+            values = histogram.percentiles(PERCENTILES)
+            result[f"{name}_ms"] = {f"p{p}": _ms(values[p]) for p in PERCENTILES}
+        return result
+
+
+class WriteError(Exception):
+    """Операция записи не выполнена; текст - причина для отчета"""
+
+
+class WriteBenchmark:
+    """Фазы записи по уровням параллельности и гарантированное восстановление состояния"""
+
+    def __init__(self, base_url=REDFISH_URL):
+        self.base_url = base_url.rstrip('/')
+        self.api_path = urlsplit(self.base_url).path
+        self.session = new_session(verify=False, pool_maxsize=max(CONCURRENCY) + 2)
+        self.session.auth = (USERNAME, PASSWORD)
+        self.session.headers.update({'Content-Type': 'application/json', 'OData-Version': '4.0'})
+        self.run_id = f"{os.getpid() % 0x10000:04x}"
+        self._counter = 0
+        self._lock = threading.Lock()
+        self.created = set()
+        self.baseline_accounts = set()
+        self.original = {}
+        self.etag_supported = {}
+        self.hlog = LatencyRecorder()
+        self.report = {'concurrency': CONCURRENCY, 'operations': OPERATIONS, 'max_retries': MAX_RETRIES}
+
+    def request(self, method, endpoint, json_data=None, expected_status=SUCCESS, headers=None):
+        return make_redfish_request(
+            self.session, method, endpoint, json_data, expected_status, headers, base_url=self.base_url,
+        )
+
+    def endpoint(self, odata_id):
+        """@odata.id (/redfish/v1/...) -> путь относительно REDFISH_URL"""
+        return odata_id[len(self.api_path):] if odata_id.startswith(self.api_path) else odata_id
+
+    def read(self, endpoint):
+        """GET ресурса -> (JSON, ETag или None)"""
+        response = self.request('GET', endpoint, expected_status=200)
+        if response.status_code != 200:
+            raise WriteError(f"GET HTTP {response.status_code}")
+        return response.json(), response.headers.get('ETag')
+
+    def timed(self, stats, name, method, endpoint, json_data=None, headers=None, expected_status=SUCCESS):
+        started = time.perf_counter()
+        response = self.request(method, endpoint, json_data, expected_status, headers)
+        elapsed = time.perf_counter() - started
+        if response.status_code in SUCCESS:
+            stats.latency.record(name, elapsed)
+            self.hlog.record(f"{name} x{stats.concurrency}", elapsed)
+        return response
+
+    def conditional_patch(self, stats, name, endpoint, body):
+        """GET + PATCH с If-Match; при 412 перечитывает ресурс и повторяет"""
+        for attempt in range(MAX_RETRIES + 1):
+            _, etag = self.read(endpoint)
+            self.etag_supported.setdefault(name, etag is not None)
+            response = self.timed(stats, name, 'PATCH', endpoint, body, headers={'If-Match': etag} if etag else None,
+                                  expected_status=SUCCESS + (412,))
+            conflict = response.status_code == 412
+            stats.count_patch(conflict)
+            if not conflict:
+                if response.status_code not in SUCCESS:
+                    raise WriteError(f"PATCH HTTP {response.status_code}")
+                return attempt
+        raise WriteError('conflict retries exhausted')
+
+    # --- Исходное состояние ---
+    def list_accounts(self):
+        data, _ = self.read(ACCOUNTS)
+        return {member['@odata.id'] for member in data.get('Members', [])}
+
+    def ethernet_interface(self):
+        data, _ = self.read("/Managers/bmc/EthernetInterfaces")
+        members = data.get('Members', [])
+        return self.endpoint(members[0]['@odata.id']) if members else None
+
+    def snapshot(self):
+        self.baseline_accounts = self.list_accounts()
+        protocol, _ = self.read(NETWORK_PROTOCOL)
+        self.original['ntp_servers'] = protocol.get('NTP', {}).get('NTPServers', [])
+        interface = self.ethernet_interface()
+        if interface is not None:
+            self.original['interface'] = interface
+            self.original['hostname'] = self.read(interface)[0].get('HostName')
+        logger.info("Исходное состояние: %s учетных записей, %s", len(self.baseline_accounts), self.original)
+
+    # --- Фазы ---
+    def account_name(self):
+        with self._lock:
+            self._counter += 1
+            return f"{ACCOUNT_PREFIX}{self.run_id}_{self._counter}"
+
+    def account_cycle(self, stats):
+        name = self.account_name()
+        started = time.perf_counter()
+        try:
+            response = self.timed(stats, 'account_create', 'POST', ACCOUNTS, {
+                'UserName': name, 'Password': ACCOUNT_PASSWORD, 'RoleId': 'ReadOnly', 'Enabled': True,
+            })
+            if response.status_code not in SUCCESS:
+                raise WriteError(f"POST HTTP {response.status_code}")
+            uri = urlsplit(response.headers['Location']).path if 'Location' in response.headers \
+                else f"{self.api_path}{ACCOUNTS}/{name}"
+            with self._lock:
+                self.created.add(uri)
+            self.conditional_patch(stats, 'account_modify', self.endpoint(uri), {'RoleId': 'Operator'})
+            response = self.timed(stats, 'account_delete', 'DELETE', self.endpoint(uri))
+            if response.status_code not in SUCCESS:
+                raise WriteError(f"DELETE HTTP {response.status_code}")
+            with self._lock:
+                self.created.discard(uri)
+        except (WriteError, requests.exceptions.RequestException, ValueError) as e:
+            stats.record(False, str(e) if isinstance(e, WriteError) else type(e).__name__)
+            return
+        stats.latency.record('account_lifecycle', time.perf_counter() - started)
+        stats.record(True)
+
+    def settings_update(self, stats, n):
+        """Чередует PATCH серверов NTP и HostName; значения меняются, чтобы каждая запись была настоящей"""
+        started = time.perf_counter()
+        try:
+            if n % 2 == 0 or 'interface' not in self.original:
+                name, endpoint = 'ntp_patch', NETWORK_PROTOCOL
+                body = {'NTP': {'NTPServers': NTP_SERVERS[n // 2 % len(NTP_SERVERS)]}}
+            else:
+                name, endpoint = 'hostname_patch', self.original['interface']
+                body = {'HostName': HOSTNAMES[n // 2 % len(HOSTNAMES)]}
+            self.conditional_patch(stats, name, endpoint, body)
+        except (WriteError, requests.exceptions.RequestException, ValueError) as e:
+            stats.record(False, str(e) if isinstance(e, WriteError) else type(e).__name__)
+            return
+        stats.latency.record('settings_update', time.perf_counter() - started)
+        stats.record(True)
+
+    def run_phase(self, phase, concurrency):
+        stats = PhaseStats(phase, concurrency)
+        pool = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix=f"write-{phase}")
+        try:
+            origin = time.perf_counter()
+            if phase == 'accounts':
+                futures = [pool.submit(self.account_cycle, stats) for _ in range(OPERATIONS)]
+            else:
+                futures = [pool.submit(self.settings_update, stats, n) for n in range(OPERATIONS)]
+            for future in futures:
+                future.result()
+        finally:
+            # При SIGTERM дожидаемся только выполняющихся операций: очередь отменяется,
+            # чтобы restore() не ждал и не получал новых учетных записей и PATCH
+            pool.shutdown(cancel_futures=True)
+        summary = stats.summary(time.perf_counter() - origin)
+        logger.info(
+            "%s x%s: %s из %s операций, %s оп/с, конфликтов %.1f%%",
+            phase, concurrency, stats.completed, stats.operations,
+            summary['throughput_ops'], summary['conflict_rate'] * 100,
+        )
+        return summary
+
+    def stale_etag_probe(self):
+        """PATCH текущего значения с заведомо устаревшим ETag: проверяет, соблюдает ли BMC If-Match"""
+        protocol, _ = self.read(NETWORK_PROTOCOL)
+        body = {'NTP': {'NTPServers': protocol.get('NTP', {}).get('NTPServers', [])}}
+        response = self.request('PATCH', NETWORK_PROTOCOL, body, expected_status=412,
+                                headers={'If-Match': '"stale-etag"'})
+        return response.status_code == 412
+
+    # --- Восстановление ---
+    def delete_account(self, uri):
+        try:
+            response = self.request('DELETE', self.endpoint(uri), expected_status=SUCCESS + (404,))
+        except requests.exceptions.RequestException as e:
+            logger.warning("Не удалось удалить учетную запись %s: %s", uri, e)
+            return False
+        return response.status_code in SUCCESS + (404,)
+
+    def restore(self):
+        """Удаляет учетные записи прогона и возвращает настройки; возвращает число расхождений"""
+        with self._lock:
+            pending = set(self.created)
+        deleted = sum(self.delete_account(uri) for uri in pending)
+        problems = []
+        try:
+            prefix = f"{ACCOUNT_PREFIX}{self.run_id}_"
+            for uri in self.list_accounts() - self.baseline_accounts:
+                # Удаляются только записи этого прогона, даже если ответ на POST не дошел
+                if uri.rsplit('/', 1)[-1].startswith(prefix) and uri not in pending:
+                    deleted += self.delete_account(uri)
+            leaked = sorted(self.list_accounts() - self.baseline_accounts)
+            if leaked:
+                problems.append(f"accounts: {leaked}")
+
+            if 'ntp_servers' in self.original:
+                self.request('PATCH', NETWORK_PROTOCOL, {'NTP': {'NTPServers': self.original['ntp_servers']}})
+                current = self.read(NETWORK_PROTOCOL)[0].get('NTP', {}).get('NTPServers', [])
+                if current != self.original['ntp_servers']:
+                    problems.append(f"NTPServers: {current} != {self.original['ntp_servers']}")
+            if self.original.get('hostname'):
+                interface = self.original['interface']
+                self.request('PATCH', interface, {'HostName': self.original['hostname']})
+                current = self.read(interface)[0].get('HostName')
+                if current != self.original['hostname']:
+                    problems.append(f"HostName: {current} != {self.original['hostname']}")
+        except (WriteError, requests.exceptions.RequestException) as e:
+            problems.append(f"{type(e).__name__}: {e}")
+        self.report['restore'] = {'accounts_deleted': deleted, 'problems': problems}
+        for problem in problems:
+            logger.error("Состояние BMC не восстановлено: %s", problem)
+        return len(problems)
+
+    def run(self):
+        self.snapshot()
+        try:
+            self.report['if_match_enforced'] = self.stale_etag_probe()
+            self.report['etag_supported'] = self.etag_supported
+            results = self.report['phases'] = []
+            for concurrency in CONCURRENCY:
+                for phase in ('accounts', 'settings'):
+                    results.append(self.run_phase(phase, concurrency))
+        finally:
+            problems = self.restore()
+            self.save()
+        return problems
+
+    def save(self):
+        os.makedirs(REPORTS_DIR, exist_ok=True)
+        with open(os.path.join(REPORTS_DIR, 'write_bench.json'), 'w', encoding='utf-8') as f:
+            json.dump(self.report, f, indent=2, ensure_ascii=False)
+        self.hlog.export(os.path.join(REPORTS_DIR, 'latency_write_bench.hlog'))
+
+
+def _terminate(signum, frame):
+    # SIGTERM (остановка сборки Jenkins) превращается в исключение, чтобы выполнилось восстановление
+    raise SystemExit(128 + signum)
+
+
+if __name__ == "__main__":
+    setup_logging('write_bench')
+    signal.signal(signal.SIGTERM, _terminate)
+    benchmark = WriteBenchmark()
+    try:
+        problems = benchmark.run()
+    except (WriteError, requests.exceptions.RequestException) as e:
+        logger.error("AccountService или NetworkProtocol недоступны: %s", e)
+        sys.exit(1)
+    for phase in benchmark.report.get('phases', []):
+        print(
+            f"{phase['phase']} x{phase['concurrency']}: {phase['throughput_ops']} ops/s, "
+            f"conflicts {phase['conflict_rate']:.1%}, errors {sum(phase['errors'].values())}"
+        )
+    sys.exit(1 if problems else 0)
@@ -0,0 +1,132 @@
+"""Общие хуки PyTest для Redfish и WebUI тестов"""
+import os
+
+import pytest
+
+from bmc_hdr import REPORTS_DIR, latency
+from bmc_log import setup_logging, shutdown_logging
+from bmc_qemu import ENABLED as QEMU_PROFILE, qemu_profiler
+from bmc_resilience import resilience
+from bmc_shared import DurationHistory, xdist_worker
+from bmc_ssh import ENABLED as SSH_DIAG, SLOW_TEST_SECONDS, diagnostics
+from bmc_trace import tracer, trace_path
+from bmc_transport import handshake_stats
+from impact_cache import ENABLED as IMPACT_SELECT, ImpactSelection
+from webui_artifacts import artifacts
+from webui_perf import perf_report
+
+impact = ImpactSelection() if IMPACT_SELECT else None
+durations = DurationHistory()
+
+
+def pytest_configure(config):
+    """Регистрирует маркеры и включает фоновую запись логов в reports/log_<набор>.jsonl"""
+    config.addinivalue_line(
+        "markers", "mutates_bmc: тест меняет состояние BMC и выполняется монопольно (bmc_shared.BMCStateLock)"
+    )
+    config.addinivalue_line("markers", "impact_cached: тест пропущен по кэшу результатов (impact_cache.py)")
+    target = config.args[0].split('::')[0] if config.args else 'session'
+    name = os.path.splitext(os.path.basename(os.path.abspath(target)))[0]
+    if xdist_worker() is not None:
+        name = f"{name}_{xdist_worker()}"
+    # В stderr не пишем: логи тестов собирает PyTest и показывает для упавших тестов
+    setup_logging(name, console=False, fields={'test': lambda: tracer.current_test})
+
+
+def pytest_unconfigure(config):
+    shutdown_logging()
+
+
+# --- Диагностика BMC по SSH и профиль QEMU ---
+def _samples_bmc(config):
+    """Выборки снимает один процесс с тестами: gw0 при xdist, иначе сам pytest"""
+    worker = xdist_worker()
+    if worker is None:
+        return not getattr(config.option, 'numprocesses', None)
+    return worker == 'gw0'
+
+
+def pytest_sessionstart(session):
+    if not _samples_bmc(session.config):
+        return
+    if SSH_DIAG:
+        diagnostics.start()
+    if QEMU_PROFILE:
+        qemu_profiler.start()
+
+
+@pytest.hookimpl(hookwrapper=True)
+def pytest_runtest_makereport(item, call):
+    """Сохраняет отчет фазы в item.rep_<фаза>; к отчету долгого теста прикладывает нагрузку BMC"""
+    outcome = yield
+    report = outcome.get_result()
+    # Фикстуры читают исход теста при завершении (артефакты упавших WebUI тестов)
+    setattr(item, f"rep_{report.when}", report)
+    if SSH_DIAG and report.when == 'call' and report.duration >= SLOW_TEST_SECONDS:
+        report.sections.append(("BMC diagnostics (ssh)", diagnostics.snapshot()))
+
+
+# --- Трассировка ---
+@pytest.hookimpl(hookwrapper=True)
+def pytest_runtest_protocol(item, nextitem):
+    """Помечает спаны node ID текущего теста"""
+    with tracer.test_scope(item.nodeid):
+        yield
+
+
+def pytest_runtest_setup(item):
+    """Пока circuit breaker разомкнут, оставшиеся тесты не ждут таймаутов BMC
+
+    Тест завершается ошибкой, а не пропуском: недоступный BMC не должен
+    выглядеть в отчете как зеленый прогон.
+    """
+    if resilience.breaker.is_open():
+        resilience.count('tests_fast_failed')
+        item.keywords['breaker_open'] = True
+        pytest.fail("BMC не отвечает: circuit breaker разомкнут", pytrace=False)
+
+
+def pytest_collection_modifyitems(config, items):
+    """Порядок от долгих тестов к коротким (баланс воркеров xdist) и пропуск по кэшу результатов"""
+    durations.order(items)
+    if impact is not None:
+        impact.select(items, lambda key: [
+            pytest.mark.impact_cached,
+            pytest.mark.skip(reason=f"impact cache: passed with identical inputs ({key[:12]})"),
+        ])
+
+
+def pytest_runtest_logreport(report):
+    # С xdist отчеты воркеров приходят в основной процесс; записываем только там
+    if xdist_worker() is not None:
+        return
+    durations.record(report)
+    if impact is not None:
+        impact.record(report, cached='impact_cached' in report.keywords)
+
+
+def pytest_sessionfinish(session, exitstatus):
+    """Экспортирует трассу, диагностику BMC, профиль QEMU, задержки, счетчики TLS handshake и повторов, метрики страниц и артефакты падений в reports/"""
+    items = getattr(session, 'items', None) or []
+    name = items[0].path.stem if items else 'session'
+    worker = xdist_worker()
+    if worker is not None:
+        # У каждого воркера свои файлы; hlog объединяются через bmc_hdr.py merge
+        name = f"{name}_{worker}"
+    # До экспорта трассы, чтобы последние выборки попали в нее
+    if SSH_DIAG and _samples_bmc(session.config):
+        diagnostics.stop()
+        diagnostics.report(name)
+    if QEMU_PROFILE and _samples_bmc(session.config):
+        qemu_profiler.stop()
+        qemu_profiler.report(name)
+    tracer.export(trace_path(name))
+    handshake_stats.report(name)
+    resilience.report(name)
+    latency.export(os.path.join(REPORTS_DIR, f"latency_{name}.hlog"))
+    perf_report.export(os.path.join(REPORTS_DIR, f"webui_perf_{name}.json"))
+    artifacts.close(name)
+    if worker is None:
+        durations.save()
+        if impact is not None:
+            impact.finish(exitstatus)
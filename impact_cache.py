@@ -0,0 +1,307 @@
+"""Выборочный запуск тестов по хэшу входных данных и кэш результатов.
+
+Каждый набор тестов (tests_*.py) зависит от своего файла, локальных модулей,
+которые он импортирует (транзитивно), conftest.py, файлов данных, образа BMC и
+версий ключевых пакетов. Ключ набора - SHA-256 от всего этого. Если ключ не
+изменился и прошлый прогон прошел, набор (или отдельный тест) не запускается
+повторно. Раз в IMPACT_MAX_AGE_HOURS часов или при IMPACT_FULL_RUN=1 выполняется
+полный прогон без кэша.
+
+    python impact_cache.py plan tests_Redfish.py tests_WebUI.py tests_Locust.py
+    IMPACT_SELECT=1 python -m pytest tests_Redfish.py
+    python impact_cache.py record tests_Locust.py passed
+"""
+import ast
+import hashlib
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from importlib import metadata
+
+logger = logging.getLogger(__name__)
+
+# --- Конфигурация ---
+ROOT = os.path.dirname(os.path.abspath(__file__))
+REPORTS_DIR = os.getenv('REPORTS_DIR', 'reports')
+CACHE_PATH = os.getenv('IMPACT_CACHE', os.path.join(ROOT, '.impact_cache', 'results.json'))
+BMC_IMAGE = os.getenv('BMC_IMAGE', os.path.join(ROOT, 'OBMC-Romulus-image.mtd'))
+# IMPACT_SELECT=1 - пропускать в PyTest тесты, прошедшие с теми же входными данными
+ENABLED = os.getenv('IMPACT_SELECT', '0') == '1'
+FULL_RUN = os.getenv('IMPACT_FULL_RUN', '0') == '1'
+MAX_AGE_HOURS = float(os.getenv('IMPACT_MAX_AGE_HOURS', '24'))
+PACKAGES = ('requests', 'urllib3', 'selenium', 'locust', 'pytest', 'websockets')
+# Файлы, которые модуль читает во время работы (не видны по import)
+DATA_FILES = {
+    'webui_perf.py': ('webui_budgets.json',),
+}
+
+
+_hash_cache = {}
+
+
+def file_hash(path):
+    """SHA-256 файла; образ BMC большой, поэтому хэш кэшируется по (размер, mtime)"""
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return 'missing'
+    marker = (path, stat.st_size, stat.st_mtime_ns)
+    if marker not in _hash_cache:
+        digest = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for block in iter(lambda: f.read(1 << 20), b''):
+                digest.update(block)
+        _hash_cache[marker] = digest.hexdigest()
+    return _hash_cache[marker]
+
+
+def imported_modules(path):
+    """Имена модулей верхнего уровня, импортируемых файлом"""
+    with open(path, encoding='utf-8') as f:
+        tree = ast.parse(f.read(), filename=path)
+    names = set()
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            names.update(alias.name.split('.')[0] for alias in node.names)
+        elif isinstance(node, ast.ImportFrom) and node.module and not node.level:
+            names.add(node.module.split('.')[0])
+    return names
+
+
+def local_imports(path):
+    """Модули репозитория, импортируемые файлом напрямую"""
+    return {
+        f"{name}.py" for name in imported_modules(path)
+        if os.path.exists(os.path.join(ROOT, f"{name}.py"))
+    }
+
+
+def dependencies(suite):
+    """Транзитивное замыкание локальных импортов набора, conftest.py и файлов данных"""
+    pending = [os.path.basename(suite)]
+    # conftest.py влияет только на наборы PyTest (tests_Locust.py запускается через locust)
+    if 'pytest' in imported_modules(os.path.join(ROOT, pending[0])):
+        pending.append('conftest.py')
+    seen = set()
+    while pending:
+        name = pending.pop()
+        if name in seen:
+            continue
+        seen.add(name)
+        pending.extend(local_imports(os.path.join(ROOT, name)) - seen)
+        seen.update(DATA_FILES.get(name, ()))
+    return sorted(seen)
+
+
+def package_versions():
+    versions = {}
+    for package in PACKAGES:
+        try:
+            versions[package] = metadata.version(package)
+        except metadata.PackageNotFoundError:
+            versions[package] = None
+    return versions
+
+
+def suite_inputs(suite):
+    """Входные данные набора: {файл: хэш}, образ BMC и версии пакетов"""
+    return {
+        'files': {name: file_hash(os.path.join(ROOT, name)) for name in dependencies(suite)},
+        'bmc_image': file_hash(BMC_IMAGE),
+        'packages': package_versions(),
+    }
+
+
+def suite_key(suite):
+    inputs = suite_inputs(suite)
+    encoded = json.dumps(inputs, sort_keys=True).encode('utf-8')
+    return hashlib.sha256(encoded).hexdigest(), inputs
+
+
+class ResultCache:
+    """Результаты тестов и наборов по ключу входных данных (JSON в .impact_cache/)"""
+
+    def __init__(self, path=CACHE_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        try:
+            with open(path, encoding='utf-8') as f:
+                self.data = json.load(f)
+        except (FileNotFoundError, ValueError):
+            self.data = {}
+        self.data.setdefault('last_full_run', 0)
+        self.data.setdefault('suites', {})
+        self.data.setdefault('tests', {})
+
+    def full_run_due(self, now=None):
+        if FULL_RUN:
+            return True
+        age_hours = ((now or time.time()) - self.data['last_full_run']) / 3600
+        return age_hours >= MAX_AGE_HOURS
+
+    def mark_full_run(self):
+        self.data['last_full_run'] = time.time()
+
+    def suite_fresh(self, suite, key):
+        record = self.data['suites'].get(os.path.basename(suite))
+        return bool(record) and record['key'] == key and record['outcome'] == 'passed'
+
+    def test_fresh(self, nodeid, key):
+        record = self.data['tests'].get(nodeid)
+        return bool(record) and record['key'] == key and record['outcome'] == 'passed'
+
+    def record_suite(self, suite, key, outcome, inputs=None):
+        with self._lock:
+            self.data['suites'][os.path.basename(suite)] = {
+                'key': key,
+                'outcome': outcome,
+                'time': time.time(),
+                'inputs': inputs,
+            }
+
+    def record_test(self, nodeid, key, outcome, duration):
+        with self._lock:
+            self.data['tests'][nodeid] = {
+                'key': key,
+                'outcome': outcome,
+                'duration': round(duration, 3),
+                'time': time.time(),
+            }
+
+    def save(self):
+        with self._lock:
+            os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(self.data, f, indent=2, ensure_ascii=False)
+            os.replace(tmp_path, self.path)
+
+
+def changed_inputs(old, new):
+    """Какие входные данные отличаются от прошлого прогона - для отчета"""
+    if not old:
+        return ['no previous run']
+    changed = [
+        name for name in sorted(set(old['files']) | set(new['files']))
+        if old['files'].get(name) != new['files'].get(name)
+    ]
+    if old['bmc_image'] != new['bmc_image']:
+        changed.append('bmc_image')
+    changed += [
+        f"package:{name}" for name in sorted(new['packages'])
+        if old['packages'].get(name) != new['packages'][name]
+    ]
+    return changed
+
+
+def plan(suites, cache=None):
+    """Возвращает наборы, которые нужно запустить, и пишет reports/impact_plan.json"""
+    cache = cache or ResultCache()
+    full_run = cache.full_run_due()
+    report = {'full_run': full_run, 'suites': {}}
+    stale = []
+    for suite in suites:
+        key, inputs = suite_key(suite)
+        fresh = not full_run and cache.suite_fresh(suite, key)
+        previous = cache.data['suites'].get(os.path.basename(suite))
+        report['suites'][suite] = {
+            'key': key,
+            'run': not fresh,
+            'changed': changed_inputs(previous and previous.get('inputs'), inputs),
+            'previous_outcome': previous and previous['outcome'],
+        }
+        if not fresh:
+            stale.append(suite)
+
+    os.makedirs(REPORTS_DIR, exist_ok=True)
+    with open(os.path.join(REPORTS_DIR, 'impact_plan.json'), 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+    return stale
+
+
+class ImpactSelection:
+    """Подключается из conftest.py: пропускает тесты с неизменными входными данными
+
+    Итоги записываются по отчетам тестов (node ID), поэтому с pytest-xdist это
+    делает только основной процесс, получающий отчеты всех воркеров.
+    """
+
+    def __init__(self, cache=None):
+        self.cache = cache or ResultCache()
+        self.full_run = self.cache.full_run_due()
+        self.keys = {}
+        self.outcomes = {}
+        self.seen = set()
+        self.cached = set()
+
+    def suite_of(self, nodeid):
+        suite = nodeid.split('::')[0]
+        if suite not in self.keys:
+            self.keys[suite] = suite_key(suite)
+        return suite
+
+    def key_for(self, nodeid):
+        return self.keys[self.suite_of(nodeid)][0]
+
+    def select(self, items, markers):
+        """Добавляет тестам, прошедшим с тем же ключом, маркеры markers(key)"""
+        if self.full_run:
+            return
+        for item in items:
+            key = self.key_for(item.nodeid)
+            if self.cache.test_fresh(item.nodeid, key):
+                for marker in markers(key):
+                    item.add_marker(marker)
+
+    def record(self, report, cached=False):
+        """Итог теста по фазам setup/call/teardown; пропущенные по кэшу не перезаписываются"""
+        nodeid = report.nodeid
+        self.seen.add(nodeid)
+        if cached or nodeid in self.cached:
+            self.cached.add(nodeid)
+            return
+        status, duration = self.outcomes.get(nodeid, ('passed', 0.0))
+        if status == 'passed':
+            status = report.outcome
+        self.outcomes[nodeid] = (status, duration + report.duration)
+        # teardown выполняется всегда, даже после проваленного или пропущенного setup
+        if report.when == 'teardown':
+            status, duration = self.outcomes.pop(nodeid)
+            self.cache.record_test(nodeid, self.key_for(nodeid), status, duration)
+
+    def finish(self, exitstatus):
+        suites = {self.suite_of(nodeid) for nodeid in self.seen}
+        for suite in suites:
+            key, inputs = self.keys[suite]
+            passed = all(
+                self.cache.test_fresh(nodeid, key)
+                for nodeid in self.seen if self.suite_of(nodeid) == suite
+            )
+            self.cache.record_suite(suite, key, 'passed' if passed and exitstatus == 0 else 'failed', inputs)
+        if self.full_run:
+            self.cache.mark_full_run()
+        self.cache.save()
+        if self.cached:
+            logger.info("Impact cache: %d tests reused from previous runs with identical inputs", len(self.cached))
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 3 or sys.argv[1] not in ('plan', 'record'):
+        print(__doc__)
+        sys.exit(2)
+
+    if sys.argv[1] == 'plan':
+        # stdout читается Jenkinsfile: "full|partial: <наборы для запуска через пробел>"
+        full_run = ResultCache().full_run_due()
+        print(f"{'full' if full_run else 'partial'}: {' '.join(plan(sys.argv[2:]))}")
+    else:
+        suite, outcome = sys.argv[2], sys.argv[3]
+        cache = ResultCache()
+        key, inputs = suite_key(suite)
+        cache.record_suite(suite, key, outcome, inputs)
+        if FULL_RUN:
+            cache.mark_full_run()
+        cache.save()
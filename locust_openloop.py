@@ -0,0 +1,161 @@
+"""Open-loop генерация нагрузки Locust с постоянной частотой запросов.
+
+Обычные пользователи Locust работают по замкнутой схеме (wait_time): когда BMC
+замедляется, падает и подаваемая нагрузка, а задержка выглядит лучше реальной
+(coordinated omission). Здесь запросы планируются по расписанию с фиксированной
+частотой, а задержка считается от запланированного момента старта. В статистику
+Locust попадают только сами запросы клиента; исправленная задержка собирается в
+HDR гистограммы (bmc_hdr) и пишется в reports/locust_openloop.json.
+"""
+import abc
+import json
+import logging
+import os
+import time
+
+import gevent
+from gevent.pool import Pool
+from locust import HttpUser, constant, task
+
+from bmc_hdr import LatencyRecorder
+
+logger = logging.getLogger(__name__)
+
+# --- Конфигурация ---
+REPORTS_DIR = os.getenv('REPORTS_DIR', 'reports')
+# Максимум одновременно выполняющихся запросов одного пользователя; при переполнении
+# запросы стартуют позже расписания, и это видно в исправленной задержке
+OPEN_LOOP_MAX_INFLIGHT = int(os.getenv('OPEN_LOOP_MAX_INFLIGHT', '100'))
+PERCENTILES = (50, 95, 99)
+
+
+def _percentiles_ms(histogram):
+    return {f"p{p}": round(value / 1000, 2) for p, value in histogram.percentiles(PERCENTILES).items()}
+
+
+class OpenLoopStats:
+    """Задержки open-loop запросов: от фактического и от запланированного старта
+
+    Память фиксирована: значения копятся в HDR гистограммах, а не в списках.
+    """
+
+    def __init__(self):
+        self.service = LatencyRecorder()
+        self.corrected = LatencyRecorder()
+        self.start_lag = LatencyRecorder()
+        # Текущая суммарная частота по всем пользователям и ее максимум за прогон:
+        # к test_stop пользователи уже остановлены, и в отчет идет максимум
+        self.target_rate = {}
+        self.peak_rate = {}
+
+    def add_rate(self, name, rate):
+        """Учитывает запуск (rate > 0) или остановку (rate < 0) расписания"""
+        current = self.target_rate.get(name, 0) + rate
+        self.target_rate[name] = current
+        self.peak_rate[name] = max(self.peak_rate.get(name, 0), current)
+
+    def record(self, name, intended, started, done):
+        self.service.record(name, done - started)
+        self.corrected.record(name, done - intended)
+        self.start_lag.record(name, started - intended)
+
+    def summary(self):
+        result = {}
+        for name, corrected in sorted(self.corrected.histograms.items()):
+            result[name] = {
+                'target_rate': self.peak_rate.get(name),
+                'requests': corrected.total_count,
+                'max_start_lag_ms': round(self.start_lag.histograms[name].max_value / 1000, 2),
+                'service_ms': _percentiles_ms(self.service.histograms[name]),
+                'corrected_ms': _percentiles_ms(corrected),
+            }
+        return result
+
+    def report(self):
+        """Логирует сравнение перцентилей и сохраняет reports/locust_openloop.json"""
+        summary = self.summary()
+        if not summary:
+            return summary
+        for name, data in summary.items():
+            logger.info(
+                "Open-loop %s: p99 service %s ms, p99 corrected %s ms",
+                name, data['service_ms']['p99'], data['corrected_ms']['p99'],
+            )
+        os.makedirs(REPORTS_DIR, exist_ok=True)
+        with open(os.path.join(REPORTS_DIR, 'locust_openloop.json'), 'w', encoding='utf-8') as f:
+            json.dump(summary, f, indent=2, ensure_ascii=False)
+        return summary
+
+
+open_loop_stats = OpenLoopStats()
+
+
+class OpenLoopUser(HttpUser):
+    """Пользователь, отправляющий запросы по расписанию, а не после ответа
+
+    Подкласс реализует arrivals() -> [(имя, запросов в секунду, функция запроса)].
+    Частота указывается на одного пользователя.
+    """
+
+    abstract = True
+    wait_time = constant(0)
+    max_inflight = OPEN_LOOP_MAX_INFLIGHT
+
+    def __init__(self, *args, **kwargs):
+        # Метакласс User в Locust не ABCMeta, поэтому abstractmethod проверяется здесь
+        if getattr(self.arrivals, '__isabstractmethod__', False):
+            raise TypeError(f"{type(self).__name__} не реализует arrivals()")
+        super().__init__(*args, **kwargs)
+        self._rates = {}
+
+    def on_stop(self):
+        # Форма нагрузки останавливает часть пользователей - их частота уходит из суммы
+        for name, rate in self._rates.items():
+            open_loop_stats.add_rate(name, -rate)
+        self._rates = {}
+
+    @abc.abstractmethod
+    def arrivals(self):
+        """[(имя, запросов в секунду, функция запроса)]"""
+
+    @task
+    def run_open_loop(self):
+        pool = Pool(self.max_inflight)
+        schedulers = [
+            gevent.spawn(self._schedule, pool, name, rate, request)
+            for name, rate, request in self.arrivals()
+            if rate > 0
+        ]
+        try:
+            gevent.joinall(schedulers)
+        finally:
+            gevent.killall(schedulers)
+            pool.kill()
+
+    def _schedule(self, pool, name, rate, request):
+        self._rates[name] = self._rates.get(name, 0) + rate
+        open_loop_stats.add_rate(name, rate)
+        interval = 1.0 / rate
+        start = time.perf_counter()
+        sequence = 0
+        while True:
+            intended = start + sequence * interval
+            sequence += 1
+            delay = intended - time.perf_counter()
+            if delay > 0:
+                gevent.sleep(delay)
+            # Блокируется, если все слоты заняты - опоздание учтется от intended
+            pool.spawn(self._fire, name, intended, request)
+
+    def _fire(self, name, intended, request):
+        # Сам запрос учитывается в статистике Locust клиентом (своя строка, свои
+        # ошибки); здесь только задержка от расписания, без второй строки и RPS
+        started = time.perf_counter()
+        try:
+            request()
+        except Exception:
+            # Ошибки ответа клиент уже отметил в статистике Locust; сюда доходят
+            # только исключения самой функции запроса
+            logger.exception("Open-loop %s: ошибка запроса", name)
+        finally:
+            open_loop_stats.record(name, intended, started, time.perf_counter())
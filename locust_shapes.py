@@ -0,0 +1,255 @@
+"""Профили нагрузки Locust: ступенчатый, пиковый и длительный (soak).
+
+Профиль выбирается переменной LOCUST_SHAPE=step|spike|soak и настраивается
+переменными окружения (см. каждый класс). По ступеням считаются перцентили
+задержки и определяется точка перегиба (knee), после которой задержка растет
+быстрее числа пользователей. Soak профиль дополнительно снимает память и CPU BMC
+через Redfish Manager. Итог пишется в reports/locust_shape.json.
+"""
+import abc
+import json
+import logging
+import os
+
+# locust должен импортироваться до requests (bmc_resources): он выполняет monkey-patch gevent
+from locust import LoadTestShape
+
+from bmc_resources import BMCResourceSampler
+
+logger = logging.getLogger(__name__)
+
+# --- Конфигурация ---
+REPORTS_DIR = os.getenv('REPORTS_DIR', 'reports')
+# Ступень считается перегибом, если ее p95 выше минимального p95 предыдущих ступеней в KNEE_FACTOR раз
+KNEE_FACTOR = float(os.getenv('LOCUST_KNEE_FACTOR', '1.5'))
+
+
+def _env_int(name, default):
+    return int(os.getenv(name, str(default)))
+
+
+def _env_float(name, default):
+    return float(os.getenv(name, str(default)))
+
+
+def _percentile(histogram, fraction):
+    """Перцентиль по гистограмме Locust {округленное время мс: количество}"""
+    total = sum(histogram.values())
+    if not total:
+        return None
+    threshold = total * fraction
+    seen = 0
+    for response_time in sorted(histogram):
+        seen += histogram[response_time]
+        if seen >= threshold:
+            return response_time
+    return max(histogram)
+
+
+class StageRecorder:
+    """Статистика Locust по отрезкам с постоянным числом пользователей"""
+
+    def __init__(self):
+        self.stages = []
+        self._users = None
+        self._started = None
+        self._requests = 0
+        self._failures = 0
+        self._histogram = {}
+
+    def _snapshot(self, stats):
+        total = stats.total
+        return total.num_requests, total.num_failures, dict(total.response_times)
+
+    def update(self, runner, users, now):
+        """Вызывается из tick(): закрывает отрезок, если целевое число пользователей изменилось"""
+        if users == self._users:
+            return
+        requests_count, failures, histogram = self._snapshot(runner.stats)
+        if self._users is not None:
+            self._close(requests_count, failures, histogram, now)
+        self._users = users
+        self._started = now
+        self._requests, self._failures, self._histogram = requests_count, failures, histogram
+
+    def finish(self, runner, now):
+        if self._users is not None:
+            self._close(*self._snapshot(runner.stats), now)
+            self._users = None
+
+    def _close(self, requests_count, failures, histogram, now):
+        duration = now - self._started
+        delta = {
+            response_time: count - self._histogram.get(response_time, 0)
+            for response_time, count in histogram.items()
+            if count - self._histogram.get(response_time, 0) > 0
+        }
+        num_requests = requests_count - self._requests
+        self.stages.append({
+            'users': self._users,
+            'started': round(self._started, 1),
+            'duration_s': round(duration, 1),
+            'requests': num_requests,
+            'failures': failures - self._failures,
+            'rps': round(num_requests / duration, 2) if duration > 0 else 0.0,
+            'p50_ms': _percentile(delta, 0.50),
+            'p95_ms': _percentile(delta, 0.95),
+            'p99_ms': _percentile(delta, 0.99),
+        })
+
+    def knee_point(self, factor=KNEE_FACTOR):
+        """Первая ступень, где p95 вырос в factor раз относительно лучшей предыдущей"""
+        best_p95 = None
+        for stage in self.stages:
+            p95 = stage['p95_ms']
+            if p95 is None or stage['requests'] == 0:
+                continue
+            # Нулевой p95 (ответы быстрее 1 мс) не должен давать ложный перегиб
+            if best_p95 is not None and p95 > max(best_p95, 1) * factor:
+                return stage
+            best_p95 = p95 if best_p95 is None else min(best_p95, p95)
+        return None
+
+
+class RecordingShape(LoadTestShape):
+    """Базовый профиль: stages() -> [(длительность, пользователи, spawn rate)]"""
+
+    abstract = True
+
+    def __init__(self):
+        super().__init__()
+        self.recorder = StageRecorder()
+        self._finished = False
+
+    @abc.abstractmethod
+    def stages(self):
+        """[(длительность, пользователи, spawn rate)]"""
+
+    def tick(self):
+        run_time = self.get_run_time()
+        elapsed = 0
+        for duration, users, spawn_rate in self.stages():
+            elapsed += duration
+            if run_time < elapsed:
+                self.recorder.update(self.runner, users, run_time)
+                return users, spawn_rate
+
+        if not self._finished:
+            self._finished = True
+            self.recorder.finish(self.runner, run_time)
+        return None
+
+    def summary(self):
+        knee = self.recorder.knee_point()
+        return {
+            'shape': type(self).__name__,
+            'knee_factor': KNEE_FACTOR,
+            'knee_point': knee,
+            'stages': self.recorder.stages,
+        }
+
+    def report(self):
+        """Сохраняет отрезки и точку перегиба в reports/locust_shape.json"""
+        if not self._finished and self.runner is not None:
+            self._finished = True
+            self.recorder.finish(self.runner, self.get_run_time())
+
+        summary = self.summary()
+        knee = summary['knee_point']
+        if knee:
+            logger.info("Knee point: %s users (p95 %s ms, %s rps)", knee['users'], knee['p95_ms'], knee['rps'])
+        else:
+            logger.info("Knee point not reached")
+
+        os.makedirs(REPORTS_DIR, exist_ok=True)
+        with open(os.path.join(REPORTS_DIR, 'locust_shape.json'), 'w', encoding='utf-8') as f:
+            json.dump(summary, f, indent=2, ensure_ascii=False)
+        return summary
+
+
+class StepLoadShape(RecordingShape):
+    """Ступенчатый рост: STEP_USERS пользователей каждые STEP_DURATION секунд, STEP_COUNT ступеней"""
+
+    def __init__(self):
+        super().__init__()
+        self.step_users = _env_int('STEP_USERS', 5)
+        self.step_duration = _env_int('STEP_DURATION', 60)
+        self.step_count = _env_int('STEP_COUNT', 10)
+        self.spawn_rate = _env_float('STEP_SPAWN_RATE', self.step_users)
+
+    def stages(self):
+        return [
+            (self.step_duration, self.step_users * (step + 1), self.spawn_rate)
+            for step in range(self.step_count)
+        ]
+
+
+class SpikeLoadShape(RecordingShape):
+    """Пик: SPIKE_BASE_USERS -> SPIKE_USERS на SPIKE_DURATION секунд -> возврат к базе"""
+
+    def __init__(self):
+        super().__init__()
+        self.base_users = _env_int('SPIKE_BASE_USERS', 5)
+        self.spike_users = _env_int('SPIKE_USERS', 50)
+        self.warmup = _env_int('SPIKE_WARMUP', 60)
+        self.spike_duration = _env_int('SPIKE_DURATION', 30)
+        self.recovery = _env_int('SPIKE_RECOVERY', 120)
+        self.spawn_rate = _env_float('SPIKE_SPAWN_RATE', self.spike_users)
+
+    def stages(self):
+        return [
+            (self.warmup, self.base_users, self.spawn_rate),
+            (self.spike_duration, self.spike_users, self.spawn_rate),
+            (self.recovery, self.base_users, self.spawn_rate),
+        ]
+
+
+class SoakLoadShape(RecordingShape):
+    """Длительная нагрузка SOAK_USERS пользователей в течение SOAK_DURATION секунд
+
+    Каждые SOAK_SAMPLE_INTERVAL секунд снимаются память и CPU BMC, чтобы
+    увидеть утечки памяти bmcweb под постоянной нагрузкой.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.users = _env_int('SOAK_USERS', 10)
+        self.ramp = _env_int('SOAK_RAMP', 60)
+        self.duration = _env_int('SOAK_DURATION', 4 * 3600)
+        self.spawn_rate = _env_float('SOAK_SPAWN_RATE', 1)
+        self.sampler = BMCResourceSampler(_env_int('SOAK_SAMPLE_INTERVAL', 60))
+
+    def stages(self):
+        return [
+            (self.ramp, self.users, self.spawn_rate),
+            (self.duration, self.users, self.spawn_rate),
+        ]
+
+    def tick(self):
+        if self.sampler._thread is None:
+            self.sampler.start()
+        result = super().tick()
+        if result is None:
+            self.sampler.stop()
+        return result
+
+    def summary(self):
+        summary = super().summary()
+        samples = self.sampler.samples
+        summary['bmc_resources'] = samples
+        available = [s['memory_available_bytes'] for s in samples if s['memory_available_bytes'] is not None]
+        if len(available) >= 2:
+            # Отрицательная величина - доступная память BMC уменьшалась за прогон
+            summary['bmc_memory_available_delta_bytes'] = available[-1] - available[0]
+        return summary
+
+    def report(self):
+        self.sampler.stop()
+        return super().report()
+
+
+SHAPES = {
+    'step': StepLoadShape,
+    'spike': SpikeLoadShape,
+    'soak': SoakLoadShape,
+}
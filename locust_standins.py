@@ -0,0 +1,116 @@
+"""Локальные заглушки внешних API для нагрузочных тестов (JSONPlaceholder и wttr.in).
+
+Ответы сгенерированы заранее и отдаются с Content-Length по HTTP/1.1 keep-alive,
+поэтому сервер почти не тратит CPU и результаты не зависят от интернета.
+
+Запуск отдельно:
+    python locust_standins.py --port 8090
+"""
+import argparse
+import json
+import logging
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit
+
+from bmc_log import setup_logging
+
+logger = logging.getLogger(__name__)
+
+
+def build_posts(count=100):
+    """Посты в формате jsonplaceholder.typicode.com/posts"""
+    return [
+        {
+            'userId': post_id // 10 + 1,
+            'id': post_id,
+            'title': f"post title {post_id}",
+            'body': f"post body {post_id} " * 10,
+        }
+        for post_id in range(1, count + 1)
+    ]
+
+
+def build_weather(city='Novosibirsk', days=3):
+    """Ответ в формате wttr.in/<city>?format=j1"""
+    hourly = [
+        {
+            'time': str(hour * 300),
+            'tempC': str(-5 + hour),
+            'humidity': '80',
+            'weatherDesc': [{'value': 'Partly cloudy'}],
+            'windspeedKmph': '12',
+        }
+        for hour in range(8)
+    ]
+    return {
+        'current_condition': [{
+            'temp_C': '-3',
+            'FeelsLikeC': '-8',
+            'humidity': '80',
+            'weatherDesc': [{'value': 'Partly cloudy'}],
+            'windspeedKmph': '12',
+        }],
+        'nearest_area': [{'areaName': [{'value': city}], 'country': [{'value': 'Russia'}]}],
+        'weather': [
+            {'date': f"2024-01-0{day + 1}", 'maxtempC': '0', 'mintempC': '-10', 'hourly': hourly}
+            for day in range(days)
+        ],
+    }
+
+
+class StandinHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    POSTS_BODY = json.dumps(build_posts()).encode()
+    _weather_cache = {}
+
+    def do_GET(self):
+        path = urlsplit(self.path).path
+        if path == '/posts':
+            self._send_json(self.POSTS_BODY)
+        elif path.strip('/') and '/' not in path.strip('/'):
+            city = path.strip('/')
+            body = self._weather_cache.get(city)
+            if body is None:
+                body = self._weather_cache.setdefault(city, json.dumps(build_weather(city)).encode())
+            self._send_json(body)
+        else:
+            self._send_json(b'{}', status=404)
+
+    def _send_json(self, body, status=200):
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        # Лог каждого запроса сам по себе стал бы заметной нагрузкой
+        pass
+
+
+def start_standins(host='127.0.0.1', port=0):
+    """Запускает заглушки в фоновом потоке; возвращает (server, base_url)"""
+    server = ThreadingHTTPServer((host, port), StandinHandler)
+    server.daemon_threads = True
+    thread = threading.Thread(target=server.serve_forever, name='locust-standins', daemon=True)
+    thread.start()
+    base_url = f"http://{host}:{server.server_address[1]}"
+    logger.info("Заглушки внешних API запущены: %s", base_url)
+    return server, base_url
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8090)
+    args = parser.parse_args()
+
+    setup_logging('standins')
+    server = ThreadingHTTPServer((args.host, args.port), StandinHandler)
+    logger.info("Заглушки внешних API: http://%s:%s", args.host, args.port)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
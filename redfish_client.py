@@ -0,0 +1,46 @@
+"""Запросы Redfish, общие для тестов и бенчмарков.
+
+make_redfish_request используется тестами (tests_Redfish.py) и инструментами,
+которые меняют состояние BMC (bmc_writes.py), поэтому поддерживает PATCH и
+DELETE и дополнительные заголовки (If-Match).
+"""
+import logging
+import os
+
+import requests
+
+logger = logging.getLogger(__name__)
+
+# --- Конфигурация ---
+REDFISH_URL = os.getenv('REDFISH_URL', 'https://127.0.0.1:2443/redfish/v1')
+REQUEST_TIMEOUT = 10
+METHODS = ('GET', 'POST', 'PATCH', 'DELETE')
+
+
+def make_redfish_request(session, method, endpoint, json_data=None, expected_status=200, headers=None,
+                         base_url=REDFISH_URL):
+    """Универсальная функция для Redfish запросов
+
+    Повторы GET, circuit breaker и адаптивный таймаут (не больше 10 с)
+    обеспечивает транспорт сессии (bmc_resilience). expected_status - код или
+    набор кодов, при других кодах пишется предупреждение.
+    """
+    url = f"{base_url}{endpoint}"
+    method = method.upper()
+    if method not in METHODS:
+        raise ValueError(f"Неподдерживаемый метод: {method}")
+    expected = (expected_status,) if isinstance(expected_status, int) else tuple(expected_status)
+
+    try:
+        response = session.request(method, url, json=json_data, headers=headers, timeout=REQUEST_TIMEOUT)
+
+        logger.info("%s %s - Status: %s", method, url, response.status_code)
+
+        if response.status_code not in expected:
+            logger.warning("Ожидался статус %s, получен %s", expected_status, response.status_code)
+
+        return response
+
+    except requests.exceptions.RequestException as e:
+        logger.error("Ошибка запроса %s %s: %s", method, url, e)
+        raise
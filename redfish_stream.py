@@ -0,0 +1,137 @@
+"""Потоковый разбор Redfish коллекций.
+
+Members разбираются по одному элементу прямо из тела ответа, страницы
+Members@odata.nextLink запрашиваются лениво - память не растет с размером коллекции.
+"""
+import codecs
+import json
+import logging
+from urllib.parse import urljoin
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 16 * 1024
+WHITESPACE = ' \t\n\r'
+NUMBER_CHARS = '0123456789+-.eE'
+
+
+class _MembersParser:
+    """Инкрементальный разбор JSON объекта коллекции из потока чанков"""
+
+    def __init__(self, chunks):
+        self._chunks = iter(chunks)
+        self._text = codecs.getincrementaldecoder('utf-8')()
+        self._decoder = json.JSONDecoder()
+        self._buf = ''
+        self._pos = 0
+        self._eof = False
+        self.next_link = None
+
+    def _fill(self):
+        """Дочитывает чанк, отбрасывая уже разобранную часть буфера"""
+        if self._eof:
+            return False
+        self._buf = self._buf[self._pos:]
+        self._pos = 0
+        for chunk in self._chunks:
+            text = self._text.decode(chunk)
+            if text:
+                self._buf += text
+                return True
+        self._buf += self._text.decode(b'', final=True)
+        self._eof = True
+        return False
+
+    def _peek(self):
+        while True:
+            while self._pos < len(self._buf) and self._buf[self._pos] in WHITESPACE:
+                self._pos += 1
+            if self._pos < len(self._buf):
+                return self._buf[self._pos]
+            if not self._fill():
+                raise ValueError("Неожиданный конец JSON")
+
+    def _expect(self, char):
+        found = self._peek()
+        if found != char:
+            raise ValueError(f"Ожидался '{char}', получен '{found}' (позиция {self._pos})")
+        self._pos += 1
+
+    def _value(self):
+        """Разбирает одно значение, дочитывая поток при обрыве на границе чанка"""
+        while True:
+            self._peek()
+            try:
+                value, end = self._decoder.raw_decode(self._buf, self._pos)
+            except json.JSONDecodeError:
+                if not self._fill():
+                    raise
+                continue
+            # Число в конце буфера могло быть обрезано ("12" + "34", "6." + "75") -
+            # проверяем на следующем чанке
+            truncated = end >= len(self._buf) or (
+                isinstance(value, (int, float)) and not isinstance(value, bool)
+                and not self._buf[end:].strip(NUMBER_CHARS)
+            )
+            if truncated and self._fill():
+                continue
+            self._pos = end
+            return value
+
+    def members(self):
+        """Генератор элементов Members; остальные ключи верхнего уровня пропускаются"""
+        self._expect('{')
+        if self._peek() == '}':
+            return
+        while True:
+            key = self._value()
+            self._expect(':')
+            if key == 'Members' and self._peek() == '[':
+                self._pos += 1
+                if self._peek() == ']':
+                    self._pos += 1
+                else:
+                    while True:
+                        yield self._value()
+                        if self._peek() == ']':
+                            self._pos += 1
+                            break
+                        self._expect(',')
+            else:
+                value = self._value()
+                if key == 'Members@odata.nextLink':
+                    self.next_link = value
+            if self._peek() == '}':
+                return
+            self._expect(',')
+
+
+def iter_members(session, url, timeout=10, chunk_size=CHUNK_SIZE):
+    """Лениво перебирает Members коллекции по всем страницам nextLink
+
+    Пример:
+        for entry in iter_members(session, f"{BASE_URL}/Systems/system/LogServices/EventLog/Entries"):
+            ...
+    """
+    page_url = url
+    while page_url:
+        with session.get(page_url, timeout=timeout, stream=True) as response:
+            response.raise_for_status()
+            parser = _MembersParser(response.iter_content(chunk_size=chunk_size))
+            yield from parser.members()
+
+        if parser.next_link:
+            logger.debug("Следующая страница коллекции: %s", parser.next_link)
+            page_url = urljoin(page_url, parser.next_link)
+        else:
+            page_url = None
+
+
+def iter_expanded_members(session, url, timeout=10, chunk_size=CHUNK_SIZE):
+    """Как iter_members, но ссылки вида {"@odata.id": ...} заменяются самими ресурсами"""
+    for member in iter_members(session, url, timeout=timeout, chunk_size=chunk_size):
+        if isinstance(member, dict) and set(member) == {'@odata.id'}:
+            response = session.get(urljoin(url, member['@odata.id']), timeout=timeout)
+            response.raise_for_status()
+            member = response.json()
+        yield member
@@ -1,22 +1,182 @@
-from locust import HttpUser, task, between
+from locust import HttpUser, task, between, events
+from locust.runners import WorkerRunner
 import requests
 import json
+import logging
+import os
+import random
+import socket
 import time
 import urllib3
+from collections import defaultdict
+from contextlib import contextmanager
+
+from bmc_hdr import latency
+from bmc_log import setup_logging
+from bmc_qemu import ENABLED as QEMU_PROFILE, qemu_profiler
+from bmc_ssh import ENABLED as SSH_DIAG, diagnostics
+from bmc_transport import handshake_stats, mount_transport
+from locust_standins import start_standins
+from locust_openloop import OpenLoopUser, open_loop_stats
+import locust_shapes
+
+logger = logging.getLogger(__name__)
 
 urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
 
-class OpenBMCUser(HttpUser):
-    host = "https://localhost:2443"
-    wait_time = between(1, 3)
+# --- Конфигурация внешних API ---
+JSONPLACEHOLDER_HOST = os.getenv('JSONPLACEHOLDER_HOST', 'https://jsonplaceholder.typicode.com')
+WEATHER_HOST = os.getenv('WEATHER_HOST', 'https://wttr.in')
+# LOCUST_OFFLINE=1 - поднять локальные заглушки внешних API внутри процесса Locust
+OFFLINE = os.getenv('LOCUST_OFFLINE', '0') == '1'
+# full - полная проверка каждого ответа, sampled - полная проверка доли ответов,
+# status - только HTTP статус (без разбора JSON)
+VALIDATION_MODE = os.getenv('LOCUST_VALIDATION', 'full')
+VALIDATION_SAMPLE_RATE = float(os.getenv('LOCUST_VALIDATION_SAMPLE', '0.1'))
+REPORTS_DIR = os.getenv('REPORTS_DIR', 'reports')
+# Профиль нагрузки: step | spike | soak (по умолчанию постоянные -u/-r/-t)
+LOAD_SHAPE = os.getenv('LOCUST_SHAPE', '')
+# closed - пользователи с wait_time; open - постоянная частота запросов к OpenBMC
+OPEN_LOOP = os.getenv('LOCUST_MODE', 'closed') == 'open'
+# Запросов в секунду на одного open-loop пользователя
+OPEN_LOOP_RATE = float(os.getenv('OPEN_LOOP_RATE', '2.5'))
 
-    def __init__(self, *args, **kwargs):
-        super().__init__(*args, **kwargs)
+
+class ValidationCost:
+    """Политика проверки ответов и учет CPU генератора нагрузки на нее"""
+
+    def __init__(self, mode=VALIDATION_MODE, sample_rate=VALIDATION_SAMPLE_RATE):
+        if mode not in ('full', 'sampled', 'status'):
+            raise ValueError(f"Неизвестный режим проверки: {mode}")
+        self.mode = mode
+        self.sample_rate = sample_rate
+        self.responses = defaultdict(int)
+        self.validated = defaultdict(int)
+        self.cpu_seconds = defaultdict(float)
+
+    def should_validate(self, name):
+        self.responses[name] += 1
+        if self.mode == 'full':
+            return True
+        if self.mode == 'sampled':
+            return random.random() < self.sample_rate
+        return False
+
+    @contextmanager
+    def measure(self, name):
+        # Проверка не уступает управление другим greenlet-ам, поэтому
+        # CPU время потока равно стоимости самой проверки
+        start = time.thread_time()
+        try:
+            yield
+        finally:
+            self.cpu_seconds[name] += time.thread_time() - start
+            self.validated[name] += 1
+
+    def report(self):
+        summary = {
+            'mode': self.mode,
+            'sample_rate': self.sample_rate if self.mode == 'sampled' else None,
+            'endpoints': {
+                name: {
+                    'responses': self.responses[name],
+                    'validated': self.validated[name],
+                    'cpu_seconds': round(self.cpu_seconds[name], 6),
+                    'cpu_us_per_response': round(self.cpu_seconds[name] / self.responses[name] * 1e6, 2),
+                }
+                for name in self.responses
+            },
+        }
+        for name, data in summary['endpoints'].items():
+            logger.info("Validation [%s] %s: %s us CPU/response", self.mode, name, data['cpu_us_per_response'])
+
+        os.makedirs(REPORTS_DIR, exist_ok=True)
+        with open(os.path.join(REPORTS_DIR, 'locust_validation.json'), 'w', encoding='utf-8') as f:
+            json.dump(summary, f, indent=2, ensure_ascii=False)
+        return summary
+
+
+validation = ValidationCost()
+
+
+@events.init.add_listener
+def start_log_pipeline(environment, **kwargs):
+    # Обработчики Locust (stderr, --logfile) пишутся фоновым потоком, не потоками пользователей
+    if isinstance(environment.runner, WorkerRunner):
+        setup_logging(f"locust_{socket.gethostname()}_{os.getpid()}")
+    else:
+        setup_logging('locust')
+
+
+@events.init.add_listener
+def start_offline_standins(environment, **kwargs):
+    if OFFLINE:
+        _, base_url = start_standins()
+        JSONPlaceholderUser.host = base_url
+        WeatherAPIUser.host = base_url
+
+
+@events.test_start.add_listener
+def start_bmc_diagnostics(environment, **kwargs):
+    # Нагрузку BMC по SSH и профиль QEMU снимает только master (или единственный процесс)
+    if isinstance(environment.runner, WorkerRunner):
+        return
+    total = environment.runner.stats.total
+
+    def load():
+        return {
+            'users': environment.runner.user_count,
+            'rps': round(total.current_rps, 2),
+            'p95_ms': total.get_current_response_time_percentile(0.95),
+        }
+
+    if SSH_DIAG:
+        diagnostics.context = load
+        diagnostics.start()
+    if QEMU_PROFILE:
+        qemu_profiler.context = load
+        qemu_profiler.start()
+
+
+@events.request.add_listener
+def record_latency(name, response_time, **kwargs):
+    latency.record(name, response_time / 1000.0)
+
+
+@events.test_stop.add_listener
+def report_transport(environment, **kwargs):
+    # Сколько полных TLS handshake с bmcweb понадобилось за прогон
+    handshake_stats.report('locust')
+    validation.report()
+    open_loop_stats.report()
+    # У каждого воркера свой лог; объединяются потом через bmc_hdr.py merge
+    if isinstance(environment.runner, WorkerRunner):
+        latency_log = f"latency_locust_{socket.gethostname()}_{os.getpid()}.hlog"
+    else:
+        latency_log = "latency_locust.hlog"
+    latency.export(os.path.join(REPORTS_DIR, latency_log))
+    if SSH_DIAG and not isinstance(environment.runner, WorkerRunner):
+        diagnostics.stop()
+        diagnostics.report('locust')
+    if QEMU_PROFILE and not isinstance(environment.runner, WorkerRunner):
+        qemu_profiler.stop()
+        qemu_profiler.report('locust')
+    shape = getattr(environment, 'shape_class', None)
+    if shape is not None and hasattr(shape, 'report'):
+        shape.report()
+
+
+class OpenBMCClient:
+    """Запросы к OpenBMC, общие для closed-loop и open-loop пользователей"""
+
+    def setup_client(self):
         self.auth = ("root", "0penBmc")
         self.verify_ssl = False
+        # SSL контекст и кэш TLS сессий общие для всех пользователей процесса;
+        # пул соединений у каждого пользователя свой, как у отдельного клиента
+        mount_transport(self.client, verify=self.verify_ssl)
 
-    @task(3)
-    def get_system_info(self):
+    def request_system_info(self):
         with self.client.get(
             "/redfish/v1/Systems/system",
             auth=self.auth,
@@ -36,8 +196,7 @@ class OpenBMCUser(HttpUser):
             else:
                 response.failure(f"HTTP {response.status_code} for system info")
 
-    @task(2)
-    def get_power_state(self):
+    def request_power_state(self):
         with self.client.get(
             "/redfish/v1/Systems/system",
             auth=self.auth,
@@ -59,78 +218,130 @@ class OpenBMCUser(HttpUser):
                 response.failure(f"HTTP {response.status_code} for power state")
 
 
+class OpenBMCUser(OpenBMCClient, HttpUser):
+    abstract = OPEN_LOOP
+    host = "https://localhost:2443"
+    wait_time = between(1, 3)
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.setup_client()
+
+    @task(3)
+    def get_system_info(self):
+        self.request_system_info()
+
+    @task(2)
+    def get_power_state(self):
+        self.request_power_state()
+
+
+class OpenBMCArrivalUser(OpenBMCClient, OpenLoopUser):
+    """Те же запросы, что у OpenBMCUser, но с постоянной частотой (LOCUST_MODE=open)"""
+    abstract = not OPEN_LOOP
+    host = "https://localhost:2443"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.setup_client()
+
+    def arrivals(self):
+        # Частота делится между запросами в тех же пропорциях, что и веса задач OpenBMCUser
+        return [
+            ("OpenBMC - System Info", OPEN_LOOP_RATE * 3 / 5, self.request_system_info),
+            ("OpenBMC - Power State", OPEN_LOOP_RATE * 2 / 5, self.request_power_state),
+        ]
+
+
 class JSONPlaceholderUser(HttpUser):
-    host = "https://jsonplaceholder.typicode.com"
+    host = JSONPLACEHOLDER_HOST
     wait_time = between(0.5, 2)
 
     @task
     def get_posts_list(self):
+        name = "JSONPlaceholder - Posts List"
         with self.client.get(
             "/posts",
             catch_response=True,
-            name="JSONPlaceholder - Posts List"
+            name=name
         ) as response:
             if response.status_code == 200:
-                try:
-                    posts = response.json()
-                    if isinstance(posts, list) and len(posts) > 0 and all('id' in post and 'title' in post for post in posts):
-                        response.success()
-                    else:
-                        response.failure("Empty or invalid posts list")
-                except json.JSONDecodeError:
-                    response.failure("Invalid JSON in posts response")
+                if not validation.should_validate(name):
+                    response.success()
+                    return
+                with validation.measure(name):
+                    try:
+                        posts = response.json()
+                        if isinstance(posts, list) and len(posts) > 0 and all('id' in post and 'title' in post for post in posts):
+                            response.success()
+                        else:
+                            response.failure("Empty or invalid posts list")
+                    except json.JSONDecodeError:
+                        response.failure("Invalid JSON in posts response")
             else:
                 response.failure(f"HTTP {response.status_code} for posts list")
 
 
 class WeatherAPIUser(HttpUser):
-    host = "https://wttr.in"
+    host = WEATHER_HOST
     wait_time = between(1, 3)
 
     @task
     def get_weather(self):
+        name = "Weather API - Novosibirsk"
         with self.client.get(
             "/Novosibirsk?format=j1",
             headers={"User-Agent": "locust-load-test"},
             verify=False,
             catch_response=True,
-            name="Weather API - Novosibirsk"
+            name=name
         ) as response:
             if response.status_code == 200:
-                try:
-                    weather_data = response.json()
-                    if "current_condition" in weather_data:
-                        response.success()
-                    else:
-                        response.failure("Invalid weather response format")
-                except json.JSONDecodeError:
-                    response.failure("Invalid JSON in weather response")
+                if not validation.should_validate(name):
+                    response.success()
+                    return
+                with validation.measure(name):
+                    try:
+                        weather_data = response.json()
+                        if "current_condition" in weather_data:
+                            response.success()
+                        else:
+                            response.failure("Invalid weather response format")
+                    except json.JSONDecodeError:
+                        response.failure("Invalid JSON in weather response")
             else:
                 response.failure(f"HTTP {response.status_code}")
 
 
-    if __name__ == "__main__":
-        # Allow running this file directly in CI: invoke locust CLI programmatically using the same Python
-        import os
-        import sys
-        import subprocess
+# Locust берет профиль из переменной модуля; в файле должен быть только один класс профиля
+if LOAD_SHAPE:
+    LoadShape = locust_shapes.SHAPES[LOAD_SHAPE]
 
-        # Defaults can be overridden by environment variables
-        users = os.getenv('LOCUST_USERS', '5')
-        spawn_rate = os.getenv('LOCUST_SPAWN_RATE', '1')
-        run_time = os.getenv('LOCUST_RUN_TIME', '30s')
-        report_dir = os.getenv('REPORTS_DIR', 'reports')
-        report_file = os.path.join(report_dir, os.getenv('LOCUST_REPORT', 'locust_report.html'))
 
-        os.makedirs(report_dir, exist_ok=True)
+if __name__ == "__main__":
+    # Allow running this file directly in CI: invoke locust CLI programmatically using the same Python
+    import os
+    import sys
+    import subprocess
 
-        # Build locust CLI command using the same Python executable (so venv is respected)
-        cmd = [sys.executable, '-m', 'locust', '-f', __file__, '--headless', '-u', users, '-r', spawn_rate, '-t', run_time, '--html', report_file]
+    # Defaults can be overridden by environment variables
+    users = os.getenv('LOCUST_USERS', '5')
+    spawn_rate = os.getenv('LOCUST_SPAWN_RATE', '1')
+    run_time = os.getenv('LOCUST_RUN_TIME', '30s')
+    report_dir = os.getenv('REPORTS_DIR', 'reports')
+    report_file = os.path.join(report_dir, os.getenv('LOCUST_REPORT', 'locust_report.html'))
 
-        print(f"Running Locust: {' '.join(cmd)}")
-        try:
-            subprocess.run(cmd, check=True)
-        except subprocess.CalledProcessError as e:
-            print(f"Locust run failed with exit {e.returncode}")
-            # still exit 0 to avoid failing the whole pipeline; artifacts will show results
-            sys.exit(e.returncode)
+    os.makedirs(report_dir, exist_ok=True)
+
+    # Build locust CLI command using the same Python executable (so venv is respected)
+    cmd = [sys.executable, '-m', 'locust', '-f', __file__, '--headless', '--html', report_file]
+    if not LOAD_SHAPE:
+        cmd += ['-u', users, '-r', spawn_rate, '-t', run_time]
+
+    print(f"Running Locust: {' '.join(cmd)}")
+    try:
+        subprocess.run(cmd, check=True)
+    except subprocess.CalledProcessError as e:
+        print(f"Locust run failed with exit {e.returncode}")
+        # still exit 0 to avoid failing the whole pipeline; artifacts will show results
+        sys.exit(e.returncode)
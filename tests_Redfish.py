@@ -4,32 +4,49 @@ import json
 import logging
 import time
 from typing import Dict, Any
+from urllib.parse import urlsplit
+
+from bmc_resilience import resilience
+from bmc_shared import SharedStore, xdist_worker
+from bmc_transport import new_session, probe_http2
+from redfish_client import make_redfish_request
+from redfish_stream import iter_members
+from bmc_eventlog import EventLogStore, bmc_time
 
 # --- Настройка логирования ---
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s'
-)
+# Обработчики (очередь, JSON в reports/) подключает conftest.py через bmc_log.setup_logging
+logger = logging.getLogger(__name__)
 
 # --- Конфигурация ---
 BASE_URL = "https://127.0.0.1:2443/redfish/v1"
 USERNAME = "root"
 PASSWORD = "0penBmc"
 VERIFY_SSL = False  # Игнорировать SSL ошибки для тестов
+POWER_EVENT_TIMEOUT = 30  # Время ожидания записи о питании в журнале, сек
 
 # --- Фикстуры PyTest ---
 @pytest.fixture(scope="session")
-def auth_session():
-    """Создает аутентифицированную сессию для всех тестов"""
-    session = requests.Session()
-    session.auth = (USERNAME, PASSWORD)
-    session.verify = VERIFY_SSL
-    session.headers.update({
-        'Content-Type': 'application/json',
-        'OData-Version': '4.0'
-    })
-    
-    # Аутентификация через Session Service
+def shared_store(tmp_path_factory):
+    """Состояние, общее для воркеров pytest-xdist (общий каталог basetemp)"""
+    base = tmp_path_factory.getbasetemp()
+    if xdist_worker() is not None:
+        base = base.parent
+    return SharedStore(str(base / "redfish_shared"))
+
+@pytest.fixture(autouse=True)
+def bmc_state(request, shared_store):
+    """Тесты с маркером mutates_bmc выполняются монопольно относительно остальных воркеров"""
+    if request.node.get_closest_marker("mutates_bmc"):
+        with shared_store.state.exclusive():
+            yield
+        # Закэшированный /Systems/system мог устареть
+        shared_store.invalidate("system_info")
+    else:
+        with shared_store.state.shared():
+            yield
+
+def create_session_token(session):
+    """Аутентификация через Session Service; None - используем Basic Auth"""
     auth_data = {
         "UserName": USERNAME,
         "Password": PASSWORD
@@ -45,15 +62,36 @@ def auth_session():
         if response.status_code == 201:
             session_token = response.headers.get('X-Auth-Token')
             if session_token:
-                session.headers.update({'X-Auth-Token': session_token})
-                logging.info("✓ Аутентификация через Redfish API успешна")
-            else:
-                logging.warning("Токен сессии не получен, используем Basic Auth")
+                logger.info("✓ Аутентификация через Redfish API успешна")
+                return session_token
+            logger.warning("Токен сессии не получен, используем Basic Auth")
         else:
-            logging.warning(f"Session Service недоступен: {response.status_code}")
+            logger.warning("Session Service недоступен: %s", response.status_code)
             
     except requests.exceptions.RequestException as e:
-        logging.warning(f"Ошибка аутентификации: {e}. Используем Basic Auth")
+        logger.warning("Ошибка аутентификации: %s. Используем Basic Auth", e)
+    return None
+
+@pytest.fixture(scope="session")
+def auth_session(shared_store):
+    """Создает аутентифицированную сессию для всех тестов
+
+    Токен Session Service создается один раз и используется всеми воркерами xdist.
+    """
+    session = new_session(verify=VERIFY_SSL, resilience=resilience)
+    session.auth = (USERNAME, PASSWORD)
+    session.headers.update({
+        'Content-Type': 'application/json',
+        'OData-Version': '4.0'
+    })
+    
+    session_token = shared_store.get_or_create("session_token", lambda: create_session_token(session))
+    if session_token:
+        session.headers.update({'X-Auth-Token': session_token})
+    
+    # Проверяем, предлагает ли bmcweb HTTP/2 (попадает в отчет о транспорте)
+    bmc = urlsplit(BASE_URL)
+    probe_http2(bmc.hostname, bmc.port or 443)
     
     yield session
     
@@ -64,41 +102,33 @@ def auth_session():
         pass
 
 @pytest.fixture
-def system_info(auth_session):
-    """Получает информацию о системе"""
-    try:
+def system_info(auth_session, shared_store):
+    """Получает информацию о системе (один запрос на прогон для всех воркеров)"""
+    def fetch():
         response = auth_session.get(f"{BASE_URL}/Systems/system", timeout=10)
         if response.status_code == 200:
             return response.json()
-        else:
-            pytest.skip(f"Не удалось получить информацию о системе: {response.status_code}")
+        pytest.skip(f"Не удалось получить информацию о системе: {response.status_code}")
+    
+    try:
+        return shared_store.get_or_create("system_info", fetch)
     except requests.exceptions.RequestException as e:
         pytest.skip(f"Ошибка при получении информации о системе: {e}")
 
-# --- Вспомогательные функции ---
-def make_redfish_request(session, method, endpoint, json_data=None, expected_status=200):
-    """Универсальная функция для Redfish запросов"""
-    url = f"{BASE_URL}{endpoint}"
-    
+@pytest.fixture(scope="session")
+def event_log(auth_session):
+    """Локальный индекс журналов BMC, дозагружает только новые записи"""
+    store = EventLogStore()
     try:
-        if method.upper() == "GET":
-            response = session.get(url, timeout=10)
-        elif method.upper() == "POST":
-            response = session.post(url, json=json_data, timeout=10)
-        else:
-            raise ValueError(f"Неподдерживаемый метод: {method}")
-        
-        logging.info(f"{method} {url} - Status: {response.status_code}")
-        
-        if response.status_code != expected_status:
-            logging.warning(f"Ожидался статус {expected_status}, получен {response.status_code}")
-            
-        return response
-        
+        store.ingest(auth_session, BASE_URL)
     except requests.exceptions.RequestException as e:
-        logging.error(f"Ошибка запроса {method} {url}: {e}")
-        raise
+        logger.warning("Не удалось загрузить журналы событий: %s", e)
+    
+    yield store
+    
+    store.close()
 
+# --- Вспомогательные функции ---
 def get_cpu_temperature(session):
     """Получает температуру CPU из Redfish"""
     try:
@@ -139,7 +169,7 @@ def get_cpu_temperature(session):
         return None
         
     except requests.exceptions.RequestException as e:
-        logging.error(f"Ошибка при получении температуры CPU: {e}")
+        logger.error("Ошибка при получении температуры CPU: %s", e)
         return None
 
 # --- Тесты Redfish API ---
@@ -148,7 +178,7 @@ class TestRedfishAuthentication:
     
     def test_redfish_base_url_accessible(self, auth_session):
         """Тест доступности базового URL Redfish"""
-        logging.info("=== Тест доступности Redfish API ===")
+        logger.info("=== Тест доступности Redfish API ===")
         
         response = make_redfish_request(auth_session, "GET", "")
         
@@ -158,15 +188,15 @@ class TestRedfishAuthentication:
         assert 'RedfishVersion' in data, "Ответ не содержит версию Redfish"
         assert 'Systems' in data, "Ответ не содержит ссылку на Systems"
         
-        logging.info(f"✓ Redfish Version: {data.get('RedfishVersion')}")
-        logging.info("✓ Базовый URL Redfish доступен")
+        logger.info("✓ Redfish Version: %s", data.get('RedfishVersion'))
+        logger.info("✓ Базовый URL Redfish доступен")
     
     def test_session_authentication(self):
         """Тест аутентификации через Session Service"""
-        logging.info("=== Тест аутентификации Session Service ===")
+        logger.info("=== Тест аутентификации Session Service ===")
         
-        session = requests.Session()
-        session.verify = VERIFY_SSL
+        # Общий транспорт: TLS сессия переиспользуется из auth_session
+        session = new_session(verify=VERIFY_SSL, resilience=resilience)
         
         auth_data = {
             "UserName": USERNAME,
@@ -184,7 +214,7 @@ class TestRedfishAuthentication:
             assert 'X-Auth-Token' in response.headers, "Токен аутентификации не получен"
             session_token = response.headers['X-Auth-Token']
             assert session_token, "Токен аутентификации пустой"
-            logging.info("✓ Аутентификация через Session Service успешна")
+            logger.info("✓ Аутентификация через Session Service успешна")
         else:
             pytest.skip("Session Service недоступен, используем Basic Auth")
 
@@ -193,7 +223,7 @@ class TestSystemInformation:
     
     def test_system_info_endpoint(self, auth_session, system_info):
         """Тест получения информации о системе"""
-        logging.info("=== Тест информации о системе ===")
+        logger.info("=== Тест информации о системе ===")
         
         # Проверяем обязательные поля
         assert 'Id' in system_info, "Отсутствует поле Id"
@@ -204,13 +234,13 @@ class TestSystemInformation:
         valid_states = ['On', 'Off', 'PoweringOn', 'PoweringOff']
         assert power_state in valid_states, f"Недопустимый PowerState: {power_state}"
         
-        logging.info(f"✓ System ID: {system_info.get('Id')}")
-        logging.info(f"✓ Power State: {power_state}")
-        logging.info(f"✓ Status: {system_info.get('Status', {}).get('Health', 'Unknown')}")
+        logger.info("✓ System ID: %s", system_info.get('Id'))
+        logger.info("✓ Power State: %s", power_state)
+        logger.info("✓ Status: %s", system_info.get('Status', {}).get('Health', 'Unknown'))
     
     def test_system_components(self, auth_session, system_info):
         """Тест наличия основных компонентов системы"""
-        logging.info("=== Тест компонентов системы ===")
+        logger.info("=== Тест компонентов системы ===")
         
         # Проверяем ссылки на основные компоненты
         components = [
@@ -225,17 +255,17 @@ class TestSystemInformation:
         for component, description in components:
             if component in system_info:
                 found_components.append(description)
-                logging.info(f"✓ Найден компонент: {description}")
+                logger.info("✓ Найден компонент: %s", description)
         
         assert len(found_components) >= 2, f"Найдено слишком мало компонентов: {found_components}"
-        logging.info(f"✓ Обнаружены компоненты: {', '.join(found_components)}")
+        logger.info("✓ Обнаружены компоненты: %s", ', '.join(found_components))
 
 class TestPowerManagement:
     """Тесты управления питанием"""
     
     def test_power_control_actions(self, auth_session, system_info):
         """Тест доступных действий управления питанием"""
-        logging.info("=== Тест управления питанием ===")
+        logger.info("=== Тест управления питанием ===")
         
         actions = system_info.get('Actions', {}).get('#ComputerSystem.Reset', {})
         reset_target = actions.get('target')
@@ -257,24 +287,25 @@ class TestPowerManagement:
         # Если AllowableValues недоступны, используем стандартный список
         if not allowed_reset_types:
             allowed_reset_types = ['On', 'ForceOff', 'GracefulShutdown', 'ForceRestart', 'GracefulRestart']
-            logging.info("Используем стандартный список действий управления питанием")
+            logger.info("Используем стандартный список действий управления питанием")
         
         assert len(allowed_reset_types) > 0, "Нет доступных действий управления питанием"
         
-        logging.info(f"✓ Доступные действия питания: {allowed_reset_types}")
+        logger.info("✓ Доступные действия питания: %s", allowed_reset_types)
         
         # Проверяем наличие основных действий
         expected_actions = ['On', 'ForceOff', 'GracefulShutdown']
         available_actions = [action for action in expected_actions if action in allowed_reset_types]
         
         if available_actions:
-            logging.info(f"✓ Основные действия: {available_actions}")
+            logger.info("✓ Основные действия: %s", available_actions)
         else:
-            logging.warning("Основные действия управления питанием не найдены")
+            logger.warning("Основные действия управления питанием не найдены")
     
-    def test_power_state_cycle(self, auth_session):
+    @pytest.mark.mutates_bmc
+    def test_power_state_cycle(self, auth_session, event_log):
         """Тест цикла включения/выключения (только для тестовых сред)"""
-        logging.info("=== Тест цикла питания (информационный) ===")
+        logger.info("=== Тест цикла питания (информационный) ===")
         
         # В реальной системе этот тест может быть опасен
         # Здесь мы только проверяем доступность endpoint'а
@@ -284,29 +315,46 @@ class TestPowerManagement:
         }
         
         try:
+            # ResetType On для уже включенного хоста - no-op без записи в журнале
+            system = auth_session.get(f"{BASE_URL}/Systems/system", timeout=10)
+            power_state = system.json().get('PowerState') if system.status_code == 200 else None
+            reset_time = bmc_time(auth_session, BASE_URL)
             response = auth_session.post(
                 f"{BASE_URL}/Systems/system/Actions/ComputerSystem.Reset",
                 json=reset_data,
                 timeout=10
             )
             
-            logging.info(f"POST /Actions/ComputerSystem.Reset - Status: {response.status_code}")
+            logger.info("POST /Actions/ComputerSystem.Reset - Status: %s", response.status_code)
             
             if response.status_code in [200, 202, 204]:
-                logging.info("✓ Действие управления питанием принято сервером")
+                logger.info("✓ Действие управления питанием принято сервером")
+                
+                if power_state == 'On':
+                    pytest.skip("Хост уже включен: Reset On не меняет состояние питания")
+                # Включение выключенного хоста должно оставить запись о питании в журнале
+                power_event = event_log.wait_for_event(
+                    auth_session, BASE_URL,
+                    timeout=POWER_EVENT_TIMEOUT,
+                    message_id='%Power%',
+                    since=reset_time
+                )
+                assert power_event, f"Событие питания не появилось в журнале за {POWER_EVENT_TIMEOUT} с"
+                delay = power_event['created'] - reset_time
+                logger.info("✓ Событие %s через %.1f с после Reset", power_event['message_id'], delay)
             else:
-                logging.warning(f"Сервер вернул статус {response.status_code} для действия питания")
+                logger.warning("Сервер вернул статус %s для действия питания", response.status_code)
                 # Это не ошибка, так как система может не поддерживать это действие
                 
         except requests.exceptions.RequestException as e:
-            logging.warning(f"Endpoint управления питанием недоступен: {e}")
+            logger.warning("Endpoint управления питанием недоступен: %s", e)
 
 class TestTemperatureMonitoring:
     """Тесты мониторинга температуры"""
     
     def test_cpu_temperature_reading(self, auth_session):
         """Тест чтения температуры CPU"""
-        logging.info("=== Тест температуры CPU ===")
+        logger.info("=== Тест температуры CPU ===")
         
         cpu_temp = get_cpu_temperature(auth_session)
         
@@ -316,8 +364,8 @@ class TestTemperatureMonitoring:
         temperature = cpu_temp['temperature']
         name = cpu_temp['name']
         
-        logging.info(f"✓ CPU Temperature Sensor: {name}")
-        logging.info(f"✓ Temperature: {temperature}°{cpu_temp['units']}")
+        logger.info("✓ CPU Temperature Sensor: %s", name)
+        logger.info("✓ Temperature: %s°%s", temperature, cpu_temp['units'])
         
         # Проверяем, что температура в разумных пределах
         assert temperature is not None, "Температура не определена"
@@ -326,16 +374,16 @@ class TestTemperatureMonitoring:
         # Проверяем пороговые значения если они доступны
         thresholds = cpu_temp['thresholds']
         if thresholds['upper_critical']:
-            logging.info(f"✓ Upper Critical Threshold: {thresholds['upper_critical']}°C")
+            logger.info("✓ Upper Critical Threshold: %s°C", thresholds['upper_critical'])
             assert temperature < thresholds['upper_critical'], "Температура превышает критический порог"
         
         if thresholds['upper_fatal']:
-            logging.info(f"✓ Upper Fatal Threshold: {thresholds['upper_fatal']}°C")
+            logger.info("✓ Upper Fatal Threshold: %s°C", thresholds['upper_fatal'])
             assert temperature < thresholds['upper_fatal'], "Температура превышает фатальный порог"
     
     def test_temperature_sensors_exist(self, auth_session):
         """Тест наличия температурных сенсоров"""
-        logging.info("=== Тест наличия температурных сенсоров ===")
+        logger.info("=== Тест наличия температурных сенсоров ===")
         
         try:
             response = auth_session.get(f"{BASE_URL}/Chassis", timeout=10)
@@ -363,10 +411,12 @@ class TestTemperatureMonitoring:
                         temperatures = thermal_data.get('Temperatures', [])
                         
                         assert len(temperatures) > 0, "Нет доступных температурных сенсоров"
-                        logging.info(f"✓ Найдено температурных сенсоров: {len(temperatures)}")
+                        logger.info("✓ Найдено температурных сенсоров: %s", len(temperatures))
                         
-                        for sensor in temperatures[:3]:  # Показываем первые 3 сенсора
-                            logging.info(f"  - {sensor.get('Name')}: {sensor.get('ReadingCelsius')}°C")
+                        # Показания отдельных сенсоров - только при LOG_LEVELS=tests_Redfish=DEBUG
+                        if logger.isEnabledFor(logging.DEBUG):
+                            for sensor in temperatures:
+                                logger.debug("  - %s: %s°C", sensor.get('Name'), sensor.get('ReadingCelsius'))
                     else:
                         pytest.skip("Thermal endpoint недоступен")
                 else:
@@ -382,7 +432,7 @@ class TestInventory:
     
     def test_cpu_inventory(self, auth_session):
         """Тест инвентаризации CPU"""
-        logging.info("=== Тест инвентаризации CPU ===")
+        logger.info("=== Тест инвентаризации CPU ===")
         
         try:
             response = auth_session.get(f"{BASE_URL}/Systems/system/Processors", timeout=10)
@@ -408,9 +458,9 @@ class TestInventory:
                     summary = processors_data['ProcessorSummary']
                     count = summary.get('Count', 0)
                     if count > 0:
-                        logging.info(f"✓ Найдено процессоров: {count}")
-                        logging.info(f"✓ Model: {summary.get('Model', 'N/A')}")
-                        logging.info(f"✓ Total Cores: {summary.get('TotalCores', 'N/A')}")
+                        logger.info("✓ Найдено процессоров: %s", count)
+                        logger.info("✓ Model: %s", summary.get('Model', 'N/A'))
+                        logger.info("✓ Total Cores: %s", summary.get('TotalCores', 'N/A'))
                         return
                 
                 pytest.skip("Не найдено процессоров в системе")
@@ -426,28 +476,28 @@ class TestInventory:
                         cpu_info = cpu_response.json()
                         
                         # Проверяем основные поля
-                        logging.info(f"✓ Processor Type: {cpu_info.get('ProcessorType', 'N/A')}")
-                        logging.info(f"✓ Model: {cpu_info.get('Model', 'N/A')}")
-                        logging.info(f"✓ Total Cores: {cpu_info.get('TotalCores', 'N/A')}")
-                        logging.info(f"✓ Total Threads: {cpu_info.get('TotalThreads', 'N/A')}")
-                        logging.info(f"✓ Socket: {cpu_info.get('Socket', 'N/A')}")
+                        logger.info("✓ Processor Type: %s", cpu_info.get('ProcessorType', 'N/A'))
+                        logger.info("✓ Model: %s", cpu_info.get('Model', 'N/A'))
+                        logger.info("✓ Total Cores: %s", cpu_info.get('TotalCores', 'N/A'))
+                        logger.info("✓ Total Threads: %s", cpu_info.get('TotalThreads', 'N/A'))
+                        logger.info("✓ Socket: %s", cpu_info.get('Socket', 'N/A'))
                         
                     else:
-                        logging.info("✓ Процессоры найдены, но детальная информация недоступна")
+                        logger.info("✓ Процессоры найдены, но детальная информация недоступна")
                 else:
                     # Если это уже объект процессора
                     cpu_info = first_processor
-                    logging.info(f"✓ Processor Type: {cpu_info.get('ProcessorType', 'N/A')}")
-                    logging.info(f"✓ Model: {cpu_info.get('Model', 'N/A')}")
+                    logger.info("✓ Processor Type: %s", cpu_info.get('ProcessorType', 'N/A'))
+                    logger.info("✓ Model: %s", cpu_info.get('Model', 'N/A'))
             else:
-                logging.info(f"✓ Найдено процессоров: {len(processors)}")
+                logger.info("✓ Найдено процессоров: %s", len(processors))
                 
         except requests.exceptions.RequestException as e:
             pytest.skip(f"Ошибка при получении инвентаризации CPU: {e}")
     
     def test_memory_inventory(self, auth_session):
         """Тест инвентаризации памяти"""
-        logging.info("=== Тест инвентаризации памяти ===")
+        logger.info("=== Тест инвентаризации памяти ===")
         
         try:
             response = auth_session.get(f"{BASE_URL}/Systems/system/Memory", timeout=10)
@@ -465,18 +515,42 @@ class TestInventory:
                 if memory_response.status_code == 200:
                     memory_info = memory_response.json()
                     
-                    logging.info(f"✓ Memory Type: {memory_info.get('MemoryDeviceType', 'N/A')}")
-                    logging.info(f"✓ Capacity MB: {memory_info.get('CapacityMiB', 'N/A')}")
-                    logging.info(f"✓ Speed MHz: {memory_info.get('OperatingSpeedMhz', 'N/A')}")
-                    logging.info(f"✓ Manufacturer: {memory_info.get('Manufacturer', 'N/A')}")
+                    logger.info("✓ Memory Type: %s", memory_info.get('MemoryDeviceType', 'N/A'))
+                    logger.info("✓ Capacity MB: %s", memory_info.get('CapacityMiB', 'N/A'))
+                    logger.info("✓ Speed MHz: %s", memory_info.get('OperatingSpeedMhz', 'N/A'))
+                    logger.info("✓ Manufacturer: %s", memory_info.get('Manufacturer', 'N/A'))
                     
-                logging.info(f"✓ Найдено модулей памяти: {len(memory_modules)}")
+                logger.info("✓ Найдено модулей памяти: %s", len(memory_modules))
             else:
-                logging.info("✓ Модули памяти не найдены (возможно объединенная информация)")
+                logger.info("✓ Модули памяти не найдены (возможно объединенная информация)")
                 
         except requests.exceptions.RequestException as e:
             pytest.skip(f"Ошибка при получении инвентаризации памяти: {e}")
 
+class TestEventLog:
+    """Тесты журналов событий"""
+    
+    def test_event_log_entries(self, auth_session):
+        """Тест потокового чтения записей журнала событий"""
+        logger.info("=== Тест журнала событий ===")
+        
+        entries_url = f"{BASE_URL}/Systems/system/LogServices/EventLog/Entries"
+        
+        try:
+            count = 0
+            last_entry = None
+            # Записи разбираются по одной, без загрузки всей коллекции в память
+            for entry in iter_members(auth_session, entries_url):
+                assert 'Id' in entry, "Запись журнала без Id"
+                count += 1
+                last_entry = entry
+        except requests.exceptions.RequestException as e:
+            pytest.skip(f"Журнал событий недоступен: {e}")
+        
+        logger.info("✓ Записей в журнале событий: %s", count)
+        if last_entry:
+            logger.info("✓ Последняя запись: %s - %s", last_entry.get('Created', 'N/A'), last_entry.get('Message', 'N/A'))
+
 # --- Запуск тестов ---
 if __name__ == "__main__":
     # Запуск тестов через pytest
@@ -1,4 +1,5 @@
 import pytest
+import json
 import time
 import logging
 import warnings
@@ -13,9 +14,16 @@ from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.chrome.service import Service
 from selenium.common.exceptions import WebDriverException
 
+from bmc_hdr import latency
+from bmc_resilience import CircuitOpenError, resilience
+from bmc_trace import instrument_driver
+from webui_artifacts import artifacts, drain_performance_log
+from webui_perf import PagePerf, parse_performance_log
+from webui_routes import RouteMap
+
 # --- Настройка логирования ---
-logging.basicConfig(level=logging.INFO, 
-                    format='%(asctime)s - %(levelname)s - %(message)s')
+# Обработчики (очередь, JSON в reports/) подключает conftest.py через bmc_log.setup_logging
+logger = logging.getLogger(__name__)
 warnings.filterwarnings("ignore", category=DeprecationWarning)
 
 BASE_URL = "https://127.0.0.1:2443/"
@@ -23,6 +31,9 @@ VALID_USERNAME = "root"
 VALID_PASSWORD = "0penBmc"
 INVALID_USERNAME = "invalid_user"
 INVALID_PASSWORD = "wrong_password"
+LOGIN_RESPONSE_MAX_WAIT = 3  # Максимальное ожидание перехода со страницы входа, сек
+# selenium - WebDriver; cdp - прямое подключение к Chrome DevTools Protocol (webui_cdp.py)
+WEBUI_BACKEND = os.getenv('WEBUI_BACKEND', 'selenium')
 
 # --- Фикстура WebDriver ---
 @pytest.fixture(scope="session")
@@ -50,6 +61,9 @@ def driver():
         chrome_options.add_argument("--disable-gpu")
 
     chrome_options.add_argument("--window-size=1920,1080")
+    # Performance log (события Network) для метрик страниц, см. webui_perf.py;
+    # консоль браузера - для артефактов упавших тестов, см. webui_artifacts.py
+    chrome_options.set_capability('goog:loggingPrefs', {'performance': 'ALL', 'browser': 'ALL'})
 
     # Allow overriding Chrome binary and chromedriver path via environment
     chrome_bin = os.getenv('GOOGLE_CHROME_BIN', '/usr/bin/google-chrome')
@@ -70,7 +84,7 @@ def driver():
         else:
             drv = webdriver.Chrome(options=chrome_options)
     except WebDriverException as e:
-        logging.error(f"Cannot start Chrome WebDriver: {e}")
+        logger.error("Cannot start Chrome WebDriver: %s", e)
         pytest.skip(f"Skipping WebUI tests: Chrome not available or failed to start: {e}")
 
     try:
@@ -79,6 +93,7 @@ def driver():
         # maximize may not be supported in headless environments
         pass
 
+    instrument_driver(drv)
     drv.wait = WebDriverWait(drv, 15)
     yield drv
     try:
@@ -86,6 +101,71 @@ def driver():
     except Exception:
         pass
 
+# --- Фикстура UI backend с общим API: open, login, is_logged_in, find_text, click_text ---
+@pytest.fixture(scope="session")
+def webui(request):
+    if WEBUI_BACKEND != 'cdp':
+        yield SeleniumUI(request.getfixturevalue('driver'))
+        return
+
+    try:
+        from webui_cdp import CDPDriver
+    except ImportError as e:
+        pytest.skip(f"Skipping CDP backend: {e}")
+    try:
+        ui = CDPDriver()
+    except Exception as e:
+        logger.error("Cannot start Chrome via CDP: %s", e)
+        pytest.skip(f"Skipping WebUI tests: Chrome not available or failed to start: {e}")
+    yield ui
+    try:
+        ui.quit()
+    except Exception:
+        pass
+
+@pytest.fixture
+def webui_fresh(webui):
+    """Чистое состояние для выбранного backend"""
+    try:
+        webui.open(BASE_URL)
+    except Exception as e:
+        logger.warning("Ошибка при сбросе состояния: %s", e)
+    return webui
+
+# --- Фикстура метрик загрузки страниц ---
+@pytest.fixture
+def page_perf(request, record_property):
+    """Метрики навигаций теста; бюджеты проверяет page_perf.assert_within_budget()"""
+    if 'webui' in request.fixturenames:
+        ui = request.getfixturevalue('webui')
+    else:
+        ui = SeleniumUI(request.getfixturevalue('driver'))
+    perf = PagePerf(ui, request.node.nodeid)
+    yield perf
+    for page, metrics in perf.results.items():
+        record_property(f"perf_{page}", json.dumps(metrics))
+
+# --- Карта маршрутов WebUI (кэш по хэшу сборки UI) ---
+@pytest.fixture(scope="session")
+def route_map():
+    return RouteMap(BASE_URL)
+
+# --- Артефакты упавших тестов (пишутся в фоне, см. webui_artifacts.py) ---
+@pytest.fixture(autouse=True)
+def failure_artifacts(request):
+    yield
+    report = getattr(request.node, 'rep_call', None)
+    if report is None or not report.failed:
+        return
+    if 'driver' in request.fixturenames:
+        driver = request.getfixturevalue('driver')
+    elif 'webui' in request.fixturenames and isinstance(request.getfixturevalue('webui'), SeleniumUI):
+        driver = request.getfixturevalue('webui').driver
+    else:
+        return  # CDP backend не дает логов WebDriver
+    artifacts.capture(driver, request.node.name, report.longrepr.reprcrash.message
+                      if hasattr(report.longrepr, 'reprcrash') else None)
+
 # --- Фикстура для сброса состояния перед тестом ---
 @pytest.fixture
 def fresh_state(driver):
@@ -97,7 +177,7 @@ def fresh_state(driver):
         time.sleep(2)
         handle_security_warning(driver)
     except Exception as e:
-        logging.warning(f"Ошибка при сбросе состояния: {e}")
+        logger.warning("Ошибка при сбросе состояния: %s", e)
 
 # --- Фикстура для авторизованной сессии ---
 @pytest.fixture
@@ -115,7 +195,7 @@ def handle_security_warning(driver):
         page_source = driver.page_source.lower()
         
         if "your connection is not private" in page_source or "certificate" in page_source:
-            logging.info("Обнаружено предупреждение безопасности, обходим...")
+            logger.info("Обнаружено предупреждение безопасности, обходим...")
             
             # Пробуем кнопку Advanced
             advanced_buttons = driver.find_elements(By.XPATH, "//button[contains(text(), 'Advanced')]")
@@ -123,7 +203,7 @@ def handle_security_warning(driver):
                 if btn.is_displayed():
                     btn.click()
                     time.sleep(1)
-                    logging.info("Нажата кнопка Advanced")
+                    logger.info("Нажата кнопка Advanced")
                     break
             
             # Пробуем ссылку Proceed
@@ -132,7 +212,7 @@ def handle_security_warning(driver):
                 if link.is_displayed():
                     link.click()
                     time.sleep(2)
-                    logging.info("Нажата ссылка Proceed")
+                    logger.info("Нажата ссылка Proceed")
                     break
                     
             # Альтернативный вариант - keyboard navigation
@@ -143,12 +223,12 @@ def handle_security_warning(driver):
                     actions.send_keys(Keys.TAB).send_keys(Keys.ENTER)
                     actions.perform()
                     time.sleep(2)
-                    logging.info("Использован keyboard shortcut")
+                    logger.info("Использован keyboard shortcut")
                 except:
                     pass
                     
     except Exception as e:
-        logging.warning(f"Не удалось обработать предупреждение безопасности: {e}")
+        logger.warning("Не удалось обработать предупреждение безопасности: %s", e)
 
 def find_login_fields(driver):
     """Поиск полей для ввода логина и пароля"""
@@ -180,7 +260,7 @@ def find_login_fields(driver):
                             "user" in placeholder.lower() or 
                             not input_type):
                             username_field = element
-                            logging.info(f"Найдено поле username: {selector}")
+                            logger.info("Найдено поле username: %s", selector)
                             break
             
             if not password_field:
@@ -192,7 +272,7 @@ def find_login_fields(driver):
                         if (input_type == "password" or
                             "pass" in placeholder.lower()):
                             password_field = element
-                            logging.info(f"Найдено поле password: {selector}")
+                            logger.info("Найдено поле password: %s", selector)
                             break
                             
         except NoSuchElementException:
@@ -200,26 +280,47 @@ def find_login_fields(driver):
     
     return username_field, password_field
 
+@latency.timed("WebUI - login")
 def smart_login(driver, username, password):
-    """Умная авторизация с несколькими попытками"""
+    """Умная авторизация с несколькими попытками
+
+    Между попытками - задержка с разбросом (bmc_resilience), таймаут загрузки
+    страницы адаптируется к наблюдаемым задержкам, а при разомкнутом circuit
+    breaker вход сразу завершается неудачей.
+    """
     max_attempts = 3
     
     for attempt in range(max_attempts):
-        logging.info(f"Попытка входа {attempt + 1}/{max_attempts} для пользователя {username}")
+        logger.info("Попытка входа %s/%s для пользователя %s", attempt + 1, max_attempts, username)
+        
+        try:
+            resilience.check_breaker("вход в WebUI")
+        except CircuitOpenError as e:
+            logger.error("%s", e)
+            return False
         
         try:
             # Обновляем страницу при повторных попытках
             if attempt > 0:
-                driver.refresh()
-                time.sleep(2)
+                resilience.backoff(attempt - 1)
+                # Адаптивный таймаут только на refresh: остальные тесты сессии
+                # работают с прежним таймаутом загрузки страницы
+                previous_timeout = driver.timeouts.page_load
+                driver.set_page_load_timeout(resilience.timeouts.timeout("WebUI - page load", attempt=attempt))
+                try:
+                    started = time.perf_counter()
+                    driver.refresh()
+                    resilience.timeouts.record("WebUI - page load", time.perf_counter() - started)
+                finally:
+                    driver.set_page_load_timeout(previous_timeout)
                 handle_security_warning(driver)
             
             # Ищем поля ввода
             username_field, password_field = find_login_fields(driver)
             
             if not username_field or not password_field:
-                logging.warning(f"Попытка {attempt + 1}: поля не найдены")
-                driver.save_screenshot(f"login_fields_not_found_{attempt + 1}.png")
+                logger.warning("Попытка %s: поля не найдены", attempt + 1)
+                artifacts.capture(driver, f"login_fields_not_found_{attempt + 1}", "поля входа не найдены")
                 continue
             
             # Заполняем поля
@@ -247,7 +348,7 @@ def smart_login(driver, username, password):
                     for element in elements:
                         if element.is_displayed() and element.is_enabled():
                             login_button = element
-                            logging.info(f"Найдена кнопка входа: {selector}")
+                            logger.info("Найдена кнопка входа: %s", selector)
                             break
                     if login_button:
                         break
@@ -255,24 +356,36 @@ def smart_login(driver, username, password):
                     continue
             
             # Нажимаем кнопку или Enter
+            started = time.perf_counter()
             if login_button:
                 login_button.click()
             else:
                 password_field.send_keys(Keys.RETURN)
             
-            # Ждем результат
-            time.sleep(3)
+            # Ждем ухода со страницы входа, но не дольше адаптивного таймаута
+            try:
+                WebDriverWait(
+                    driver, resilience.timeouts.timeout("WebUI - login response", limit=LOGIN_RESPONSE_MAX_WAIT)
+                ).until(lambda d: "login" not in d.current_url.lower())
+                resilience.timeouts.record("WebUI - login response", time.perf_counter() - started)
+            except TimeoutException:
+                pass
+            
+            # BMC ответил на запрос страницы - это не отказ, даже если пароль неверный
+            resilience.breaker.record_success()
             
             # Проверяем успешность входа
             if is_logged_in(driver):
-                logging.info("✓ Вход выполнен успешно")
+                logger.info("✓ Вход выполнен успешно")
                 return True
             else:
-                logging.warning(f"Попытка {attempt + 1}: вход не удался")
+                logger.warning("Попытка %s: вход не удался", attempt + 1)
                 
         except Exception as e:
-            logging.error(f"Ошибка при попытке входа {attempt + 1}: {e}")
-            driver.save_screenshot(f"login_error_{attempt + 1}.png")
+            logger.error("Ошибка при попытке входа %s: %s", attempt + 1, e)
+            if isinstance(e, WebDriverException):
+                resilience.breaker.record_failure()
+            artifacts.capture(driver, f"login_error_{attempt + 1}", f"{type(e).__name__}: {e}")
     
     return False
 
@@ -294,7 +407,7 @@ def is_logged_in(driver):
             try:
                 element = driver.find_element(by, selector)
                 if element.is_displayed():
-                    logging.info(f"Найден индикатор входа: {selector}")
+                    logger.info("Найден индикатор входа: %s", selector)
                     return True
             except NoSuchElementException:
                 continue
@@ -302,11 +415,11 @@ def is_logged_in(driver):
         # Проверяем URL
         current_url = driver.current_url.lower()
         if "login" not in current_url and "auth" not in current_url:
-            logging.info("URL не содержит упоминаний логина - возможно вход выполнен")
+            logger.info("URL не содержит упоминаний логина - возможно вход выполнен")
             return True
             
     except Exception as e:
-        logging.warning(f"Ошибка при проверке входа: {e}")
+        logger.warning("Ошибка при проверке входа: %s", e)
     
     return False
 
@@ -327,27 +440,88 @@ def safe_logout(driver):
                     if element.is_displayed() and element.is_enabled():
                         element.click()
                         time.sleep(2)
-                        logging.info("Выход из системы выполнен")
+                        logger.info("Выход из системы выполнен")
                         return True
             except NoSuchElementException:
                 continue
     except Exception as e:
-        logging.debug(f"Не удалось выполнить logout: {e}")
+        logger.debug("Не удалось выполнить logout: %s", e)
     
     return False
 
+class SeleniumUI:
+    """Selenium backend с тем же API, что и webui_cdp.CDPDriver"""
+
+    def __init__(self, driver):
+        self.driver = driver
+
+    def open(self, url):
+        self.driver.delete_all_cookies()
+        self.driver.get(url)
+        time.sleep(2)
+        handle_security_warning(self.driver)
+
+    def login(self, username, password):
+        return smart_login(self.driver, username, password)
+
+    def is_logged_in(self):
+        return is_logged_in(self.driver)
+
+    def evaluate(self, expression):
+        return self.driver.execute_async_script(
+            f"Promise.resolve({expression}).then(arguments[arguments.length - 1]);"
+        )
+
+    def add_init_script(self, source):
+        result = self.driver.execute_cdp_cmd('Page.addScriptToEvaluateOnNewDocument', {'source': source})
+        return result['identifier']
+
+    def remove_init_script(self, identifier):
+        self.driver.execute_cdp_cmd('Page.removeScriptToEvaluateOnNewDocument', {'identifier': identifier})
+
+    def performance_log(self):
+        return parse_performance_log(drain_performance_log(self.driver))
+
+    def _find(self, texts, clickable):
+        for text in texts:
+            try:
+                for element in self.driver.find_elements(By.XPATH, f"//*[contains(text(), '{text}')]"):
+                    if element.is_displayed() and (not clickable or element.is_enabled()):
+                        return element
+            except NoSuchElementException:
+                continue
+        return None
+
+    def find_text(self, texts):
+        element = self._find(texts, clickable=False)
+        return element.text if element is not None else None
+
+    def click_text(self, texts):
+        element = self._find(texts, clickable=True)
+        if element is None:
+            return None
+        text = element.text
+        element.click()
+        time.sleep(2)
+        return text
+
 # --- Тесты авторизации ---
 class TestAuthentication:
     """Тесты авторизации"""
     
-    def test_successful_authentication(self, driver, fresh_state):
+    def test_successful_authentication(self, webui, page_perf):
         """Тест успешной авторизации"""
-        logging.info("=== Тест успешной авторизации ===")
-        assert smart_login(driver, VALID_USERNAME, VALID_PASSWORD), "Не удалось войти с корректными данными"
+        logger.info("=== Тест успешной авторизации (%s) ===", WEBUI_BACKEND)
+        with page_perf.navigation('login', ["Username", "Password", "Log in"]):
+            webui.open(BASE_URL)
+        with page_perf.navigation('overview', ["Overview", "Dashboard"]):
+            success = webui.login(VALID_USERNAME, VALID_PASSWORD)
+        assert success, "Не удалось войти с корректными данными"
+        page_perf.assert_within_budget()
     
     def test_invalid_credentials(self, driver, fresh_state):
         """Тест авторизации с неверными данными"""
-        logging.info("=== Тест неверных учетных данных ===")
+        logger.info("=== Тест неверных учетных данных ===")
         success = smart_login(driver, VALID_USERNAME, INVALID_PASSWORD)
         assert not success, "Вход не должен выполняться с неверным паролем"
         
@@ -366,7 +540,7 @@ class TestAuthentication:
                 for element in elements:
                     if element.is_displayed():
                         error_found = True
-                        logging.info(f"Найдено сообщение об ошибке: {element.text}")
+                        logger.info("Найдено сообщение об ошибке: %s", element.text)
                         break
                 if error_found:
                     break
@@ -374,17 +548,17 @@ class TestAuthentication:
                 continue
         
         if error_found:
-            logging.info("✓ Сообщение об ошибке найдено")
+            logger.info("✓ Сообщение об ошибке найдено")
         else:
-            logging.warning("Сообщение об ошибке не найдено")
+            logger.warning("Сообщение об ошибке не найдено")
     
     def test_account_lockout(self, driver, fresh_state):
         """Тест блокировки учетной записи"""
-        logging.info("=== Тест блокировки учетной записи ===")
+        logger.info("=== Тест блокировки учетной записи ===")
         
         # Выполняем несколько неудачных попыток входа
         for attempt in range(3):
-            logging.info(f"Неудачная попытка входа {attempt + 1}/3")
+            logger.info("Неудачная попытка входа %s/3", attempt + 1)
             smart_login(driver, VALID_USERNAME, INVALID_PASSWORD)
             time.sleep(1)
         
@@ -403,7 +577,7 @@ class TestAuthentication:
                 for element in elements:
                     if element.is_displayed():
                         lockout_detected = True
-                        logging.info(f"Обнаружена блокировка: {element.text}")
+                        logger.info("Обнаружена блокировка: %s", element.text)
                         break
                 if lockout_detected:
                     break
@@ -411,75 +585,93 @@ class TestAuthentication:
                 continue
         
         if lockout_detected:
-            logging.info("✓ Блокировка учетной записи обнаружена")
+            logger.info("✓ Блокировка учетной записи обнаружена")
         else:
-            logging.info("Блокировка не обнаружена (может быть отключена в системе)")
+            logger.info("Блокировка не обнаружена (может быть отключена в системе)")
 
 # --- Тесты функциональности (требуют авторизации) ---
 class TestFunctionality:
     """Тесты функциональности OpenBMC"""
     
-    def test_server_power_control_and_logs(self, logged_in_driver):
+    def test_server_power_control_and_logs(self, logged_in_driver, page_perf, route_map):
         """Тест управления питанием сервера"""
-        logging.info("=== Тест управления питанием ===")
+        logger.info("=== Тест управления питанием ===")
         driver = logged_in_driver
         
         # Ищем раздел управления питанием
         power_found = False
+        route = route_map.find(SeleniumUI(driver), ["power-operations", "Server power"])
+        if route is not None:
+            with page_perf.navigation('power', ["Server power operations", "Power operations"]):
+                route_map.go(SeleniumUI(driver), route)
+            power_found = True
+            driver.save_screenshot("power_management.png")
+        
+        # Без известного маршрута - поиск пункта меню
         power_selectors = [
             (By.XPATH, "//*[contains(text(), 'Power')]"),
             (By.XPATH, "//*[contains(text(), 'Control')]"),
             (By.ID, "power-control"),
         ]
         
-        for by, selector in power_selectors:
-            try:
-                elements = driver.find_elements(by, selector)
-                for element in elements:
-                    if element.is_displayed() and element.is_enabled():
-                        element.click()
-                        time.sleep(2)
-                        power_found = True
-                        logging.info(f"Найден раздел управления питанием: {selector}")
-                        driver.save_screenshot("power_management.png")
+        if not power_found:
+            for by, selector in power_selectors:
+                try:
+                    elements = driver.find_elements(by, selector)
+                    for element in elements:
+                        if element.is_displayed() and element.is_enabled():
+                            with page_perf.navigation('power', ["Server power operations", "Power operations"]):
+                                element.click()
+                            power_found = True
+                            logger.info("Найден раздел управления питанием: %s", selector)
+                            driver.save_screenshot("power_management.png")
+                            break
+                    if power_found:
                         break
-                if power_found:
-                    break
-            except NoSuchElementException:
-                continue
+                except NoSuchElementException:
+                    continue
         
         if power_found:
-            logging.info("✓ Раздел управления питанием найден")
+            logger.info("✓ Раздел управления питанием найден")
         else:
-            logging.warning("Раздел управления питанием не найден")
+            logger.warning("Раздел управления питанием не найден")
+        page_perf.assert_within_budget()
     
-    def test_component_temperature(self, logged_in_driver):
+    def test_component_temperature(self, logged_in_driver, page_perf, route_map):
         """Тест проверки температуры компонентов"""
-        logging.info("=== Тест проверки температуры ===")
+        logger.info("=== Тест проверки температуры ===")
         driver = logged_in_driver
         
         # Ищем раздел мониторинга
         monitoring_found = False
+        route = route_map.find(SeleniumUI(driver), ["sensors"])
+        if route is not None:
+            with page_perf.navigation('sensors', ["Temperature", "℃", "°C"]):
+                route_map.go(SeleniumUI(driver), route)
+            monitoring_found = True
+        
+        # Без известного маршрута - поиск пункта меню
         monitoring_selectors = [
             (By.XPATH, "//*[contains(text(), 'Sensors')]"),
             (By.XPATH, "//*[contains(text(), 'Monitoring')]"),
             (By.XPATH, "//*[contains(text(), 'Hardware')]"),
         ]
         
-        for by, selector in monitoring_selectors:
-            try:
-                elements = driver.find_elements(by, selector)
-                for element in elements:
-                    if element.is_displayed() and element.is_enabled():
-                        element.click()
-                        time.sleep(2)
-                        monitoring_found = True
-                        logging.info(f"Найден раздел мониторинга: {selector}")
+        if not monitoring_found:
+            for by, selector in monitoring_selectors:
+                try:
+                    elements = driver.find_elements(by, selector)
+                    for element in elements:
+                        if element.is_displayed() and element.is_enabled():
+                            with page_perf.navigation('sensors', ["Temperature", "℃", "°C"]):
+                                element.click()
+                            monitoring_found = True
+                            logger.info("Найден раздел мониторинга: %s", selector)
+                            break
+                    if monitoring_found:
                         break
-                if monitoring_found:
-                    break
-            except NoSuchElementException:
-                continue
+                except NoSuchElementException:
+                    continue
         
         # Ищем информацию о температуре
         temp_found = False
@@ -495,7 +687,7 @@ class TestFunctionality:
                     elements = driver.find_elements(by, selector)
                     for element in elements:
                         if element.is_displayed():
-                            logging.info(f"Найдена информация о температуре: {element.text}")
+                            logger.info("Найдена информация о температуре: %s", element.text)
                             temp_found = True
                             driver.save_screenshot("temperature_found.png")
                             break
@@ -505,58 +697,58 @@ class TestFunctionality:
                     continue
         
         if temp_found:
-            logging.info("✓ Информация о температуре найдена")
+            logger.info("✓ Информация о температуре найдена")
         else:
-            logging.warning("Информация о температуре не найдена")
+            logger.warning("Информация о температуре не найдена")
+        page_perf.assert_within_budget()
     
-    def test_inventory_display(self, logged_in_driver):
+    def test_inventory_display(self, webui_fresh, page_perf, route_map):
         """Тест отображения инвентаря"""
-        logging.info("=== Тест отображения инвентаря ===")
-        driver = logged_in_driver
-        
-        # Ищем раздел инвентаря
-        inventory_found = False
-        inventory_selectors = [
-            (By.XPATH, "//*[contains(text(), 'Inventory')]"),
-            (By.XPATH, "//*[contains(text(), 'Hardware')]"),
-            (By.XPATH, "//*[contains(text(), 'System')]"),
-        ]
-        
-        for by, selector in inventory_selectors:
-            try:
-                elements = driver.find_elements(by, selector)
-                for element in elements:
-                    if element.is_displayed() and element.is_enabled():
-                        element.click()
-                        time.sleep(2)
-                        inventory_found = True
-                        logging.info(f"Найден раздел инвентаря: {selector}")
-                        break
-                if inventory_found:
-                    break
-            except NoSuchElementException:
-                continue
-        
+        logger.info("=== Тест отображения инвентаря (%s) ===", WEBUI_BACKEND)
+        webui = webui_fresh
+        if not webui.login(VALID_USERNAME, VALID_PASSWORD):
+            pytest.skip("Не удалось выполнить вход для теста")
+
+        # Ищем раздел инвентаря: по карте маршрутов или через меню
+        route = route_map.find(webui, ["inventory"])
+        with page_perf.navigation('inventory', ["Processor", "DIMM", "Memory"]):
+            if route is not None:
+                route_map.go(webui, route)
+                section = f"#{route}"
+            else:
+                section = webui.click_text(["Inventory", "Hardware", "System"])
+        if section is not None:
+            logger.info("Найден раздел инвентаря: %s", section)
+
         # Ищем компоненты в инвентаре
-        components_found = False
-        if inventory_found:
-            components = ["CPU", "Memory", "DIMM", "Processor"]
-            
-            for component in components:
-                try:
-                    elements = driver.find_elements(By.XPATH, f"//*[contains(text(), '{component}')]")
-                    for element in elements:
-                        if element.is_displayed():
-                            logging.info(f"Найден компонент: {component} - {element.text}")
-                            components_found = True
-                            driver.save_screenshot("inventory_found.png")
-                            break
-                    if components_found:
-                        break
-                except NoSuchElementException:
-                    continue
-        
-        if components_found:
-            logging.info("✓ Компоненты инвентаря найдены")
+        component = None
+        if section is not None:
+            component = webui.find_text(["CPU", "Memory", "DIMM", "Processor"])
+            if component is not None:
+                logger.info("Найден компонент: %s", component)
+
+        if component is not None:
+            logger.info("✓ Компоненты инвентаря найдены")
         else:
-            logging.warning("Компоненты инвентаря не найдены")
+            logger.warning("Компоненты инвентаря не найдены")
+        page_perf.assert_within_budget()
+
+    def test_pages_concurrently(self, webui):
+        """Smoke проверка нескольких разделов параллельно в одном браузере (только CDP)"""
+        if WEBUI_BACKEND != 'cdp':
+            pytest.skip("Параллельные страницы доступны только с WEBUI_BACKEND=cdp")
+        logger.info("=== Параллельная проверка разделов ===")
+        results, errors = webui.check_pages(BASE_URL, VALID_USERNAME, VALID_PASSWORD, {
+            'inventory': (["Inventory", "Hardware"], ["CPU", "Memory", "DIMM", "Processor"]),
+            'sensors': (["Sensors", "Monitoring"], ["Temperature", "℃", "°C"]),
+            'power': (["Power"], ["Power"]),
+        })
+        for name, text in results.items():
+            if text is not None:
+                logger.info("✓ %s: %s", name, text)
+            else:
+                logger.warning("%s: раздел или содержимое не найдены", name)
+        for name, error in errors.items():
+            logger.error("%s: ошибка вкладки: %s: %s", name, type(error).__name__, error)
+        assert not errors, f"Ошибки при проверке разделов: {sorted(errors)}"
+        assert any(text is not None for text in results.values()), "Ни один раздел не открылся"
@@ -0,0 +1,101 @@
+import json
+from urllib.parse import parse_qs, urlsplit
+
+import pytest
+
+from bmc_eventlog import EventLogStore
+
+# --- Конфигурация ---
+BASE_URL = "https://bmc.test:443/redfish/v1"
+SERVICE_PATH = "/redfish/v1/Systems/system/LogServices/EventLog"
+
+
+class FakeResponse:
+    def __init__(self, body):
+        self.status_code = 200
+        self._data = json.dumps(body).encode('utf-8')
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+    def raise_for_status(self):
+        pass
+
+    def json(self):
+        return json.loads(self._data)
+
+    def iter_content(self, chunk_size=1):
+        for position in range(0, len(self._data), 7):
+            yield self._data[position:position + 7]
+
+
+class FakeLogSession:
+    """Журнал EventLog одного BMC: записи можно добавлять, очищать и ротировать"""
+
+    def __init__(self):
+        self.entries = []
+        self.next_id = 1
+
+    def add(self, count, message_id='OpenBMC.0.1.Test'):
+        for _ in range(count):
+            self.entries.append({
+                'Id': str(self.next_id),
+                'Created': f"2024-06-11T10:00:{self.next_id % 60:02d}+00:00",
+                'MessageId': message_id,
+                'Severity': 'OK',
+            })
+            self.next_id += 1
+
+    def get(self, url, timeout=None, stream=False):
+        parts = urlsplit(url)
+        if parts.path.endswith('/LogServices'):
+            return FakeResponse({'Members': [{'@odata.id': SERVICE_PATH}]})
+        skip = int(parse_qs(parts.query).get('$skip', ['0'])[0])
+        return FakeResponse({'Members': self.entries[skip:]})
+
+
+@pytest.fixture
+def store():
+    store = EventLogStore(':memory:')
+    yield store
+    store.close()
+
+
+class TestIngest:
+    """Инкрементальная загрузка и полная перезагрузка после очистки журнала"""
+
+    def test_incremental(self, store):
+        session = FakeLogSession()
+        session.add(5)
+        assert store.ingest(session, BASE_URL) == 5
+        assert store.ingest(session, BASE_URL) == 0
+        session.add(2)
+        assert store.ingest(session, BASE_URL) == 2
+
+    def test_rotation_resyncs(self, store):
+        session = FakeLogSession()
+        session.add(5)
+        store.ingest(session, BASE_URL)
+
+        # Ротация: старые записи удалены, новых больше, чем было
+        session.entries = []
+        session.add(7, 'OpenBMC.0.1.PowerOn')
+        assert store.ingest(session, BASE_URL) == 7
+        session.add(1)
+        assert store.ingest(session, BASE_URL) == 1
+
+    def test_clear_resyncs(self, store):
+        session = FakeLogSession()
+        session.add(5)
+        store.ingest(session, BASE_URL)
+
+        # Очистка: записей меньше, чем было прочитано, $skip возвращает пустую страницу
+        session.entries = []
+        session.add(2, 'OpenBMC.0.1.PowerOn')
+        assert store.ingest(session, BASE_URL) == 2
+        assert len(store.find_events(message_id='%PowerOn%', bmc=BASE_URL)) == 2
+        session.add(3)
+        assert store.ingest(session, BASE_URL) == 3
@@ -0,0 +1,93 @@
+import math
+import random
+
+import pytest
+
+from bmc_hdr import HdrHistogram, LatencyRecorder, merge_logs, read_log
+
+# --- Конфигурация ---
+DIGITS = 3
+PERCENTILES = (50, 90, 99, 99.9, 100)
+
+
+def exact_percentile(values, percentile):
+    """Перцентиль по тому же правилу ранга, что и HdrHistogram.value_at_percentile"""
+    ordered = sorted(values)
+    target = max(1, int(percentile / 100.0 * len(ordered) + 0.5))
+    return ordered[target - 1]
+
+
+@pytest.fixture
+def latencies():
+    """Детерминированные задержки в микросекундах: от десятков мкс до минут"""
+    rng = random.Random(20240611)
+    return [max(1, int(rng.lognormvariate(math.log(20000), 1.5))) for _ in range(20000)]
+
+
+class TestHdrHistogram:
+    """Точность перцентилей и сериализация гистограмм"""
+
+    def test_percentile_error_within_significant_digits(self, latencies):
+        histogram = HdrHistogram(significant_digits=DIGITS)
+        for value in latencies:
+            histogram.record(value)
+
+        assert histogram.total_count == len(latencies)
+        assert histogram.min_value == min(latencies)
+        assert histogram.max_value == max(latencies)
+        for percentile in PERCENTILES:
+            exact = exact_percentile(latencies, percentile)
+            reported = histogram.value_at_percentile(percentile)
+            assert abs(reported - exact) <= exact * 10 ** -DIGITS, f"p{percentile}: {reported} != {exact}"
+
+    def test_encode_decode_round_trip(self, latencies):
+        histogram = HdrHistogram(significant_digits=DIGITS)
+        for value in latencies:
+            histogram.record(value)
+
+        decoded = HdrHistogram.decode(histogram.encode(), significant_digits=DIGITS)
+
+        assert decoded.counts == histogram.counts
+        assert decoded.total_count == histogram.total_count
+        assert decoded.percentiles(PERCENTILES[:-1]) == histogram.percentiles(PERCENTILES[:-1])
+
+    def test_empty_histogram(self):
+        histogram = HdrHistogram()
+        assert histogram.value_at_percentile(99) is None
+        assert HdrHistogram.decode(histogram.encode()).total_count == 0
+
+
+class TestHistogramLogs:
+    """Логи hlog: запись, чтение и объединение без потери точности"""
+
+    def test_log_round_trip(self, tmp_path, latencies):
+        recorder = LatencyRecorder()
+        for value in latencies:
+            recorder.record('GET /redfish/v1, Systems', value / 1e6)
+        path = recorder.export(str(tmp_path / 'latency.hlog'))
+
+        histograms = read_log(path)
+
+        # Запятая в имени заменяется: она разделяет поля строки hlog
+        histogram = histograms['GET /redfish/v1  Systems']
+        original = recorder.histograms['GET /redfish/v1, Systems']
+        assert histogram.counts == original.counts
+        assert histogram.max_value == original.max_value
+
+    def test_merge_equals_single_histogram(self, tmp_path, latencies):
+        half = len(latencies) // 2
+        paths = []
+        for number, part in enumerate((latencies[:half], latencies[half:])):
+            recorder = LatencyRecorder()
+            for value in part:
+                recorder.record('login', value / 1e6)
+            paths.append(recorder.export(str(tmp_path / f"worker{number}.hlog")))
+        combined = HdrHistogram()
+        for value in latencies:
+            combined.record(value)
+
+        merged = merge_logs(paths)['login']
+
+        assert merged.total_count == len(latencies)
+        assert merged.counts == combined.counts
+        assert merged.percentiles(PERCENTILES) == combined.percentiles(PERCENTILES)
@@ -0,0 +1,131 @@
+import pytest
+
+from bmc_ipmi import (
+    AES128, IPMIClient, IPMIError, IPMISession, PAYLOAD_IPMI, SensorRecord, SessionKeys,
+    parse_v2_packet, user_key, v2_packet,
+)
+from bmc_ipmi_standin import compact_sensor_record, full_sensor_record, start_standin
+
+# --- Конфигурация ---
+# Ключ сессии (SIK) для проверки вывода K1 и K2 по спецификации IPMI 2.0 (13.32)
+SIK = bytes(range(32))
+KNOWN_KEYS = {
+    3: (
+        '281ce0e8b90ca08421363a68179b3189a88d8ce1',
+        'eaacac340c660268c40123121120574c',
+        'fb8fd4d3e9e72aefa9637a47',
+    ),
+    17: (
+        '8f34f198a044babe550f6217f57fc801e20bee40dd16b9712797aaf5bac3106b',
+        '4711da70e361cc4884e705f63bb297e3',
+        '9a8d08a2d748e8d12e9c0b9e912fba0e',
+    ),
+}
+
+
+@pytest.fixture(scope='module')
+def standin_port():
+    """Заглушка IPMI в фоновом потоке на свободном UDP порту"""
+    server, port = start_standin()
+    yield port
+    server.shutdown()
+
+
+class TestAES128:
+    """AES-128 по эталонным векторам NIST"""
+
+    def test_fips197_block(self):
+        # FIPS-197, Appendix C.1
+        cipher = AES128(bytes.fromhex('000102030405060708090a0b0c0d0e0f'))
+        plain = bytes.fromhex('00112233445566778899aabbccddeeff')
+        encrypted = cipher.encrypt_block(plain)
+        assert encrypted == bytes.fromhex('69c4e0d86a7b0430d8cdb78070b4c55a')
+        assert cipher.decrypt_block(encrypted) == plain
+
+    def test_sp800_38a_cbc(self):
+        # SP 800-38A, F.2.1 CBC-AES128.Encrypt, первые два блока
+        cipher = AES128(bytes.fromhex('2b7e151628aed2a6abf7158809cf4f3c'))
+        iv = bytes.fromhex('000102030405060708090a0b0c0d0e0f')
+        plain = bytes.fromhex('6bc1bee22e409f96e93d7e117393172aae2d8a571e03ac9c9eb76fac45af8e51')
+        encrypted = cipher.encrypt_cbc(iv, plain)
+        assert encrypted == bytes.fromhex('7649abac8119b246cee98e9b12e9197d5086cb9b507219ee95db113a917678b2')
+        assert cipher.decrypt_cbc(iv, encrypted) == plain
+
+    def test_key_length(self):
+        with pytest.raises(ValueError):
+            AES128(bytes(20))
+
+
+class TestSessionKeys:
+    """Вывод ключей сессии, подпись пакетов и RAKP против заглушки"""
+
+    @pytest.mark.parametrize('cipher_suite', sorted(KNOWN_KEYS))
+    def test_key_derivation_known_answer(self, cipher_suite):
+        k1, k2, auth_code = KNOWN_KEYS[cipher_suite]
+        keys = SessionKeys(cipher_suite, SIK)
+        assert keys.k1.hex() == k1
+        assert bytes(keys.aes.round_keys[0]).hex() == k2
+        # HMAC-SHA1-96 и HMAC-SHA256-128: подпись усекается до длины ICV
+        assert keys.auth_code(b'IPMI').hex() == auth_code
+
+    def test_user_key_padding(self):
+        assert user_key('0penBmc') == b'0penBmc' + bytes(13)
+        assert len(user_key('x' * 32)) == 20
+
+    @pytest.mark.parametrize('cipher_suite', sorted(KNOWN_KEYS))
+    def test_encrypted_packet_round_trip(self, cipher_suite):
+        keys = SessionKeys(cipher_suite, SIK)
+        payload = bytes(range(37))
+        packet = v2_packet(PAYLOAD_IPMI, 0x1234, 7, payload, keys)
+
+        assert parse_v2_packet(packet, keys) == (PAYLOAD_IPMI, 0x1234, 7, payload)
+        tampered = packet[:20] + bytes((packet[20] ^ 1,)) + packet[21:]
+        with pytest.raises(IPMIError):
+            parse_v2_packet(tampered, keys)
+
+    @pytest.mark.parametrize('cipher_suite', sorted(KNOWN_KEYS))
+    def test_rakp_against_standin(self, standin_port, cipher_suite):
+        session = IPMISession(port=standin_port, cipher_suite=cipher_suite).open()
+        try:
+            readings = IPMIClient(session).read_sensors()
+        finally:
+            session.close()
+        assert readings['ambient'] is not None
+        assert session.stats['retransmits'] == 0
+
+    def test_rakp_wrong_password(self, standin_port):
+        session = IPMISession(port=standin_port, password='wrong', timeout=0.3, retries=1)
+        try:
+            with pytest.raises(IPMIError):
+                session.open()
+        finally:
+            session.close()
+
+
+class TestSensorRecord:
+    """Перевод сырых показаний по SDR: y = L[(M * x + B * 10^Bexp) * 10^Rexp]"""
+
+    @pytest.mark.parametrize('m, r_exp, raw, expected', [
+        (1, 0, 41, 41),         # температура, C
+        (1, -2, 120, 1.2),      # напряжение, V
+        (100, 0, 52, 5200),     # обороты вентилятора
+        (-5, 0, 10, -50),       # 10-битный M со знаком
+    ])
+    def test_full_record_linear(self, m, r_exp, raw, expected):
+        sensor = SensorRecord(full_sensor_record(0, 0x10, 'sensor', 1, m, r_exp))
+        assert sensor.record_type == 0x01
+        assert sensor.name == 'sensor'
+        assert sensor.unit == 'Celsius'
+        assert sensor.convert(raw) == expected
+
+    def test_signed_analog_formats(self):
+        record = bytearray(full_sensor_record(0, 0x10, 'inlet', 1, 1, 0))
+        record[20] |= 0x80  # дополнительный код
+        assert SensorRecord(bytes(record)).convert(0xF6) == -10
+        record[20] = (record[20] & 0x3F) | 0x40  # обратный код
+        assert SensorRecord(bytes(record)).convert(0xF6) == -9
+
+    def test_compact_record(self):
+        sensor = SensorRecord(compact_sensor_record(5, 0x06, 'pcie_temp', 1))
+        assert (sensor.record_type, sensor.number, sensor.name) == (0x02, 0x06, 'pcie_temp')
+        assert sensor.convert(35) == 35
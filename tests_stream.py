@@ -0,0 +1,82 @@
+import json
+import random
+
+import pytest
+
+from redfish_stream import _MembersParser
+
+# --- Конфигурация ---
+SEED = 20240611
+SPLITS_PER_DOCUMENT = 200
+
+
+def log_entries(count):
+    """Записи журнала: вложенные объекты, числа, литералы и многобайтный UTF-8"""
+    return [
+        {
+            '@odata.id': f"/redfish/v1/Systems/system/LogServices/EventLog/Entries/{n}",
+            'Id': str(n),
+            'Created': f"2024-06-11T10:{n % 60:02d}:00+00:00",
+            'Severity': ('OK', 'Warning', 'Critical')[n % 3],
+            'Message': f"Температура CPU {n} °C превысила порог ≥ {n * 1.5}",
+            'SensorNumber': n * 1000003,
+            'Resolved': n % 2 == 0,
+            'Oem': {'Links': [n, -n, 1e-3 * n, None]},
+        }
+        for n in range(count)
+    ]
+
+
+DOCUMENTS = {
+    'entries': {
+        '@odata.type': '#LogEntryCollection.LogEntryCollection',
+        'Members': log_entries(40),
+        'Members@odata.count': 40,
+        'Members@odata.nextLink': '/redfish/v1/Systems/system/LogServices/EventLog/Entries?$skip=40',
+    },
+    'next_link_first': {
+        'Members@odata.nextLink': '/redfish/v1/Chassis?$skip=2',
+        'Name': 'Chassis Collection',
+        'Members': [{'@odata.id': '/redfish/v1/Chassis/chassis'}, 12345678, 6.75, -1.5e-30, 'строка', [1, [2, [3]]]],
+    },
+    'empty': {'Name': 'Пусто', 'Members': [], 'Members@odata.count': 0},
+    'no_members': {'Name': 'Без Members', 'Description': '{"Members": [1]}'},
+}
+
+
+def random_chunks(data, rng):
+    """Режет байты в случайных местах, в том числе внутри UTF-8 символов, чисел и строк"""
+    chunks = []
+    position = 0
+    while position < len(data):
+        size = rng.choice((1, 1, 2, 3, rng.randint(1, 64)))
+        chunks.append(data[position:position + size])
+        position += size
+    return chunks
+
+
+class TestMembersParser:
+    """Разбор Members не зависит от того, как поток поделен на чанки"""
+
+    @pytest.mark.parametrize('name', sorted(DOCUMENTS))
+    @pytest.mark.parametrize('indent', [None, 2])
+    def test_random_chunk_boundaries(self, name, indent):
+        document = DOCUMENTS[name]
+        data = json.dumps(document, ensure_ascii=False, indent=indent).encode('utf-8')
+        rng = random.Random(f"{SEED}-{name}-{indent}")
+
+        for _ in range(SPLITS_PER_DOCUMENT):
+            chunks = random_chunks(data, rng)
+            parser = _MembersParser(chunks)
+
+            assert list(parser.members()) == document.get('Members', []), chunks
+            assert parser.next_link == document.get('Members@odata.nextLink')
+
+    def test_number_at_chunk_end_is_not_truncated(self):
+        parser = _MembersParser([b'{"Members": [12', b'34', b'5, 6.', b'75]}'])
+        assert list(parser.members()) == [12345, 6.75]
+
+    def test_truncated_stream_raises(self):
+        parser = _MembersParser([b'{"Members": [{"Id": "1"}, {"Id": '])
+        with pytest.raises(ValueError):
+            list(parser.members())
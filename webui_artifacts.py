@@ -0,0 +1,211 @@
+"""Артефакты упавших WebUI тестов: скриншот, DOM, консоль и сетевой лог браузера.
+
+В потоке теста снимаются только сырые данные (скриншот в base64, page_source,
+логи WebDriver), это несколько вызовов к chromedriver без записи на диск.
+Декодирование, сжатие gzip, хэширование и запись выполняет фоновый поток.
+Одинаковые скриншоты и DOM (повторные попытки входа на той же странице)
+сохраняются один раз: файлы называются по SHA-256 содержимого. Общий объем
+в reports/artifacts/ ограничен WEBUI_ARTIFACTS_MAX_MB; после лимита остаются
+только записи в индексе reports/artifacts/index_<набор>.json.
+"""
+import base64
+import gzip
+import hashlib
+import json
+import logging
+import os
+import queue
+import threading
+import time
+import weakref
+from collections import deque
+
+from bmc_trace import tracer
+
+logger = logging.getLogger(__name__)
+
+# --- Конфигурация ---
+REPORTS_DIR = os.getenv('REPORTS_DIR', 'reports')
+ARTIFACTS_DIR = os.path.join(REPORTS_DIR, 'artifacts')
+MAX_BYTES = int(float(os.getenv('WEBUI_ARTIFACTS_MAX_MB', '50')) * 1024 * 1024)
+# Очередь ограничена, чтобы серия падений не держала в памяти сотни скриншотов
+QUEUE_SIZE = 32
+# Записи performance log, прочитанные у драйвера, но еще не забранные PagePerf
+PERF_LOG_MAX_ENTRIES = 20000
+
+_perf_logs = weakref.WeakKeyDictionary()
+_perf_logs_lock = threading.Lock()
+
+
+def _read_performance_log(driver):
+    entries = driver.get_log('performance')
+    with _perf_logs_lock:
+        buffer = _perf_logs.get(driver)
+        if buffer is None:
+            buffer = _perf_logs[driver] = deque(maxlen=PERF_LOG_MAX_ENTRIES)
+        buffer.extend(entries)
+        return buffer
+
+
+def peek_performance_log(driver):
+    """Записи performance log без удаления: get_log опустошает буфер chromedriver,
+    поэтому прочитанное остается здесь для drain_performance_log"""
+    buffer = _read_performance_log(driver)
+    with _perf_logs_lock:
+        return list(buffer)
+
+
+def drain_performance_log(driver):
+    """Все записи performance log с прошлого drain (в том числе прочитанные peek)"""
+    buffer = _read_performance_log(driver)
+    with _perf_logs_lock:
+        entries = list(buffer)
+        buffer.clear()
+        return entries
+
+
+def parse_network_log(entries):
+    """Chrome performance log -> [{'url', 'status', 'type', 'bytes', 'error'}] всех запросов страницы"""
+    requests = {}
+    for entry in entries:
+        message = json.loads(entry['message'])['message']
+        method = message.get('method', '')
+        params = message.get('params', {})
+        request_id = params.get('requestId')
+        if method == 'Network.requestWillBeSent':
+            requests[request_id] = {'url': params.get('request', {}).get('url', ''), 'status': None}
+        elif method == 'Network.responseReceived':
+            response = params.get('response', {})
+            requests.setdefault(request_id, {'url': response.get('url', '')}).update(
+                status=response.get('status'), type=params.get('type'),
+            )
+        elif method == 'Network.loadingFinished' and request_id in requests:
+            requests[request_id]['bytes'] = int(params.get('encodedDataLength', 0))
+        elif method == 'Network.loadingFailed' and request_id in requests:
+            requests[request_id]['error'] = params.get('errorText')
+    return list(requests.values())
+
+
+class ArtifactCollector:
+    """Фоновая запись артефактов с дедупликацией по хэшу и лимитом объема"""
+
+    def __init__(self, directory=ARTIFACTS_DIR, max_bytes=MAX_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.index = []
+        self.stats = {'captured': 0, 'written': 0, 'deduplicated': 0, 'over_limit': 0, 'dropped': 0,
+                      'bytes': 0, 'capture_ms': 0.0}
+        self._seen = {}
+        self._lock = threading.Lock()
+        self._queue = queue.Queue(maxsize=QUEUE_SIZE)
+        self._thread = None
+
+    def capture(self, driver, name, reason=None):
+        """Снимает состояние браузера Selenium; запись выполнит фоновый поток"""
+        started = time.perf_counter()
+        raw = {'name': name, 'test': tracer.current_test, 'reason': reason, 'timestamp': time.time()}
+        for key, grab in (
+            ('url', lambda: driver.current_url),
+            ('screenshot', driver.get_screenshot_as_base64),
+            ('dom', lambda: driver.page_source),
+            ('console', lambda: driver.get_log('browser')),
+            ('network', lambda: peek_performance_log(driver)),
+        ):
+            try:
+                raw[key] = grab()
+            except Exception as e:  # браузер мог упасть вместе с тестом
+                logger.debug("Артефакт %s для %s не снят: %s", key, name, e)
+        elapsed = (time.perf_counter() - started) * 1000
+        with self._lock:
+            self.stats['captured'] += 1
+            self.stats['capture_ms'] += elapsed
+        self._start()
+        try:
+            self._queue.put_nowait(raw)
+        except queue.Full:
+            with self._lock:
+                self.stats['dropped'] += 1
+            logger.warning("Очередь артефактов заполнена, артефакты %s отброшены", name)
+
+    def _start(self):
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='webui-artifacts', daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            raw = self._queue.get()
+            if raw is None:
+                return
+            try:
+                self._write(raw)
+            except Exception as e:
+                logger.warning("Не удалось сохранить артефакты %s: %s", raw['name'], e)
+
+    def _store(self, data, suffix, compress):
+        """Пишет содержимое в файл <sha256><suffix>; повторное содержимое не пишется"""
+        digest = hashlib.sha256(data).hexdigest()
+        filename = digest[:16] + suffix
+        with self._lock:
+            if digest in self._seen:
+                self.stats['deduplicated'] += 1
+                return self._seen[digest]
+        if compress:
+            data = gzip.compress(data, compresslevel=6)
+        with self._lock:
+            if self.stats['bytes'] + len(data) > self.max_bytes:
+                self.stats['over_limit'] += 1
+                return None
+            self.stats['bytes'] += len(data)
+            self._seen[digest] = filename
+        os.makedirs(self.directory, exist_ok=True)
+        with open(os.path.join(self.directory, filename), 'wb') as f:
+            f.write(data)
+        with self._lock:
+            self.stats['written'] += 1
+        return filename
+
+    def _write(self, raw):
+        entry = {key: raw.get(key) for key in ('name', 'test', 'reason', 'timestamp', 'url')}
+        if raw.get('screenshot'):
+            # PNG уже сжат, gzip только тратил бы время
+            entry['screenshot'] = self._store(base64.b64decode(raw['screenshot']), '.png', compress=False)
+        if raw.get('dom'):
+            entry['dom'] = self._store(raw['dom'].encode('utf-8'), '.html.gz', compress=True)
+        logs = {}
+        if raw.get('console'):
+            logs['console'] = raw['console']
+            entry['console_errors'] = sum(1 for line in raw['console'] if line.get('level') == 'SEVERE')
+        if raw.get('network'):
+            logs['network'] = parse_network_log(raw['network'])
+            entry['failed_requests'] = sum(
+                1 for request in logs['network'] if request.get('error') or (request.get('status') or 0) >= 400
+            )
+        if logs:
+            entry['logs'] = self._store(
+                json.dumps(logs, ensure_ascii=False).encode('utf-8'), '.json.gz', compress=True,
+            )
+        with self._lock:
+            self.index.append(entry)
+
+    def close(self, name):
+        """Дожидается записи и сохраняет индекс reports/artifacts/index_<name>.json"""
+        with self._lock:
+            thread, self._thread = self._thread, None
+        if thread is None:
+            return None
+        self._queue.put(None)
+        thread.join()
+        with self._lock:
+            data = {'max_bytes': self.max_bytes, 'stats': dict(self.stats), 'artifacts': list(self.index)}
+        data['stats']['capture_ms'] = round(data['stats']['capture_ms'], 1)
+        os.makedirs(self.directory, exist_ok=True)
+        path = os.path.join(self.directory, f"index_{name}.json")
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, indent=2, ensure_ascii=False)
+        logger.info("Артефакты WebUI: %s", data['stats'])
+        return path
+
+
+artifacts = ArtifactCollector()
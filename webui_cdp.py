@@ -0,0 +1,481 @@
+"""Легковесный WebUI backend поверх Chrome DevTools Protocol.
+
+Вместо HTTP round trip Selenium на каждую команду используется одно websocket
+соединение с браузером. Ожидания реализованы на событиях: сеть - через события
+Network, DOM - через MutationObserver внутри страницы. Несколько страниц
+(в изолированных browser context) работают параллельно в одном браузере.
+
+Требуется пакет websockets; Chrome ищется так же, как в tests_WebUI.py.
+"""
+import asyncio
+import itertools
+import json
+import logging
+import os
+import shutil
+import tempfile
+import threading
+import time
+
+import websockets
+
+from bmc_hdr import latency
+
+logger = logging.getLogger(__name__)
+
+# --- Конфигурация ---
+CHROME_BIN = os.getenv('GOOGLE_CHROME_BIN', '/usr/bin/google-chrome')
+HEADLESS = os.getenv('HEADLESS', '1') != '0'
+DEFAULT_TIMEOUT = 15
+
+# --- JS помощники, выполняются внутри страницы ---
+JS_HELPERS = """
+const visible = el => !!el && !!(el.offsetWidth || el.offsetHeight || el.getClientRects().length);
+const enabled = el => !el.disabled;
+const elementWithText = (texts, needEnabled) => {
+    const walker = document.createTreeWalker(document.body || document, NodeFilter.SHOW_TEXT);
+    for (let node = walker.nextNode(); node; node = walker.nextNode()) {
+        const el = node.parentElement;
+        if (!el || !texts.some(t => node.textContent.includes(t))) continue;
+        if (visible(el) && (!needEnabled || enabled(el))) return el;
+    }
+    return null;
+};
+const waitFor = (predicate, timeoutMs) => new Promise(resolve => {
+    const check = () => { try { return predicate(); } catch (e) { return null; } };
+    const first = check();
+    if (first) return resolve(first);
+    const observer = new MutationObserver(() => {
+        const result = check();
+        if (result) { observer.disconnect(); clearTimeout(timer); resolve(result); }
+    });
+    observer.observe(document, {subtree: true, childList: true, characterData: true, attributes: true});
+    const timer = setTimeout(() => { observer.disconnect(); resolve(check()); }, timeoutMs);
+});
+"""
+
+JS_LOGIN = """
+(async (username, password, timeoutMs) => {
+    %s
+    const find = (selectors, accept) => [...document.querySelectorAll(selectors)]
+        .find(el => visible(el) && enabled(el) && accept(el));
+    const fields = await waitFor(() => {
+        const user = find('#username, [name=username], input[type=text], input[type=email], input[id*=user]',
+                          el => el.type !== 'password');
+        const pass = find('#password, [name=password], input[type=password], input[id*=pass]',
+                          el => el.type === 'password' || (el.placeholder || '').toLowerCase().includes('pass'));
+        return user && pass ? [user, pass] : null;
+    }, timeoutMs);
+    if (!fields) return 'fields_not_found';
+
+    const setValue = (el, value) => {
+        Object.getOwnPropertyDescriptor(HTMLInputElement.prototype, 'value').set.call(el, value);
+        el.dispatchEvent(new Event('input', {bubbles: true}));
+        el.dispatchEvent(new Event('change', {bubbles: true}));
+    };
+    setValue(fields[0], username);
+    setValue(fields[1], password);
+
+    const button = find('button[type=submit], input[type=submit], #login, #submit, button.btn-primary', () => true)
+        || elementWithText(['Login', 'Sign in', 'Log in'], true);
+    if (button) {
+        button.click();
+    } else if (fields[1].form) {
+        fields[1].form.requestSubmit();
+    } else {
+        return 'submit_not_found';
+    }
+    return 'submitted';
+})
+""" % JS_HELPERS
+
+JS_IS_LOGGED_IN = """
+(async (timeoutMs) => {
+    %s
+    const indicator = () => {
+        if (visible(document.getElementById('dashboard')) || visible(document.getElementById('navigation'))) return true;
+        if ([...document.getElementsByClassName('navbar')].some(visible)) return true;
+        if (elementWithText(['Dashboard', 'System', 'Overview', 'Server'], false)) return true;
+        const url = location.href.toLowerCase();
+        if (document.querySelector('input[type=password]')) return false;
+        return !url.includes('login') && !url.includes('auth');
+    };
+    return !!(await waitFor(indicator, timeoutMs));
+})
+""" % JS_HELPERS
+
+JS_FIND_TEXT = """
+(async (texts, clickIt, timeoutMs) => {
+    %s
+    const el = await waitFor(() => elementWithText(texts, clickIt), timeoutMs);
+    if (!el) return null;
+    const text = (el.innerText || el.textContent || '').trim().slice(0, 200);
+    if (clickIt) el.click();
+    return text;
+})
+""" % JS_HELPERS
+
+
+class CDPError(Exception):
+    """Ошибка, возвращенная браузером в ответ на команду CDP"""
+
+
+class CDPConnection:
+    """Websocket соединение с браузером; сессии страниц мультиплексируются (flatten)"""
+
+    def __init__(self, websocket):
+        self._ws = websocket
+        self._ids = itertools.count(1)
+        self._pending = {}
+        self._listeners = []
+        self._reader = asyncio.ensure_future(self._read_loop())
+
+    @classmethod
+    async def connect(cls, url):
+        websocket = await websockets.connect(url, max_size=None, ping_interval=None)
+        return cls(websocket)
+
+    async def send(self, method, params=None, session_id=None):
+        message_id = next(self._ids)
+        message = {'id': message_id, 'method': method, 'params': params or {}}
+        if session_id:
+            message['sessionId'] = session_id
+        future = asyncio.get_running_loop().create_future()
+        self._pending[message_id] = future
+        await self._ws.send(json.dumps(message))
+        return await future
+
+    def add_listener(self, callback):
+        self._listeners.append(callback)
+
+    def remove_listener(self, callback):
+        self._listeners.remove(callback)
+
+    async def _read_loop(self):
+        try:
+            async for raw in self._ws:
+                message = json.loads(raw)
+                if 'id' in message:
+                    future = self._pending.pop(message['id'], None)
+                    if future and not future.done():
+                        if 'error' in message:
+                            future.set_exception(CDPError(message['error'].get('message')))
+                        else:
+                            future.set_result(message.get('result', {}))
+                else:
+                    for callback in list(self._listeners):
+                        callback(message)
+        except websockets.ConnectionClosed:
+            pass
+        finally:
+            for future in self._pending.values():
+                if not future.done():
+                    future.set_exception(CDPError("Соединение с браузером закрыто"))
+
+    async def close(self):
+        await self._ws.close()
+        self._reader.cancel()
+
+
+class CDPPage:
+    """Одна вкладка: навигация и ожидания на событиях Page/Network/DOM"""
+
+    def __init__(self, connection, session_id, target_id, context_id):
+        self.connection = connection
+        self.session_id = session_id
+        self.target_id = target_id
+        self.context_id = context_id
+        self._inflight = set()
+        self._last_network_activity = time.monotonic()
+        self._responses = {}
+        self.network_log = []
+        self._waiters = []
+        connection.add_listener(self._on_message)
+
+    def _on_message(self, message):
+        if message.get('sessionId') != self.session_id:
+            return
+        method = message.get('method')
+        params = message.get('params', {})
+        if method == 'Network.requestWillBeSent':
+            self._inflight.add(params.get('requestId'))
+            self._last_network_activity = time.monotonic()
+        elif method == 'Network.responseReceived':
+            self._responses[params.get('requestId')] = (params.get('response', {}).get('url', ''), params.get('type'))
+        elif method in ('Network.loadingFinished', 'Network.loadingFailed'):
+            self._inflight.discard(params.get('requestId'))
+            self._last_network_activity = time.monotonic()
+            url, resource_type = self._responses.pop(params.get('requestId'), ('', None))
+            if method == 'Network.loadingFinished':
+                # Тот же формат, что webui_perf.parse_performance_log
+                self.network_log.append({
+                    'url': url, 'type': resource_type, 'bytes': int(params.get('encodedDataLength', 0)),
+                })
+        for event_name, future in list(self._waiters):
+            if event_name == method and not future.done():
+                future.set_result(params)
+
+    async def send(self, method, params=None):
+        return await self.connection.send(method, params, session_id=self.session_id)
+
+    async def wait_for_event(self, method, timeout=DEFAULT_TIMEOUT):
+        future = asyncio.get_running_loop().create_future()
+        waiter = (method, future)
+        self._waiters.append(waiter)
+        try:
+            return await asyncio.wait_for(future, timeout)
+        finally:
+            self._waiters.remove(waiter)
+
+    async def wait_for_network_idle(self, idle_time=0.5, timeout=DEFAULT_TIMEOUT):
+        """Ждет, пока idle_time секунд не будет активных запросов (XHR к Redfish)"""
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            quiet_for = time.monotonic() - self._last_network_activity
+            if not self._inflight and quiet_for >= idle_time:
+                return True
+            await asyncio.sleep(min(0.05, idle_time))
+        return False
+
+    async def goto(self, url, timeout=DEFAULT_TIMEOUT):
+        load = asyncio.ensure_future(self.wait_for_event('Page.loadEventFired', timeout))
+        await asyncio.sleep(0)
+        result = await self.send('Page.navigate', {'url': url})
+        if result.get('errorText'):
+            load.cancel()
+            raise CDPError(f"Навигация на {url} не удалась: {result['errorText']}")
+        await load
+        await self.wait_for_network_idle(timeout=timeout)
+
+    async def evaluate(self, expression, timeout=DEFAULT_TIMEOUT):
+        result = await asyncio.wait_for(self.send('Runtime.evaluate', {
+            'expression': expression,
+            'awaitPromise': True,
+            'returnByValue': True,
+        }), timeout)
+        if 'exceptionDetails' in result:
+            raise CDPError(result['exceptionDetails'].get('text', 'JS exception'))
+        return result.get('result', {}).get('value')
+
+    async def add_init_script(self, source):
+        result = await self.send('Page.addScriptToEvaluateOnNewDocument', {'source': source})
+        return result['identifier']
+
+    async def remove_init_script(self, identifier):
+        await self.send('Page.removeScriptToEvaluateOnNewDocument', {'identifier': identifier})
+
+    async def call(self, function_source, *args, timeout=DEFAULT_TIMEOUT):
+        arguments = ', '.join(json.dumps(arg) for arg in args)
+        return await self.evaluate(f"({function_source})({arguments})", timeout=timeout + 1)
+
+    # --- API, совпадающее с Selenium backend ---
+    async def login(self, username, password, timeout=DEFAULT_TIMEOUT):
+        state = await self.call(JS_LOGIN, username, password, timeout * 1000, timeout=timeout)
+        if state != 'submitted':
+            logger.warning("CDP: вход не выполнен (%s)", state)
+            return False
+        await self.wait_for_network_idle(timeout=timeout)
+        return await self.is_logged_in(timeout=timeout)
+
+    async def is_logged_in(self, timeout=5):
+        return bool(await self.call(JS_IS_LOGGED_IN, timeout * 1000, timeout=timeout))
+
+    async def find_text(self, texts, timeout=5):
+        return await self.call(JS_FIND_TEXT, list(texts), False, timeout * 1000, timeout=timeout)
+
+    async def click_text(self, texts, timeout=5):
+        text = await self.call(JS_FIND_TEXT, list(texts), True, timeout * 1000, timeout=timeout)
+        if text is not None:
+            await self.wait_for_network_idle(timeout=DEFAULT_TIMEOUT)
+        return text
+
+    async def close(self):
+        self.connection.remove_listener(self._on_message)
+        await self.connection.send('Target.closeTarget', {'targetId': self.target_id})
+        if self.context_id:
+            await self.connection.send('Target.disposeBrowserContext', {'browserContextId': self.context_id})
+
+
+class CDPBrowser:
+    """Запуск headless Chrome и создание страниц"""
+
+    def __init__(self, process, connection, user_data_dir):
+        self.process = process
+        self.connection = connection
+        self.user_data_dir = user_data_dir
+
+    @classmethod
+    async def launch(cls, chrome_bin=CHROME_BIN, timeout=DEFAULT_TIMEOUT):
+        user_data_dir = tempfile.mkdtemp(prefix='webui-cdp-')
+        args = [
+            '--remote-debugging-port=0',
+            f'--user-data-dir={user_data_dir}',
+            '--ignore-certificate-errors',
+            '--no-sandbox',
+            '--disable-dev-shm-usage',
+            '--disable-extensions',
+            '--no-first-run',
+            '--window-size=1920,1080',
+        ]
+        if HEADLESS:
+            args += ['--headless=new', '--disable-gpu']
+        process = await asyncio.create_subprocess_exec(
+            chrome_bin, *args, 'about:blank',
+            stdout=asyncio.subprocess.DEVNULL,
+            stderr=asyncio.subprocess.DEVNULL,
+        )
+
+        # Chrome записывает выбранный порт и путь websocket в DevToolsActivePort
+        port_file = os.path.join(user_data_dir, 'DevToolsActivePort')
+        deadline = time.monotonic() + timeout
+        while not os.path.exists(port_file):
+            if process.returncode is not None or time.monotonic() > deadline:
+                process.kill()
+                shutil.rmtree(user_data_dir, ignore_errors=True)
+                raise CDPError("Chrome не запустился или не открыл порт DevTools")
+            await asyncio.sleep(0.05)
+        await asyncio.sleep(0.05)
+        with open(port_file) as f:
+            port, path = f.read().split()[:2]
+
+        connection = await CDPConnection.connect(f"ws://127.0.0.1:{port}{path}")
+        await connection.send('Security.setIgnoreCertificateErrors', {'ignore': True})
+        return cls(process, connection, user_data_dir)
+
+    async def new_page(self, isolated=True):
+        """Новая вкладка; isolated=True - в отдельном browser context (свои cookies)"""
+        context_id = None
+        params = {'url': 'about:blank'}
+        if isolated:
+            context_id = (await self.connection.send('Target.createBrowserContext'))['browserContextId']
+            params['browserContextId'] = context_id
+        target_id = (await self.connection.send('Target.createTarget', params))['targetId']
+        session_id = (await self.connection.send(
+            'Target.attachToTarget', {'targetId': target_id, 'flatten': True}
+        ))['sessionId']
+
+        page = CDPPage(self.connection, session_id, target_id, context_id)
+        await asyncio.gather(
+            page.send('Page.enable'),
+            page.send('Network.enable'),
+            page.send('Runtime.enable'),
+            page.send('Security.setIgnoreCertificateErrors', {'ignore': True}),
+        )
+        return page
+
+    async def close(self):
+        try:
+            await self.connection.send('Browser.close')
+        except CDPError:
+            pass
+        await self.connection.close()
+        try:
+            await asyncio.wait_for(self.process.wait(), 5)
+        except asyncio.TimeoutError:
+            self.process.kill()
+        shutil.rmtree(self.user_data_dir, ignore_errors=True)
+
+
+class CDPDriver:
+    """Синхронная обертка для PyTest: event loop работает в отдельном потоке
+
+    Методы повторяют API Selenium backend из tests_WebUI.py:
+    open(), login(), is_logged_in(), find_text(), click_text(), а также
+    evaluate(), add_init_script() и performance_log() для webui_perf.py.
+    """
+
+    def __init__(self, chrome_bin=CHROME_BIN):
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, name='webui-cdp', daemon=True)
+        self._thread.start()
+        self.browser = self._run(CDPBrowser.launch(chrome_bin))
+        self.page = self._run(self.browser.new_page())
+        self._init_scripts = {}
+        self._script_ids = {}
+        self._script_keys = itertools.count(1)
+
+    def _run(self, coroutine, timeout=DEFAULT_TIMEOUT * 4):
+        return asyncio.run_coroutine_threadsafe(coroutine, self._loop).result(timeout)
+
+    def open(self, url):
+        """Чистое состояние: новая изолированная вкладка и переход на url"""
+        self._run(self.page.close())
+        self.page = self._run(self.browser.new_page())
+        self._script_ids = {
+            key: self._run(self.page.add_init_script(source)) for key, source in self._init_scripts.items()
+        }
+        self._run(self.page.goto(url))
+
+    def evaluate(self, expression):
+        return self._run(self.page.evaluate(expression))
+
+    def add_init_script(self, source):
+        """Скрипт для каждого нового документа, в том числе во вкладках, открытых open()"""
+        key = next(self._script_keys)
+        self._init_scripts[key] = source
+        self._script_ids[key] = self._run(self.page.add_init_script(source))
+        return key
+
+    def remove_init_script(self, key):
+        self._init_scripts.pop(key, None)
+        identifier = self._script_ids.pop(key, None)
+        if identifier is not None:
+            self._run(self.page.remove_init_script(identifier))
+
+    def performance_log(self):
+        log, self.page.network_log = self.page.network_log, []
+        return log
+
+    @latency.timed("WebUI - login (cdp)")
+    def login(self, username, password):
+        return self._run(self.page.login(username, password))
+
+    def is_logged_in(self):
+        return self._run(self.page.is_logged_in())
+
+    def find_text(self, texts):
+        return self._run(self.page.find_text(texts))
+
+    def click_text(self, texts):
+        return self._run(self.page.click_text(texts))
+
+    def check_pages(self, url, username, password, checks):
+        """Параллельно открывает по вкладке на проверку: вход, клик по меню, поиск текста
+
+        checks: {имя: (тексты пунктов меню, ожидаемые тексты)}
+        Возвращает ({имя: найденный текст или None}, {имя: исключение}): ошибка
+        CDP или таймаут вкладки не выдается за "раздел не найден".
+        """
+        async def check(menu_texts, expected_texts):
+            page = await self.browser.new_page()
+            try:
+                await page.goto(url)
+                if not await page.login(username, password):
+                    return None
+                if menu_texts and await page.click_text(menu_texts) is None:
+                    return None
+                return await page.find_text(expected_texts)
+            finally:
+                await page.close()
+
+        async def run_all():
+            names = list(checks)
+            results = await asyncio.gather(
+                *(check(*checks[name]) for name in names), return_exceptions=True
+            )
+            found, errors = {}, {}
+            for name, result in zip(names, results):
+                if isinstance(result, BaseException):
+                    errors[name] = result
+                else:
+                    found[name] = result
+            return found, errors
+
+        return self._run(run_all())
+
+    def quit(self):
+        try:
+            self._run(self.browser.close())
+        finally:
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._thread.join(timeout=5)
@@ -0,0 +1,234 @@
+"""Метрики загрузки страниц WebUI и бюджеты на них.
+
+Для каждой навигации (полная загрузка или переход по меню SPA) снимаются:
+TTFB и DOMContentLoaded из Navigation Timing, число и объем Redfish XHR из
+Resource Timing (или из performance log браузера, если он доступен) и время до
+появления первого значимого элемента (MutationObserver внутри страницы).
+Бюджеты страниц задаются в webui_budgets.json; превышение проваливает тест.
+
+Backend должен предоставлять evaluate(expression) (результат Promise ожидается),
+add_init_script(source)/remove_init_script(id) и, по возможности,
+performance_log() -> [{'url', 'type', 'bytes'}].
+"""
+import json
+import logging
+import os
+import threading
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+# --- Конфигурация ---
+REPORTS_DIR = os.getenv('REPORTS_DIR', 'reports')
+BUDGETS_PATH = os.getenv(
+    'WEBUI_BUDGETS', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'webui_budgets.json')
+)
+
+# Отметка начала навигации; после полной загрузки новый документ ее не содержит,
+# и отсчет идет от начала навигации (0)
+JS_MARK = """
+(() => {
+    performance.setResourceTimingBufferSize(5000);
+    performance.clearResourceTimings();
+    window.__perfMark = performance.now();
+    return window.__perfMark;
+})()
+"""
+
+# Фиксирует момент появления первого видимого элемента с одним из текстов в window.__perfFirst.
+# Выполняется в текущем документе и, через init script, в документе следующей полной загрузки
+JS_OBSERVE = """
+((texts) => {
+    const mark = window.__perfMark || 0;
+    const visible = el => !!el && !!(el.offsetWidth || el.offsetHeight || el.getClientRects().length);
+    const check = () => {
+        if (window.__perfFirst != null) return true;
+        const walker = document.createTreeWalker(document, NodeFilter.SHOW_TEXT);
+        for (let node = walker.nextNode(); node; node = walker.nextNode()) {
+            if (texts.some(t => node.textContent.includes(t)) && visible(node.parentElement)) {
+                window.__perfFirst = performance.now() - mark;
+                return true;
+            }
+        }
+        return false;
+    };
+    window.__perfFirst = null;
+    window.__perfCheck = check;
+    if (check()) return;
+    const observer = new MutationObserver(() => { if (check()) observer.disconnect(); });
+    observer.observe(document, {subtree: true, childList: true, characterData: true, attributes: true});
+})
+"""
+
+JS_WAIT_ELEMENT = """
+((timeoutMs) => new Promise(resolve => {
+    const check = window.__perfCheck || (() => false);
+    const started = performance.now();
+    const poll = () => {
+        if (check()) return resolve(window.__perfFirst);
+        if (performance.now() - started > timeoutMs) return resolve(null);
+        setTimeout(poll, 50);
+    };
+    poll();
+}))
+"""
+
+JS_COLLECT = """
+(() => {
+    const mark = window.__perfMark;
+    const fullLoad = mark === undefined;
+    const since = fullLoad ? 0 : mark;
+    const redfish = performance.getEntriesByType('resource').filter(e =>
+        e.startTime >= since && e.name.includes('/redfish/') &&
+        (e.initiatorType === 'xmlhttprequest' || e.initiatorType === 'fetch'));
+    const result = {
+        full_load: fullLoad,
+        redfish_xhr_count: redfish.length,
+        redfish_xhr_bytes: redfish.reduce((sum, e) => sum + (e.transferSize || e.encodedBodySize || 0), 0),
+        ttfb_ms: null,
+        dom_content_loaded_ms: null,
+    };
+    const nav = performance.getEntriesByType('navigation')[0];
+    if (fullLoad && nav) {
+        result.ttfb_ms = nav.responseStart;
+        result.dom_content_loaded_ms = nav.domContentLoadedEventEnd;
+    } else if (redfish.length) {
+        // Переход внутри SPA: первый байт - первый ответ Redfish после клика
+        result.ttfb_ms = Math.min(...redfish.map(e => e.responseStart - since));
+    }
+    return result;
+})()
+"""
+
+
+def load_budgets(path=BUDGETS_PATH):
+    """{страница: {метрика: предел}}; отсутствующий файл - без бюджетов"""
+    try:
+        with open(path, encoding='utf-8') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        logger.warning("Файл бюджетов WebUI не найден: %s", path)
+        return {}
+
+
+def parse_performance_log(entries):
+    """Chrome performance log (goog:loggingPrefs) -> [{'url', 'type', 'bytes'}] завершенных запросов"""
+    responses = {}
+    finished = []
+    for entry in entries:
+        message = json.loads(entry['message'])['message']
+        params = message.get('params', {})
+        if message.get('method') == 'Network.responseReceived':
+            responses[params.get('requestId')] = (params.get('response', {}).get('url', ''), params.get('type'))
+        elif message.get('method') == 'Network.loadingFinished':
+            url, resource_type = responses.pop(params.get('requestId'), ('', None))
+            finished.append({'url': url, 'type': resource_type, 'bytes': int(params.get('encodedDataLength', 0))})
+    return finished
+
+
+def check_budget(metrics, budget):
+    """Список нарушений бюджета.
+
+    first_element_ms = None значит, что элемент не появился за время ожидания, -
+    это нарушение. Остальные метрики без значения (например, TTFB при переходе
+    внутри SPA) не проверяются.
+    """
+    violations = []
+    for metric, limit in budget.items():
+        value = metrics.get(metric)
+        if value is None:
+            if metric == 'first_element_ms':
+                violations.append(f"{metric}=timeout > {limit}")
+        elif value > limit:
+            violations.append(f"{metric}={value} > {limit}")
+    return violations
+
+
+class PerfReport:
+    """Метрики всех навигаций за сессию PyTest"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.navigations = []
+
+    def add(self, test, page, metrics, violations):
+        with self._lock:
+            self.navigations.append({'test': test, 'page': page, **metrics, 'violations': violations})
+
+    def export(self, path):
+        with self._lock:
+            navigations = list(self.navigations)
+        if not navigations:
+            return None
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump({'budgets_file': BUDGETS_PATH, 'navigations': navigations}, f, indent=2, ensure_ascii=False)
+        return path
+
+
+perf_report = PerfReport()
+
+
+class PagePerf:
+    """Снимает метрики навигаций одного теста и проверяет бюджеты"""
+
+    def __init__(self, ui, test, budgets=None):
+        self.ui = ui
+        self.test = test
+        self.budgets = load_budgets() if budgets is None else budgets
+        self.results = {}
+        self.violations = []
+
+    def assert_within_budget(self):
+        assert not self.violations, "Превышены бюджеты страниц: " + "; ".join(self.violations)
+
+    def _network_log(self):
+        try:
+            return self.ui.performance_log()
+        except Exception as e:
+            logger.debug("Performance log недоступен: %s", e)
+            return None
+
+    @contextmanager
+    def navigation(self, page, texts, timeout=15):
+        """Оборачивает действие навигации (get, click); texts - признаки значимого элемента.
+
+        timeout (с) должен превышать бюджет first_element_ms страницы: иначе
+        ожидание заканчивается раньше, чем бюджет может быть превышен.
+        """
+        observe = f"({JS_OBSERVE})({json.dumps(list(texts))})"
+        self.ui.evaluate(JS_MARK)
+        self.ui.evaluate(observe)
+        script_id = self.ui.add_init_script(observe)
+        self._network_log()  # отбрасываем события до навигации
+        try:
+            yield
+        finally:
+            self.ui.remove_init_script(script_id)
+
+        first_element = self.ui.evaluate(f"({JS_WAIT_ELEMENT})({int(timeout * 1000)})")
+        metrics = self.ui.evaluate(JS_COLLECT)
+        metrics['first_element_ms'] = first_element
+
+        # Performance log видит и ответы, которых нет в Resource Timing (переполнение буфера, CORS)
+        network = self._network_log()
+        if network is not None:
+            redfish = [r for r in network if '/redfish/' in r['url'] and r['type'] in ('XHR', 'Fetch')]
+            metrics['redfish_xhr_count'] = len(redfish)
+            metrics['redfish_xhr_bytes'] = sum(r['bytes'] for r in redfish)
+            metrics['source'] = 'performance_log'
+        else:
+            metrics['source'] = 'resource_timing'
+        for metric in ('ttfb_ms', 'dom_content_loaded_ms', 'first_element_ms'):
+            if metrics.get(metric) is not None:
+                metrics[metric] = round(metrics[metric], 1)
+
+        violations = check_budget(metrics, self.budgets.get(page, {}))
+        self.results[page] = metrics
+        self.violations += [f"{page}: {v}" for v in violations]
+        perf_report.add(self.test, page, metrics, violations)
+        logger.info(
+            "Perf %s: TTFB %s ms, DCL %s ms, first element %s ms, Redfish XHR %s (%s B)",
+            page, metrics['ttfb_ms'], metrics['dom_content_loaded_ms'], metrics['first_element_ms'],
+            metrics['redfish_xhr_count'], metrics['redfish_xhr_bytes'],
+        )
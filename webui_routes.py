@@ -0,0 +1,144 @@
+"""Карта маршрутов Vue router веб-интерфейса OpenBMC.
+
+Маршруты обнаруживаются один раз на сборку UI: по ссылкам меню (href="#/...")
+и, если доступен, по конфигурации $router корневого Vue компонента. Результат
+кэшируется в файле, привязанном к хэшу бандла (имена js/css файлов из
+index.html содержат хэш содержимого), поэтому повторные прогоны на том же
+образе не открывают меню. Если нужного маршрута нет в карте (первое
+обнаружение прошло до полной отрисовки меню), карта дополняется повторным
+обнаружением. Тесты переходят на страницу сменой location.hash вместо кликов
+по меню и поиска текста XPath.
+"""
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+
+import requests
+
+from bmc_transport import new_session
+
+logger = logging.getLogger(__name__)
+
+# --- Конфигурация ---
+ROUTES_CACHE = os.getenv('WEBUI_ROUTES_CACHE', os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), '.webui_routes.json'
+))
+ASSET_PATTERN = re.compile(r'(?:src|href)="([^"]+\.(?:js|css))"')
+
+JS_DISCOVER = """
+(() => {
+    const routes = {};
+    const label = el => (el.textContent || '').trim().replace(/\\s+/g, ' ');
+    // Свернутые разделы меню остаются в DOM, поэтому берем textContent, а не innerText
+    for (const a of document.querySelectorAll('a[href*="#/"]')) {
+        const path = a.getAttribute('href').split('#')[1];
+        if (path && !(path in routes)) routes[path] = label(a);
+    }
+    const root = document.querySelector('#app');
+    const router = root && root.__vue__ && root.__vue__.$router;
+    const walk = (list, prefix) => (list || []).forEach(route => {
+        const path = route.path.startsWith('/') ? route.path : prefix.replace(/\\/$/, '') + '/' + route.path;
+        if (!path.includes(':') && !path.includes('*') && !(path in routes)) {
+            routes[path] = (route.meta && route.meta.title) || route.name || '';
+        }
+        walk(route.children, path);
+    });
+    if (router && router.options) walk(router.options.routes, '');
+    return routes;
+})()
+"""
+
+
+def bundle_hash(base_url, session=None):
+    """Хэш сборки UI по ссылкам на js/css из index.html (или по самому index.html)"""
+    own_session = session is None
+    session = session or new_session(verify=False)
+    try:
+        response = session.get(base_url, timeout=10)
+        response.raise_for_status()
+    finally:
+        if own_session:
+            session.close()
+    assets = sorted(set(ASSET_PATTERN.findall(response.text)))
+    source = '\n'.join(assets).encode('utf-8') if assets else response.content
+    return hashlib.sha256(source).hexdigest()[:16]
+
+
+class RouteMap:
+    """{путь маршрута: подпись пункта меню}, кэш в ROUTES_CACHE по хэшу бандла"""
+
+    def __init__(self, base_url, path=ROUTES_CACHE):
+        self.base_url = base_url
+        self.path = path
+        self.bundle = None
+        self.routes = {}
+        self._lock = threading.Lock()
+        try:
+            self.bundle = bundle_hash(base_url)
+        except requests.exceptions.RequestException as e:
+            logger.warning("Не удалось определить сборку WebUI: %s", e)
+            return
+        cached = self._load()
+        if cached.get('bundle') == self.bundle:
+            self.routes = cached.get('routes', {})
+            logger.info("Карта маршрутов WebUI из кэша (%s маршрутов, сборка %s)", len(self.routes), self.bundle)
+
+    def _load(self):
+        try:
+            with open(self.path, encoding='utf-8') as f:
+                return json.load(f)
+        except (FileNotFoundError, ValueError):
+            return {}
+
+    def _save(self):
+        with open(self.path, 'w', encoding='utf-8') as f:
+            json.dump({'bundle': self.bundle, 'routes': self.routes}, f, indent=2, ensure_ascii=False)
+
+    def _discover(self, ui):
+        """Дополняет карту маршрутами со страницы; сохраняет кэш, если появились новые"""
+        routes = ui.evaluate(JS_DISCOVER) or {}
+        added = {path: label for path, label in routes.items() if path not in self.routes}
+        if added:
+            self.routes.update(added)
+            self._save()
+            logger.info("Обнаружено маршрутов WebUI: %s, всего %s (сборка %s)",
+                        len(added), len(self.routes), self.bundle)
+        return bool(added)
+
+    def ensure(self, ui):
+        """Обнаруживает маршруты на странице после входа, если их нет в кэше"""
+        with self._lock:
+            if not self.routes and self.bundle is not None:
+                self._discover(ui)
+            return self.routes
+
+    def resolve(self, keywords):
+        """Первый маршрут, путь или подпись которого содержит одно из ключевых слов"""
+        for keyword in keywords:
+            keyword = keyword.lower()
+            for path, label in self.routes.items():
+                if keyword in path.lower() or keyword in (label or '').lower():
+                    return path
+        return None
+
+    def find(self, ui, keywords):
+        """Маршрут для ключевых слов; при промахе маршруты обнаруживаются заново
+
+        Первое обнаружение могло пройти до полной отрисовки меню, и в кэш
+        попала неполная карта - промах дополняет ее, а не закрепляет.
+        """
+        self.ensure(ui)
+        route = self.resolve(keywords)
+        if route is None and self.bundle is not None:
+            with self._lock:
+                if self._discover(ui):
+                    route = self.resolve(keywords)
+        return route
+
+    def go(self, ui, route):
+        """Переход по маршруту сменой location.hash, без перезагрузки страницы"""
+        ui.evaluate(f"(() => {{ window.location.hash = {json.dumps(route)}; return true; }})()")
+        logger.info("Переход по маршруту #%s", route)